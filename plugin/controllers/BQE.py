@@ -26,6 +26,7 @@ from Plugins.Extensions.OpenWebif.controllers.base import BaseController
 from Components.config import config
 from Components.ParentalControl import parentalControl
 from Plugins.Extensions.OpenWebif.controllers.utilities import getUrlArg
+from Plugins.Extensions.OpenWebif.controllers.workers import runInWorker
 from Plugins.Extensions.OpenWebif.controllers.models.services import getPicon
 import os
 import json
@@ -74,7 +75,6 @@ class BQEWebController(BaseController):
 		request.setHeader("content-type", "text/xml")
 
 	def P_addbouquet(self, request):
-		self.withMainTemplate = False
 		try:
 			from Plugins.Extensions.OpenWebif.controllers.BouquetEditor import BouquetEditor
 			bqe = BouquetEditor(self.session, func=BouquetEditor.ADD_BOUQUET)
@@ -84,7 +84,6 @@ class BQEWebController(BaseController):
 			return self.returnResult(request, [False, 'BouquetEditor plugin not found'])
 
 	def P_removebouquet(self, request):
-		self.withMainTemplate = False
 		try:
 			from Plugins.Extensions.OpenWebif.controllers.BouquetEditor import BouquetEditor
 			bqe = BouquetEditor(self.session, func=BouquetEditor.REMOVE_BOUQUET)
@@ -94,7 +93,6 @@ class BQEWebController(BaseController):
 			return self.returnResult(request, [False, 'BouquetEditor plugin not found'])
 
 	def P_movebouquet(self, request):
-		self.withMainTemplate = False
 		try:
 			from Plugins.Extensions.OpenWebif.controllers.BouquetEditor import BouquetEditor
 			bqe = BouquetEditor(self.session, func=BouquetEditor.MOVE_BOUQUET)
@@ -104,7 +102,6 @@ class BQEWebController(BaseController):
 			return self.returnResult(request, [False, 'BouquetEditor plugin not found'])
 
 	def P_addmarkertobouquet(self, request):
-		self.withMainTemplate = False
 		try:
 			from Plugins.Extensions.OpenWebif.controllers.BouquetEditor import BouquetEditor
 			bqe = BouquetEditor(self.session, func=BouquetEditor.ADD_MARKER_TO_BOUQUET)
@@ -114,7 +111,6 @@ class BQEWebController(BaseController):
 			return self.returnResult(request, [False, 'BouquetEditor plugin not found'])
 
 	def P_addservicetobouquet(self, request):
-		self.withMainTemplate = False
 		try:
 			from Plugins.Extensions.OpenWebif.controllers.BouquetEditor import BouquetEditor
 			bqe = BouquetEditor(self.session, func=BouquetEditor.ADD_SERVICE_TO_BOUQUET)
@@ -124,7 +120,6 @@ class BQEWebController(BaseController):
 			return self.returnResult(request, [False, 'BouquetEditor plugin not found'])
 
 	def P_addprovidertobouquetlist(self, request):
-		self.withMainTemplate = False
 		try:
 			from Plugins.Extensions.OpenWebif.controllers.BouquetEditor import BouquetEditor
 			bqe = BouquetEditor(self.session, func=BouquetEditor.ADD_PROVIDER_TO_BOUQUETLIST)
@@ -134,7 +129,6 @@ class BQEWebController(BaseController):
 			return self.returnResult(request, [False, 'BouquetEditor plugin not found'])
 
 	def P_addservicetoalternative(self, request):
-		self.withMainTemplate = False
 		try:
 			from Plugins.Extensions.OpenWebif.controllers.BouquetEditor import BouquetEditor
 			bqe = BouquetEditor(self.session, func=BouquetEditor.ADD_SERVICE_TO_ALTERNATIVE)
@@ -144,7 +138,6 @@ class BQEWebController(BaseController):
 			return self.returnResult(request, [False, 'BouquetEditor plugin not found'])
 
 	def P_moveservice(self, request):
-		self.withMainTemplate = False
 		try:
 			from Plugins.Extensions.OpenWebif.controllers.BouquetEditor import BouquetEditor
 			bqe = BouquetEditor(self.session, func=BouquetEditor.MOVE_SERVICE)
@@ -154,7 +147,6 @@ class BQEWebController(BaseController):
 			return self.returnResult(request, [False, 'BouquetEditor plugin not found'])
 
 	def P_removeservice(self, request):
-		self.withMainTemplate = False
 		try:
 			from Plugins.Extensions.OpenWebif.controllers.BouquetEditor import BouquetEditor
 			bqe = BouquetEditor(self.session, func=BouquetEditor.REMOVE_SERVICE)
@@ -164,7 +156,6 @@ class BQEWebController(BaseController):
 			return self.returnResult(request, [False, 'BouquetEditor plugin not found'])
 
 	def P_renameservice(self, request):
-		self.withMainTemplate = False
 		try:
 			from Plugins.Extensions.OpenWebif.controllers.BouquetEditor import BouquetEditor
 			bqe = BouquetEditor(self.session, func=BouquetEditor.RENAME_SERVICE)
@@ -174,7 +165,6 @@ class BQEWebController(BaseController):
 			return self.returnResult(request, [False, 'BouquetEditor plugin not found'])
 
 	def P_removealternativeservices(self, request):
-		self.withMainTemplate = False
 		try:
 			from Plugins.Extensions.OpenWebif.controllers.BouquetEditor import BouquetEditor
 			bqe = BouquetEditor(self.session, func=BouquetEditor.REMOVE_ALTERNATIVE_SERVICES)
@@ -184,7 +174,6 @@ class BQEWebController(BaseController):
 			return self.returnResult(request, [False, 'BouquetEditor plugin not found'])
 
 	def P_togglelock(self, request):
-		self.withMainTemplate = False
 		try:
 			from Plugins.Extensions.OpenWebif.controllers.BouquetEditor import BouquetEditor
 			bqe = BouquetEditor(self.session, func=BouquetEditor.TOGGLE_LOCK)
@@ -194,17 +183,16 @@ class BQEWebController(BaseController):
 			return self.returnResult(request, [False, 'BouquetEditor plugin not found'])
 
 	def P_backup(self, request):
-		self.withMainTemplate = False
 		try:
-			from Plugins.Extensions.OpenWebif.controllers.BouquetEditor import BouquetEditor
-			bqe = BouquetEditor(self.session, func=BouquetEditor.BACKUP)
-			bqe.handleCommand(ensure_str(request.args[b'Filename'][0]))
-			return self.returnResult(request, bqe.result)
+			from Plugins.Extensions.OpenWebif.controllers.BouquetEditor import BouquetEditor, writeBackup
 		except ImportError:
 			return self.returnResult(request, [False, 'BouquetEditor plugin not found'])
+		bqe = BouquetEditor(self.session, func=BouquetEditor.BACKUP)
+		# only the tar file is written in the worker pool, the request is answered in the reactor thread
+		d = runInWorker(writeBackup, *bqe.prepareBackup(ensure_str(request.args[b'Filename'][0])))
+		return d.addCallback(lambda result: self.returnResult(request, result))
 
 	def P_restore(self, request):
-		self.withMainTemplate = False
 		try:
 			from Plugins.Extensions.OpenWebif.controllers.BouquetEditor import BouquetEditor
 			bqe = BouquetEditor(self.session, func=BouquetEditor.RESTORE)
@@ -417,11 +405,14 @@ class BQEImport(resource.Resource):
 
 
 class BQEApiController(BQEWebController):
+	isJson = True
+
 	def __init__(self, session, path=""):
 		BQEWebController.__init__(self, session, path)
 
 	def prePageLoad(self, request):
-		self.isJson = True
+		# JSON responses set their own content type
+		pass
 
 
 class BQEController(BaseController):
@@ -9,6 +9,7 @@
 # Commons, 559 Nathan Abbott Way, Stanford, California 94305, USA.
 
 from Plugins.Extensions.OpenWebif.controllers.i18n import _
+from Plugins.Extensions.OpenWebif.controllers.versions import bumpVersion
 from enigma import eServiceReference, eServiceCenter, eDVBDB
 from Components.Sources.Source import Source
 from Screens.ChannelSelection import MODE_TV  # ,service_types_tv, MODE_RADIO
@@ -21,6 +22,32 @@ from re import compile as re_compile
 from Components.NimManager import nimmanager
 
 
+def writeBackup(tarFilename, backupFilename, files):
+	"""
+	Write the tar file *backupFilename* of *files*, see
+	BouquetEditor.prepareBackup. Touches only files, so it may run in a
+	worker thread.
+	"""
+	if path.exists(backupFilename):
+		remove(backupFilename)
+	checkfile = path.join(BouquetEditor.BACKUP_PATH, '.webouquetedit')
+	f = open(checkfile, 'w')
+	if f:
+		f.write('created with WebBouquetEditor')
+		f.close()
+		tarFiles = "%s " % checkfile
+		for arg in files:
+			if not path.exists(arg):
+				remove(checkfile)
+				return (False, _("Error while preparing backup file, %s does not exists.") % arg)
+			tarFiles += "%s " % arg
+		lines = popen("tar cvf %s %s" % (backupFilename, tarFiles)).readlines()  # nosec
+		remove(checkfile)
+		return (True, tarFilename)
+	else:
+		return (False, _("Error while preparing backup file."))
+
+
 class BouquetEditor(Source):
 
 	ADD_BOUQUET = 0
@@ -84,6 +111,8 @@ class BouquetEditor(Source):
 			self.result = self.importBouquet(cmd)
 		else:
 			self.result = (False, _("one two three four unknown command"))
+		if self.func != self.BACKUP and self.result and self.result[0]:
+			bumpVersion("bouquets")
 
 	def addToBouquet(self, param):
 		print("[WebComponents.BouquetEditor] addToBouquet with param = ", param)
@@ -583,46 +612,44 @@ class BouquetEditor(Source):
 		return (True, protectionText)
 
 	def backupFiles(self, param):
+		return writeBackup(*self.prepareBackup(param))
+
+	def prepareBackup(self, param):
+		"""
+		Get the names of the backup and the files to put into it. Reads the
+		configuration and the service lists, so it must run in the reactor
+		thread.
+
+		Returns:
+			tuple (tar file name, tar file path, files)
+		"""
 		filename = param
 		if not filename:
 			filename = self.BACKUP_FILENAME
 		invalidCharacters = re_compile(r'[^A-Za-z0-9_. ]+|^\.|\.$|^ | $|^$')
 		tarFilename = "%s.tar" % invalidCharacters.sub('_', filename)
 		backupFilename = path.join(self.BACKUP_PATH, tarFilename)
-		if path.exists(backupFilename):
-			remove(backupFilename)
-		checkfile = path.join(self.BACKUP_PATH, '.webouquetedit')
-		f = open(checkfile, 'w')
-		if f:
-			files = []
-			f.write('created with WebBouquetEditor')
-			f.close()
-			files.append(checkfile)
-			files.append("/etc/enigma2/bouquets.tv")
-			files.append("/etc/enigma2/bouquets.radio")
-			# files.append("/etc/enigma2/userbouquet.favourites.tv")
-			# files.append("/etc/enigma2/userbouquet.favourites.radio")
-			files.append("/etc/enigma2/lamedb")
-			for xml in ("/etc/tuxbox/cables.xml", "/etc/tuxbox/terrestrial.xml", "/etc/tuxbox/satellites.xml", "/etc/tuxbox/atsc.xml", "/etc/enigma2/lamedb5"):
-				if path.exists(xml):
-					files.append(xml)
-			if config.ParentalControl.configured.value:
-				if config.ParentalControl.type.value == "blacklist":
-					files.append("/etc/enigma2/blacklist")
-				else:
-					files.append("/etc/enigma2/whitelist")
-			files += self.getPhysicalFilenamesFromServicereference(eServiceReference('1:7:1:0:0:0:0:0:0:0:FROM BOUQUET "bouquets.tv" ORDER BY bouquet'))
-			files += self.getPhysicalFilenamesFromServicereference(eServiceReference('1:7:1:0:0:0:0:0:0:0:FROM BOUQUET "bouquets.radio" ORDER BY bouquet'))
-			tarFiles = ""
-			for arg in files:
-				if not path.exists(arg):
-					return (False, _("Error while preparing backup file, %s does not exists.") % arg)
-				tarFiles += "%s " % arg
-			lines = popen("tar cvf %s %s" % (backupFilename, tarFiles)).readlines()  # nosec
-			remove(checkfile)
-			return (True, tarFilename)
-		else:
-			return (False, _("Error while preparing backup file."))
+		files = []
+		files.append("/etc/enigma2/bouquets.tv")
+		files.append("/etc/enigma2/bouquets.radio")
+		# files.append("/etc/enigma2/userbouquet.favourites.tv")
+		# files.append("/etc/enigma2/userbouquet.favourites.radio")
+		files.append("/etc/enigma2/lamedb")
+		for xml in ("/etc/tuxbox/cables.xml", "/etc/tuxbox/terrestrial.xml", "/etc/tuxbox/satellites.xml", "/etc/tuxbox/atsc.xml", "/etc/enigma2/lamedb5"):
+			if path.exists(xml):
+				files.append(xml)
+		if config.ParentalControl.configured.value:
+			if config.ParentalControl.type.value == "blacklist":
+				files.append("/etc/enigma2/blacklist")
+			else:
+				files.append("/etc/enigma2/whitelist")
+		files += self.getBouquetFilenames()
+		return tarFilename, backupFilename, files
+
+	def getBouquetFilenames(self):
+		files = self.getPhysicalFilenamesFromServicereference(eServiceReference('1:7:1:0:0:0:0:0:0:0:FROM BOUQUET "bouquets.tv" ORDER BY bouquet'))
+		files += self.getPhysicalFilenamesFromServicereference(eServiceReference('1:7:1:0:0:0:0:0:0:0:FROM BOUQUET "bouquets.radio" ORDER BY bouquet'))
+		return files
 
 	def getPhysicalFilenamesFromServicereference(self, ref):
 		files = []
@@ -655,9 +682,7 @@ class BouquetEditor(Source):
 					break
 			if check_tar:
 				eDVBDB.getInstance().removeServices()
-				files = []
-				files += self.getPhysicalFilenamesFromServicereference(eServiceReference('1:7:1:0:0:0:0:0:0:0:FROM BOUQUET "bouquets.tv" ORDER BY bouquet'))
-				files += self.getPhysicalFilenamesFromServicereference(eServiceReference('1:7:1:0:0:0:0:0:0:0:FROM BOUQUET "bouquets.radio" ORDER BY bouquet'))
+				files = self.getBouquetFilenames()
 				for bouquetfiles in files:
 					if path.exists(bouquetfiles):
 						remove(bouquetfiles)
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+
+##########################################################################
+# OpenWebif: admission
+##########################################################################
+# Copyright (C) 2011 - 2022 E2OpenPlugins
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston MA 02110-1301, USA.
+##########################################################################
+
+from collections import deque
+
+from six import ensure_str
+from twisted.internet import defer
+from Components.config import config
+
+#: classes of pages, see BaseController.getPageClass
+PAGE_CLASSES = ("cheap", "heavy", "export")
+
+#: page class -> requests of one client waiting for a slot
+ADMISSION_QUEUE = {"cheap": 32, "heavy": 4, "export": 2}
+
+#: seconds a client is asked to wait when its queue is full
+RETRY_AFTER = 5
+
+# (client, page class) -> requests running
+_running = {}
+# (client, page class) -> requests waiting
+_waiting = {}
+# page class -> requests running for all clients
+_total = dict((pageClass, 0) for pageClass in PAGE_CLASSES)
+# page class -> waiting (client, Deferred), oldest first
+_queues = dict((pageClass, deque()) for pageClass in PAGE_CLASSES)
+_stats = {"admitted": 0, "queued": 0, "rejected": 0, "cancelled": 0}
+
+
+def getClientLimit(pageClass):
+	"""
+	Get the number of requests of *pageClass* one client may run at once,
+	0 for no limit.
+	"""
+	if not config.OpenWebif.admission_control.value:
+		return 0
+	return getattr(config.OpenWebif, "admission_" + pageClass).value
+
+
+def getClient(request):
+	"""
+	Get the address of the client of *request*, as determined by the
+	AuthResource.
+	"""
+	peer = getattr(request, "peer", None) or ensure_str(request.getClientIP() or "")
+	return peer[7:] if peer.startswith("::ffff:") else peer
+
+
+def getTotalLimit(pageClass):
+	"""
+	Get the number of requests of *pageClass* all clients may run at once,
+	0 for no limit.
+	"""
+	if not config.OpenWebif.admission_control.value:
+		return 0
+	return getattr(config.OpenWebif, "admission_" + pageClass + "_total").value
+
+
+def _mayRun(client, pageClass):
+	limit = getClientLimit(pageClass)
+	total = getTotalLimit(pageClass)
+	return not (limit and _running.get((client, pageClass), 0) >= limit) and not (total and _total[pageClass] >= total)
+
+
+def _start(client, pageClass):
+	key = (client, pageClass)
+	_running[key] = _running.get(key, 0) + 1
+	_total[pageClass] += 1
+	_stats["admitted"] += 1
+
+
+def _release(client, pageClass):
+	key = (client, pageClass)
+	_running[key] -= 1
+	if not _running[key]:
+		del _running[key]
+	_total[pageClass] -= 1
+	queue = _queues[pageClass]
+	for entry in list(queue):
+		waiter, d = entry
+		# admitted requests may finish at once and wake others themselves
+		if entry in queue and _mayRun(waiter, pageClass):
+			queue.remove(entry)
+			_unwait(waiter, pageClass)
+			_start(waiter, pageClass)
+			d.callback(None)
+
+
+def _unwait(client, pageClass):
+	key = (client, pageClass)
+	_waiting[key] -= 1
+	if not _waiting[key]:
+		del _waiting[key]
+
+
+def admitRequest(request, pageClass):
+	"""
+	Let *request* of a page of *pageClass* run if its client is below the
+	limits of that class, or queue it until it is.
+
+	Returns:
+		True if the request may run now, a Deferred firing when it may run
+		or None if the queue of its client is full
+	"""
+	client = getClient(request)
+	state = {"admitted": False, "d": None}
+
+	def _finished(result):
+		if state["admitted"]:
+			_release(client, pageClass)
+		elif state["d"] is not None:
+			queue = _queues[pageClass]
+			if (client, state["d"]) in queue:
+				queue.remove((client, state["d"]))
+				_unwait(client, pageClass)
+				_stats["cancelled"] += 1
+
+	def _admitted(result):
+		state["admitted"] = True
+		return result
+
+	if _mayRun(client, pageClass):
+		_start(client, pageClass)
+		state["admitted"] = True
+		request.notifyFinish().addBoth(_finished)
+		return True
+	key = (client, pageClass)
+	if _waiting.get(key, 0) >= ADMISSION_QUEUE[pageClass]:
+		_stats["rejected"] += 1
+		return None
+	d = state["d"] = defer.Deferred().addCallback(_admitted)
+	_waiting[key] = _waiting.get(key, 0) + 1
+	_queues[pageClass].append((client, d))
+	_stats["queued"] += 1
+	request.notifyFinish().addBoth(_finished)
+	return d
+
+
+def getAdmissionStats():
+	ret = dict(_stats)
+	ret["running"] = dict(_total)
+	ret["waiting"] = dict((pageClass, len(queue)) for pageClass, queue in _queues.items())
+	ret["limits"] = dict((pageClass, getClientLimit(pageClass)) for pageClass in PAGE_CLASSES)
+	ret["totals"] = dict((pageClass, getTotalLimit(pageClass)) for pageClass in PAGE_CLASSES)
+	return ret
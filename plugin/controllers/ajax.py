@@ -45,6 +45,11 @@ class AjaxController(BaseController):
 	Ajax Web Controller
 	"""
 
+	# expensive pages which several browser tabs tend to load at once
+	coalescedPages = ("channels", "multiepg")
+	# pages limited by the admission control like the blocking pages
+	heavyPages = ("channels", "multiepg", "epgr", "movies")
+
 	def __init__(self, session, path=""):
 		BaseController.__init__(self, path=path, session=session)
 
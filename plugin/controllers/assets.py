@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+
+##########################################################################
+# OpenWebif: assets
+##########################################################################
+# Copyright (C) 2011 - 2022 E2OpenPlugins
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston MA 02110-1301, USA.
+##########################################################################
+
+from hashlib import sha1
+from io import BytesIO
+from json import dump, load
+from os import remove, stat, utime, walk
+from os.path import exists, join as pathjoin, relpath, splitext
+import gzip
+import sys
+
+#: public directories served with content hashed names
+ASSET_DIRS = ("js", "css", "modern", "themes", "vxg", "webtv")
+
+#: assets worth a pre-compressed .gz sidecar
+COMPRESSIBLE_EXTENSIONS = (".js", ".css", ".svg", ".json", ".html", ".map", ".txt", ".xml", ".ttf", ".eot", ".otf")
+
+#: smallest asset compressed
+GZIP_MIN_SIZE = 1024
+
+#: name of the manifest in the public directory
+MANIFEST_NAME = "assets.json"
+
+#: number of hex digits of the content hash in asset names
+HASH_LENGTH = 10
+
+#: Cache-Control of assets requested by their hashed name
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# url -> hashed url and back
+_manifest = {}
+_hashed = {}
+
+
+def hashedName(path, digest):
+	"""
+	Insert *digest* into *path* before the extension, e.g.
+	/js/openwebif.min.js -> /js/openwebif.min.0123456789.js
+	"""
+	base, ext = splitext(path)
+	return "%s.%s%s" % (base, digest[:HASH_LENGTH], ext)
+
+
+def loadManifest(root):
+	"""
+	Load the manifest written by buildAssets from the public directory
+	*root*. Without one, assets keep their plain names.
+	"""
+	_manifest.clear()
+	_hashed.clear()
+	try:
+		with open(pathjoin(root, MANIFEST_NAME)) as fd:
+			_manifest.update(load(fd))
+	except (IOError, OSError, ValueError):
+		return 0
+	for url, hashed in _manifest.items():
+		_hashed[hashed] = url
+	return len(_manifest)
+
+
+def assetUrl(url):
+	"""
+	Get the url to reference the asset *url* with in a page: its content
+	hashed name if it is in the manifest, *url* itself otherwise. A query
+	string (used to bust caches by hand) is dropped for hashed names. A
+	relative *url*, e.g. css/style.min.css, stays relative, so pages
+	keep working behind a reverse proxy serving them below a subpath.
+	"""
+	path = url.split("?", 1)[0]
+	if path.startswith("/"):
+		return _manifest.get(path, url)
+	hashed = _manifest.get("/" + path)
+	return hashed[1:] if hashed else url
+
+
+def resolveAsset(url):
+	"""
+	Get the plain url of the hashed asset url *url*, or None if it is not a
+	hashed name.
+	"""
+	return _hashed.get(url)
+
+
+def _compress(source, size, mtime):
+	with open(source, "rb") as fd:
+		buf = BytesIO()
+		# no timestamp in the header, so unchanged assets give the same sidecar
+		with gzip.GzipFile(fileobj=buf, mode="wb", compresslevel=9, mtime=0) as gz:
+			gz.write(fd.read())
+		data = buf.getvalue()
+	target = source + ".gz"
+	if len(data) >= size:
+		if exists(target):
+			remove(target)
+		return 0
+	with open(target, "wb") as fd:
+		fd.write(data)
+	# a sidecar older than its source is not served, see AssetFile
+	utime(target, (mtime, mtime))
+	return len(data)
+
+
+def buildAssets(root):
+	"""
+	Write the .gz sidecars of the compressible assets below *root* and the
+	manifest of their content hashed names.
+
+	Returns:
+		tuple (number of assets, bytes of the assets, bytes of their sidecars)
+	"""
+	manifest = {}
+	total = compressed = 0
+	for assetdir in ASSET_DIRS:
+		for dirpath, dirnames, filenames in walk(pathjoin(root, assetdir)):
+			dirnames.sort()
+			for filename in sorted(filenames):
+				if filename.endswith(".gz"):
+					continue
+				source = pathjoin(dirpath, filename)
+				with open(source, "rb") as fd:
+					digest = sha1(fd.read()).hexdigest()  # nosec
+				url = "/" + relpath(source, root).replace("\\", "/")
+				manifest[url] = hashedName(url, digest)
+				st = stat(source)
+				total += st.st_size
+				if filename.endswith(COMPRESSIBLE_EXTENSIONS) and st.st_size >= GZIP_MIN_SIZE:
+					compressed += _compress(source, st.st_size, st.st_mtime)
+	with open(pathjoin(root, MANIFEST_NAME), "w") as fd:
+		dump(manifest, fd, indent=0, sort_keys=True)
+	return len(manifest), total, compressed
+
+
+if __name__ == '__main__':
+	for root in sys.argv[1:]:
+		count, total, compressed = buildAssets(root)
+		print("[assets] %d assets of %d bytes in %s, %d bytes of sidecars" % (count, total, root, compressed))
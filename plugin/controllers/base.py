@@ -20,26 +20,34 @@
 # Inc., 51 Franklin Street, Fifth Floor, Boston MA 02110-1301, USA.
 ##########################################################################
 
+from os import stat
 from os.path import basename, exists
-import imp
+from time import time
 from json import dumps
+from hashlib import sha1
+from types import GeneratorType
 from six import ensure_str, ensure_binary, ensure_text, PY2
 
 from twisted.web import server, http, resource
-from twisted.web.resource import EncodingResourceWrapper
-from twisted.web.server import GzipEncoderFactory
 from twisted.internet import defer
 from twisted.protocols.basic import FileSender
 
 from Plugins.Extensions.OpenWebif.controllers.i18n import _
 from Tools.Directories import fileExists, isPluginInstalled
-from Cheetah.Template import Template
 from enigma import eEPGCache
 from Components.config import config
 
 from Plugins.Extensions.OpenWebif.controllers.models.info import getInfo
 from Plugins.Extensions.OpenWebif.controllers.models.config import getCollapsedMenus, getConfigsSections, getShowName, getCustomName, getBoxName
-from Plugins.Extensions.OpenWebif.controllers.defaults import getPublicPath, getViewsPath, EXT_EVENT_INFO_SOURCE, STB_LANG, getIP, HASAUTOTIMER, TEXTINPUTSUPPORT, WEBTV
+from Plugins.Extensions.OpenWebif.controllers.templates import renderTemplate
+from Plugins.Extensions.OpenWebif.controllers.producers import JSONProducer, NDJSONProducer, CooperativeItems, CooperativeProducer, isCooperative, CHUNK_SIZE
+from Plugins.Extensions.OpenWebif.controllers.responsecache import getResponse, putResponse
+from Plugins.Extensions.OpenWebif.controllers.singleflight import coalesce
+from Plugins.Extensions.OpenWebif.controllers.workers import runInWorker
+from Plugins.Extensions.OpenWebif.controllers.admission import admitRequest, RETRY_AFTER
+from Plugins.Extensions.OpenWebif.controllers.startup import recordStep
+from Plugins.Extensions.OpenWebif.controllers.utilities import getUrlArg, getFields, projectFields
+from Plugins.Extensions.OpenWebif.controllers.defaults import getPublicPath, getViewsPath, getCapability, EXT_EVENT_INFO_SOURCE, STB_LANG, getIP, TEXTINPUTSUPPORT
 from Components.SystemInfo import BoxInfo
 
 
@@ -58,12 +66,168 @@ def new_getRequestHostname(self):
 
 http.Request.getRequestHostname = new_getRequestHostname
 
+OSCAM_VERSION_FILES = ("/tmp/.ncam/ncam.version", "/tmp/.oscam/oscam.version")
+
+#: seconds between two checks of the oscam/ncam files
+OSCAM_CHECK_INTERVAL = 10
+
+OSCAMWEBIF = {"lastcheck": 0, "mtimes": None, "conf": None, "webif": None}
+
+# request independent part of the main template context
+MAINTEMPLATE = None
+MAINTEMPLATE_NOTIFIERS = False
+
+
+#: JSON encoder options of the output modes, see getOutputMode
+JSON_OUTPUT = {
+	"pretty": {"indent": 1},
+	"compact": {"separators": (",", ":")},
+}
+
+#: list fields sent one item per line in the ndjson output mode, with the
+#: fields of their items selected by the argument fields (see getFields)
+NDJSON_LISTS = ("events", "services", "movies", "timers")
+
+#: largest JSON body in bytes buffered to derive its ETag from the content or to cache it
+ETAG_MAX_BODY = 1048576
+
+
+def getOutputMode(request):
+	"""
+	Get the JSON output mode requested by the client, either with the
+	query parameter output=pretty|compact|ndjson or with an Accept header
+	of application/x-ndjson. Defaults to pretty.
+	"""
+	mode = getUrlArg(request, "output")
+	if mode == "ndjson" or mode in JSON_OUTPUT:
+		return mode
+	accept = request.getHeader("accept")
+	if accept and "application/x-ndjson" in accept:
+		return "ndjson"
+	return "pretty"
+
+
+def getNDJSONItems(data):
+	"""
+	Get the list of a list shaped response or None.
+	"""
+	if isinstance(data, list):
+		return data
+	if isinstance(data, dict):
+		for key in NDJSON_LISTS:
+			if isinstance(data.get(key), list):
+				return data[key]
+	return None
+
+
+def projectData(data, fields):
+	"""
+	Apply the selection of fields *fields* (see getFields) to the items of
+	a list shaped response. Handlers of large lists pass the selection to
+	their model instead, which then doesn't compute the other fields.
+	"""
+	if fields is None:
+		return data
+	if isinstance(data, CooperativeItems):
+		return CooperativeItems(projectFields(item, fields) if isinstance(item, dict) else item for item in data)
+	if isinstance(data, list):
+		return [projectFields(item, fields) if isinstance(item, dict) else item for item in data]
+	if isinstance(data, dict):
+		data = dict(data)
+		for key in NDJSON_LISTS:
+			if isinstance(data.get(key), list):
+				data[key] = projectData(data[key], fields)
+	return data
+
+
+# controller class -> {page name: handler name}
+ROUTES = {}
+
+#: page names served by another handler
+ROUTE_ALIASES = {"signal": "tunersignal"}
+
+
+class PageResource(resource.Resource):
+	"""
+	Page of a controller; renders the handler *name* of *controller*
+	without holding any request state.
+	"""
+
+	def __init__(self, controller, name):
+		resource.Resource.__init__(self)
+		self.controller = controller
+		self.name = name
+
+	def getChild(self, path, request):
+		return self.controller.getChild(path, request)
+
+	def render(self, request):
+		request.endpoint = "/%s/%s" % ("/".join(ensure_str(x, errors="replace") for x in request.prepath[:-1]), self.name or "unknown")
+		return self.controller.admitPage(request, self.name)
+
 
 class BaseController(resource.Resource):
 	"""
 	Web Base Controller
+
+	Handlers are methods named P_<page>. They are looked up once per class
+	(see getRoutes) and called on the controller instance mounted in the
+	resource tree, so they must keep request state in *request*. Handlers
+	change the rendering of their own response by setting the request
+	attributes isCustom or isImage.
+
+	A page may have a version source V_<page> returning a string which
+	changes whenever its content does. GET requests of such pages are
+	answered with 304 Not Modified before the handler is called if the
+	client already has that version. The ETag of the pages in cachedPages
+	or etagPages without version source is derived from the rendered
+	body, which is buffered for that; other pages get no ETag, so their
+	body is streamed.
+
+	The rendered responses of the pages in cachedPages, a dict
+	{page: (ttl, content sources)}, are kept in the response cache for ttl
+	seconds or until one of the sources (see versions) changes.
+
+	Identical GET requests of the pages in coalescedPages arriving while
+	the handler runs for one of them share its data (see singleflight),
+	which is then rendered and streamed for each of them. These handlers
+	must return data which can be rendered more than once, e.g. no
+	generator, and must not set isCustom.
+
+	The handlers of the pages in blockingPages run in the worker pool (see
+	workers) and must call into enigma2 through callInReactor only. Any
+	handler may also return a Deferred firing with its data, e.g. to run
+	only its blocking part with runInWorker. The handlers of coalesced,
+	blocking or deferred pages must not set isImage.
+
+	The admission control (see admission) limits the requests each client
+	may run at once per class of page: the pages in exportPages, the heavy
+	ones in heavyPages or blockingPages, and the cheap rest. Requests over
+	the limit wait for a slot; when too many wait, they are answered with
+	429 Too Many Requests.
+
+	Handlers of very large responses return a generator: JSON controllers
+	send its items as list, the others its text fragments as page. Such a
+	response, as well as JSON data holding a CooperativeItems list, is
+	generated and written in time slices by a CooperativeProducer, so it
+	doesn't stall the other requests. It has no ETag and isn't cached.
+
+	The argument fields of JSON pages, a comma separated list of names,
+	selects the fields of the items of list shaped responses (see
+	projectData); handlers pass it on to their model with getFields.
 	"""
 	isLeaf = False
+	withMainTemplate = False
+	isJson = False
+	isCustom = False
+	isGZ = False
+	isImage = False
+	cachedPages = {}
+	etagPages = ()
+	coalescedPages = ()
+	blockingPages = ()
+	heavyPages = ()
+	exportPages = ()
 
 	def __init__(self, path="", **kwargs):
 		"""
@@ -74,18 +238,20 @@ class BaseController(resource.Resource):
 			* withMainTemplate: (?)
 			* isJson: responses shall be JSON encoded
 			* isCustom: (?)
-			* isGZ: responses shall be GZIP compressed
+			* isGZ: put with putGZChild, the compression of all responses is up to the compression module
 			* isImage: (?) responses shall image
 		"""
 		resource.Resource.__init__(self)
 
 		self.path = ensure_str(path)
 		self.session = kwargs.get("session")
-		self.withMainTemplate = kwargs.get("withMainTemplate", False)
-		self.isJson = kwargs.get("isJson", False)
-		self.isCustom = kwargs.get("isCustom", False)
-		self.isGZ = kwargs.get("isGZ", False)
-		self.isImage = kwargs.get("isImage", False)
+		self.withMainTemplate = kwargs.get("withMainTemplate", self.withMainTemplate)
+		self.isJson = kwargs.get("isJson", self.isJson)
+		self.isCustom = kwargs.get("isCustom", self.isCustom)
+		self.isGZ = kwargs.get("isGZ", self.isGZ)
+		self.isImage = kwargs.get("isImage", self.isImage)
+		self.pages = {}
+		self.lazyChildren = {}
 
 	def error404(self, request):
 		"""
@@ -102,33 +268,166 @@ class BaseController(resource.Resource):
 		request.finish()
 
 	def loadTemplate(self, path, module, args):
-		if fileExists(getViewsPath(path + ".py")) or fileExists(getViewsPath(path + ".pyo")) or fileExists(getViewsPath(path + ".pyc")):
-			if fileExists(getViewsPath(path + ".pyo")):
-				template = imp.load_compiled(module, getViewsPath(path + ".pyo"))
-			elif fileExists(getViewsPath(path + ".pyc")):
-				template = imp.load_compiled(module, getViewsPath(path + ".pyc"))
-			else:
-				template = imp.load_source(module, getViewsPath(path + ".py"))
-			mod = getattr(template, module, None)
-			if callable(mod):
-				return str(mod(searchList=args))
-		elif fileExists(getViewsPath(path + ".tmpl")):
-			vp = str(getViewsPath(path + ".tmpl"))
-			return str(Template(file=vp, searchList=[args]))
-		return None
+		return renderTemplate(getViewsPath(path), module, args)
 
 	def putChild2(self, path, child):
 		self.putChild(ensure_binary(path), child)
 
 	def putGZChild(self, path, child):
+		# responses of all resources are compressed by the policy of the compression module
 		child.isGZ = True
-		self.putChild(ensure_binary(path), EncodingResourceWrapper(child, [GzipEncoderFactory()]))
+		self.putChild(ensure_binary(path), child)
+
+	def putLazyChild(self, path, factory, isGZ=False):
+		"""
+		Mount the resource returned by *factory* at *path* on the first
+		request to it, so its modules are imported when it is used instead
+		of while enigma2 boots. The child is not mounted if *factory*
+		returns None.
+		"""
+		self.lazyChildren[ensure_binary(path)] = (factory, isGZ)
+
+	def getChildWithDefault(self, path, request):
+		if path in self.lazyChildren and path not in self.children:
+			factory, isGZ = self.lazyChildren[path]
+			started = time()
+			child = factory()
+			del self.lazyChildren[path]
+			recordStep("mount", "/" + ensure_str(path), time() - started)
+			if child is not None:
+				if isGZ:
+					self.putGZChild(path, child)
+				else:
+					self.putChild(path, child)
+		return resource.Resource.getChildWithDefault(self, path, request)
+
+	def getRoutes(self):
+		"""
+		Get the dispatch table {page name: handler name} of this controller
+		class, built on first use from its P_* methods and NoDataRender.
+		"""
+		routes = ROUTES.get(self.__class__)
+		if routes is None:
+			routes = {}
+			for name in dir(self.__class__):
+				if name.startswith("P_") and callable(getattr(self.__class__, name)):
+					routes[name[2:]] = name
+			for name in self.NoDataRender():
+				routes[name] = "noData"
+			for alias, name in ROUTE_ALIASES.items():
+				if name in routes:
+					routes[alias] = routes[name]
+			ROUTES[self.__class__] = routes
+		return routes
 
 	def getChild(self, path, request):
-		if self.isGZ:
-			return EncodingResourceWrapper(self.__class__(self.session, path), [GzipEncoderFactory()])
-		else:
-			return self.__class__(self.session, path)
+		name = ensure_str(path).replace(".", "") or "index"
+		if name not in self.getRoutes():
+			# one shared page for all unknown names, so clients can't grow self.pages
+			name = None
+		page = self.pages.get(name)
+		if page is None:
+			page = self.pages[name] = PageResource(self, name)
+		return page
+
+	def getVariant(self, request):
+		"""
+		Get the parts of *request* selecting the rendered response.
+		"""
+		args = tuple((key, tuple(value)) for key, value in sorted(request.args.items()))
+		return (request.path, args, getOutputMode(request) if self.isJson else None)
+
+	def getFields(self, request):
+		"""
+		Get the fields of list items selected by *request*, see getFields.
+		Pages rendered by templates need all fields. A handler reading the
+		argument fields in its own way sets the selection as request.fields.
+		"""
+		if not self.isJson:
+			return None
+		if hasattr(request, "fields"):
+			return request.fields
+		return getFields(request.args)
+
+	def makeETag(self, request, version):
+		"""
+		Get a strong ETag for *version* of the response to *request*.
+		"""
+		parts = (self.getVariant(request), version, "gzip" in ensure_str(request.getHeader("accept-encoding") or ""))
+		return ensure_binary('"%s"' % sha1(ensure_binary(repr(parts))).hexdigest())
+
+	def cacheResponse(self, request, key, body, version):
+		"""
+		Put the rendered *body* of a cached page into the response cache.
+
+		Returns:
+			hex digest of *body*
+		"""
+		digest = sha1(body).hexdigest()
+		if key is not None:
+			ttl, sources = self.cachedPages[key[0]]
+			contentType = request.responseHeaders.getRawHeaders(b"content-type", [None])[-1]
+			putResponse(key, body, contentType, digest, ttl, sources, version)
+		return digest
+
+	def renderView(self, request, path, data):
+		"""
+		Render the template of page *path* with *data*, embedded into the
+		main template if withMainTemplate is set.
+
+		Returns:
+			rendered page as string or None if the template does not exist
+		"""
+		module = ensure_text(request.path)
+		if module[-1:] == "/":
+			module += "index"
+		elif module[-5:] != "index" and path == "index":
+			module += "/index"
+		module = module.strip("/")
+		module = module.replace(".", "")
+		out = self.loadTemplate(module, path, data)
+		if out is not None and self.withMainTemplate:
+			args = self.prepareMainTemplate(request)
+			args["content"] = out
+			nout = self.loadTemplate("main", "main", args)
+			if nout:
+				out = nout
+		return out
+
+	def callHandler(self, request, func, path):
+		"""
+		Call the handler *func* of page *path*, in the worker pool for the
+		pages in blockingPages.
+
+		Returns:
+			data of the page or a Deferred firing with it
+		"""
+		if path in self.blockingPages:
+			return runInWorker(func, request)
+		return func(request)
+
+	def deliverData(self, data, request, path, cacheKey, version, hashBody):
+		"""
+		Send the *data* of a handler which returned a Deferred, see
+		writeData.
+		"""
+		if request._disconnected:
+			return
+		body = self.writeData(data, request, path, cacheKey, version, hashBody)
+		if body is not server.NOT_DONE_YET:
+			if request.method != b"HEAD":
+				request.write(body)
+			request.finish()
+
+	def deliverFailure(self, failure, request):
+		print("[OpenWebif] page '%s' failed: %s" % (request.uri, failure.getErrorMessage()))
+		if request._disconnected:
+			return
+		request.setResponseCode(http.INTERNAL_SERVER_ERROR)
+		if self.isJson:
+			request.setHeader("content-type", "application/json; charset=utf-8")
+			request.write(ensure_binary(dumps({"result": False, "request": ensure_str(request.path), "exception": repr(failure.value)})))
+		request.finish()
 
 	def NoDataRender(self):
 		return []
@@ -137,49 +436,68 @@ class BaseController(resource.Resource):
 		return {}
 
 	def render(self, request):
+		request.endpoint = "/" + "/".join(ensure_str(x, errors="replace") for x in request.prepath)
+		return self.admitPage(request, self.path.replace(".", "") or "index")
 
-		@defer.inlineCallbacks
-		def _showImage(data):
-
-			@defer.inlineCallbacks
-			def _setContentDispositionAndSend(file_path):
-				filename = basename(file_path)
-				request.setHeader('content-disposition', 'filename="%s"' % filename)
-				request.setHeader('content-type', "image/png")
-				f = open(file_path, "rb")
-				yield FileSender().beginFileTransfer(f, request)
-				f.close()
-				defer.returnValue(0)
-
-			if exists(data):
-				yield _setContentDispositionAndSend(data)
-			else:
-				request.setResponseCode(http.NOT_FOUND)
+	def getPageClass(self, path):
+		"""
+		Get the class of page *path* for the admission control.
+		"""
+		if path in self.exportPages:
+			return "export"
+		if path in self.heavyPages or path in self.blockingPages:
+			return "heavy"
+		return "cheap"
 
-			request.finish()
-			defer.returnValue(0)
+	def admitPage(self, request, path):
+		"""
+		Render the page *path* as soon as the admission control lets
+		*request* run.
+		"""
+		admitted = admitRequest(request, self.getPageClass(path))
+		if admitted is True:
+			return self.renderPage(request, path)
+		if admitted is None:
+			request.setResponseCode(429, b"Too Many Requests")
+			request.setHeader("retry-after", str(RETRY_AFTER))
+			if self.isJson:
+				request.setHeader("content-type", "application/json; charset=utf-8")
+				return ensure_binary(dumps({"result": False, "request": ensure_str(request.path), "message": "Too many requests"}))
+			request.setHeader("content-type", "text/plain")
+			return b"429 Too many requests"
+
+		def _render(result):
+			if request._disconnected:
+				return
+			body = self.renderPage(request, path)
+			if body is not server.NOT_DONE_YET:
+				if request.method != b"HEAD":
+					request.setHeader(b"content-length", b"%d" % len(body))
+					request.write(body)
+				request.finish()
+
+		admitted.addCallback(_render).addErrback(self.deliverFailure, request)
+		return server.NOT_DONE_YET
+
+	def renderPage(self, request, path):
+		"""
+		Render the page *path* of this controller.
+
+		Args:
+			request (twisted.web.server.Request): HTTP request object
+			path: page name or None for an unknown page
+		"""
+		if path in ROUTE_ALIASES:
+			request.uri = request.uri.replace(ensure_binary(path), ensure_binary(ROUTE_ALIASES[path]))
+			request.path = request.path.replace(ensure_binary(path), ensure_binary(ROUTE_ALIASES[path]))
+			path = ROUTE_ALIASES[path]
 
-		# cache data
-		_withmaintemplate = self.withMainTemplate
-		_path = self.path
-		_iscustom = self.isCustom
-		_isimage = self.isImage
-
-		if self.path == "":
-			self.path = "index"
-		elif self.path == "signal":
-			self.path = "tunersignal"
-			request.uri = request.uri.replace(b'signal', b'tunersignal')
-			request.path = request.path.replace(b'signal', b'tunersignal')
-
-		self.suppresslog = False
-		self.path = self.path.replace(".", "")
 		if request.path.startswith(b'/api/config'):
 			func = getattr(self, "P_config", None)
-		elif self.path in self.NoDataRender():
-			func = getattr(self, "noData", None)
+		elif path is not None:
+			func = getattr(self, self.getRoutes()[path], None)
 		else:
-			func = getattr(self, "P_" + self.path, None)
+			func = None
 
 		if callable(func):
 			request.setResponseCode(http.OK)
@@ -189,66 +507,138 @@ class BaseController(resource.Resource):
 			if callable(plfunc):
 				plfunc(request)
 
-			data = func(request)
-			if data is None:
-				# if not self.suppresslog:
-					# print("[OpenWebif] page '%s' without content" % request.uri)
-				self.error404(request)
-			elif self.isCustom:
-				# if not self.suppresslog:
-					# print("[OpenWebif] page '%s' ok (custom)" % request.uri)
-				request.write(ensure_binary(data))
-				request.finish()
-			elif self.isImage:
-				_showImage(data)
-			elif self.isJson:
-				request.setHeader("content-type", "application/json; charset=utf-8")
-				try:
-					return ensure_binary(dumps(data, indent=1))
-				except Exception as exc:
-					request.setResponseCode(http.INTERNAL_SERVER_ERROR)
-					return ensure_binary(dumps({"result": False, "request": request.path, "exception": repr(exc)}))
-					pass
-			elif isinstance(data, str):
-				# if not self.suppresslog:
-					# print("[OpenWebif] page '%s' ok (simple string)" % request.uri)
-				request.setHeader("content-type", "text/plain")
-				request.write(ensure_binary(data))
-				request.finish()
+			# pages with a version source get their ETag before rendering, cached and etag pages from the body
+			isGet = request.method in (b"GET", b"HEAD")
+			vfunc = getattr(self, "V_%s" % path, None) if isGet and path else None
+			version = vfunc(request) if callable(vfunc) else None
+			hashBody = isGet and version is None and (path in self.cachedPages or path in self.etagPages)
+			if version is not None and request.setETag(self.makeETag(request, version)) == http.CACHED:
+				return b""
+
+			cacheKey = None
+			if path in self.cachedPages and isGet:
+				cacheKey = (path, self.getVariant(request))
+				cached = getResponse(cacheKey, version)
+				if cached is not None:
+					body, contentType, digest = cached
+					if contentType is not None:
+						request.setHeader(b"content-type", contentType)
+					if hashBody and request.setETag(self.makeETag(request, digest)) == http.CACHED:
+						return b""
+					return body
+
+			if path in self.coalescedPages and isGet:
+				key = (self.__class__.__name__, path, self.getVariant(request), ensure_str(request.getUser()))
+				data = coalesce(key, self.callHandler, request, func, path)
 			else:
-				# print("[OpenWebif] page '%s' ok (cheetah template)" % request.uri)
-				module = ensure_text(request.path)
-				if module[-1:] == "/":
-					module += "index"
-				elif module[-5:] != "index" and self.path == "index":
-					module += "/index"
-				module = module.strip("/")
-				module = module.replace(".", "")
-				out = self.loadTemplate(module, self.path, data)
-				if out is None:
-					print("[OpenWebif] ERROR! Template not found for page '%s'" % request.uri)
-					self.error404(request)
-				else:
-					if self.withMainTemplate:
-						args = self.prepareMainTemplate(request)
-						args["content"] = out
-						nout = self.loadTemplate("main", "main", args)
-						if nout:
-							out = nout
-					elif self.isGZ:
-						return out
-					request.write(ensure_binary(out))
-					request.finish()
+				data = self.callHandler(request, func, path)
+			if isinstance(data, defer.Deferred):
+				data.addCallback(self.deliverData, request, path, cacheKey, version, hashBody)
+				data.addErrback(self.deliverFailure, request)
+				return server.NOT_DONE_YET
+			return self.writeData(data, request, path, cacheKey, version, hashBody)
+
+		print("[OpenWebif] page '%s' not found" % request.uri)
+		self.error404(request)
+		return server.NOT_DONE_YET
+
+	@defer.inlineCallbacks
+	def sendImage(self, request, data):
+		"""
+		Send the image file *data*.
+		"""
+
+		@defer.inlineCallbacks
+		def _setContentDispositionAndSend(file_path):
+			filename = basename(file_path)
+			request.setHeader('content-disposition', 'filename="%s"' % filename)
+			request.setHeader('content-type', "image/png")
+			f = open(file_path, "rb")
+			yield FileSender().beginFileTransfer(f, request)
+			f.close()
+			defer.returnValue(0)
 
+		if exists(data):
+			yield _setContentDispositionAndSend(data)
 		else:
-			print("[OpenWebif] page '%s' not found" % request.uri)
-			self.error404(request)
+			request.setResponseCode(http.NOT_FOUND)
+
+		request.finish()
+		defer.returnValue(0)
+
+	def writeData(self, data, request, path, cacheKey, version, hashBody):
+		"""
+		Render the *data* returned by the handler of page *path* and send
+		it, streamed unless it is needed whole for the response cache or
+		the ETag.
 
-		# restore cached data
-		self.withMainTemplate = _withmaintemplate
-		self.path = _path
-		self.isCustom = _iscustom
-		self.isImage = _isimage
+		Returns:
+			the body for twisted to send or NOT_DONE_YET
+		"""
+		if data is None:
+			# if not getattr(request, "suppresslog", False):
+				# print("[OpenWebif] page '%s' without content" % request.uri)
+			self.error404(request)
+		elif getattr(request, "isCustom", self.isCustom):
+			# if not getattr(request, "suppresslog", False):
+				# print("[OpenWebif] page '%s' ok (custom)" % request.uri)
+			request.write(ensure_binary(data))
+			request.finish()
+		elif getattr(request, "isImage", self.isImage):
+			self.sendImage(request, data)
+		elif self.isJson:
+			mode = getOutputMode(request)
+			if isinstance(data, GeneratorType):
+				data = CooperativeItems(data)
+			data = projectData(data, self.getFields(request))
+			items = getNDJSONItems(data) if mode == "ndjson" else None
+			try:
+				if items is not None:
+					request.setHeader("content-type", "application/x-ndjson; charset=utf-8")
+					producer = NDJSONProducer(request, items)
+				else:
+					request.setHeader("content-type", "application/json; charset=utf-8")
+					producer = JSONProducer(request, data, **JSON_OUTPUT.get(mode, JSON_OUTPUT["compact"]))
+				if isCooperative(data):
+					CooperativeProducer(request, producer.chunks).start()
+					return server.NOT_DONE_YET
+				body = producer.start(ETAG_MAX_BODY if hashBody or cacheKey else CHUNK_SIZE)
+			except Exception as exc:
+				request.setResponseCode(http.INTERNAL_SERVER_ERROR)
+				return ensure_binary(dumps({"result": False, "request": ensure_str(request.path), "exception": repr(exc)}))
+			if body is not None:
+				digest = self.cacheResponse(request, cacheKey, body, version)
+				if hashBody and request.setETag(self.makeETag(request, digest)) == http.CACHED:
+					return b""
+				return body
+		elif isinstance(data, str):
+			# if not getattr(request, "suppresslog", False):
+				# print("[OpenWebif] page '%s' ok (simple string)" % request.uri)
+			request.setHeader("content-type", "text/plain")
+			data = ensure_binary(data)
+			if hashBody and request.setETag(self.makeETag(request, sha1(data).hexdigest())) == http.CACHED:
+				return b""
+			request.write(data)
+			request.finish()
+		elif isinstance(data, GeneratorType):
+			# the handler yields the text of the page, sent in time slices
+			CooperativeProducer(request, data).start()
+			return server.NOT_DONE_YET
+		else:
+			# print("[OpenWebif] page '%s' ok (cheetah template)" % request.uri)
+			out = self.renderView(request, path, data)
+			if out is None:
+				print("[OpenWebif] ERROR! Template not found for page '%s'" % request.uri)
+				self.error404(request)
+			else:
+				out = ensure_binary(out)
+				digest = self.cacheResponse(request, cacheKey, out, version)
+				if hashBody and request.setETag(self.makeETag(request, digest)) == http.CACHED:
+					return b""
+				if self.isGZ:
+					return out
+				request.write(out)
+				request.finish()
 
 		return server.NOT_DONE_YET
 
@@ -258,7 +648,7 @@ class BaseController(resource.Resource):
 		owebif = False
 		oport = None
 		variant = "oscam"
-		for file in ["/tmp/.ncam/ncam.version", "/tmp/.oscam/oscam.version"]:
+		for file in OSCAM_VERSION_FILES:
 			if fileExists(file):  # nosec
 				if "ncam" in file:
 					variant = "ncam"
@@ -285,27 +675,25 @@ class BaseController(resource.Resource):
 						continue
 		return owebif, oport, opath, variant
 
-	def prepareMainTemplate(self, request):
-		# here will be generated the dictionary for the main template
-		ret = getCollapsedMenus()
-		ret['configsections'] = getConfigsSections()['sections']
-		ret['showname'] = getShowName()['showname']
-		ret['customname'] = getCustomName()['customname']
-		ret['boxname'] = getBoxName()['boxname']
-		if not ret['boxname'] or not ret['customname']:
-			ret['boxname'] = getInfo()['brand'] + " " + getInfo()['model']
-		ret['box'] = BoxInfo.getItem("model")
-		if hasattr(eEPGCache, 'FULL_DESCRIPTION_SEARCH'):
-			ret['epgsearchcaps'] = True
-		else:
-			ret['epgsearchcaps'] = False
-		extras = [{'key': 'ajax/settings', 'description': _("Settings")}]
+	def oscamWebif(self):
+		"""
+		Get protocol, port and variant of a running oscam/ncam web interface.
 
-		ip = getIP()
-		if ip != None and isPluginInstalled("LCD4linux", "WebSite"):
-			lcd4linux_key = "lcd4linux/config"
-			if lcd4linux_key:
-				extras.append({'key': lcd4linux_key, 'description': _("LCD4Linux Setup"), 'nw': '1'})
+		The version and config files are parsed again only if one of them
+		changed, which is checked at most every OSCAM_CHECK_INTERVAL seconds.
+
+		Returns:
+			tuple (proto, port, variant) or None
+		"""
+		now = time()
+		if now - OSCAMWEBIF["lastcheck"] < OSCAM_CHECK_INTERVAL:
+			return OSCAMWEBIF["webif"]
+		OSCAMWEBIF["lastcheck"] = now
+		mtimes = [_getMtime(file) for file in OSCAM_VERSION_FILES]
+		if OSCAMWEBIF["conf"]:
+			mtimes.append(_getMtime(OSCAMWEBIF["conf"]))
+		if mtimes == OSCAMWEBIF["mtimes"]:
+			return OSCAMWEBIF["webif"]
 
 		oscamwebif, port, oscamconf, variant = self.oscamconfPath()
 
@@ -328,77 +716,154 @@ class BaseController(resource.Resource):
 			except OSError:
 				pass
 
-		if oscamwebif and port is not None:
+		OSCAMWEBIF["conf"] = oscamconf
+		OSCAMWEBIF["mtimes"] = [_getMtime(file) for file in OSCAM_VERSION_FILES]
+		if oscamconf:
+			OSCAMWEBIF["mtimes"].append(_getMtime(oscamconf))
+		OSCAMWEBIF["webif"] = (proto, port, variant) if oscamwebif and port is not None else None
+		return OSCAMWEBIF["webif"]
+
+	def prepareMainTemplate(self, request):
+		# here will be generated the dictionary for the main template
+		ret = dict(getMainTemplateStatic())
+		extras = list(ret['extras_head'])
+		webif = self.oscamWebif()
+		if webif is not None:
+			proto, port, variant = webif
 			url = "%s://%s:%s" % (proto, request.getRequestHostname(), port)
 			if variant == "oscam":
 				extras.append({'key': url, 'description': _("OSCam Webinterface"), 'nw': '1'})
 			elif variant == "ncam":
 				extras.append({'key': url, 'description': _("NCam Webinterface"), 'nw': '1'})
+		extras.extend(ret['extras_tail'])
+		del ret['extras_head']
+		del ret['extras_tail']
+		ret['extras'] = extras
+		return ret
 
-		if HASAUTOTIMER:
-			extras.append({'key': 'ajax/at', 'description': _('AutoTimers')})
-
-		extras.append({'key': 'ajax/bqe', 'description': _('BouquetEditor')})
-
-		try:
-			from Plugins.Extensions.EPGRefresh.EPGRefresh import epgrefresh  # noqa: F401
-			extras.append({'key': 'ajax/epgr', 'description': _('EPGRefresh')})
-		except ImportError:
-			pass
-
-		try:
-			# this will currenly only works if NO Webiterface plugin installed
-			# TODO: test if webinterface AND openwebif installed
-
-			# 'nw'='1' -> target _blank
-			# 'nw'='2' -> target popup
-			# 'nw'=None -> target _self
-
-			# syntax
-			# addExternalChild( (Link, Resource, Name, Version, HasGUI, WebTarget) )
-			# example addExternalChild( ("webadmin", root, "WebAdmin", 1, True, "_self") )
-
-			from Plugins.Extensions.OpenWebif.WebChilds.Toplevel import loaded_plugins
-			for plugins in loaded_plugins:
-				if plugins[0] in ["fancontrol", "iptvplayer"]:
-					try:
-						extras.append({'key': plugins[0], 'description': plugins[2], 'nw': '2'})
-					except KeyError:
-						pass
-				elif len(plugins) > 4 and plugins[4] is True:
-					try:
-						if len(plugins) > 5 and plugins[5] == "_self":
-							extras.append({'key': plugins[0], 'description': plugins[2]})
-						else:
-							extras.append({'key': plugins[0], 'description': plugins[2], 'nw': '1'})
-					except KeyError:
-						pass
-
-		except ImportError:
-			pass
-
-		if exists('/usr/bin/shellinaboxd'):
-			extras.append({'key': 'ajax/terminal', 'description': _('Terminal')})
 
-		ret['extras'] = extras
-		theme = 'original'
-		if config.OpenWebif.webcache.theme.value:
-			theme = config.OpenWebif.webcache.theme.value
-		if not exists(getPublicPath('themes')):
-			if not (theme == 'original' or theme == 'clear'):
-				theme = 'original'
-				config.OpenWebif.webcache.theme.value = theme
-				config.OpenWebif.webcache.theme.save()
-		ret['theme'] = theme
-		moviedb = config.OpenWebif.webcache.moviedb.value if config.OpenWebif.webcache.moviedb.value else EXT_EVENT_INFO_SOURCE
+def _getMtime(filename):
+	try:
+		return stat(filename).st_mtime
+	except OSError:
+		return None
+
+
+def invalidateMainTemplate(configElement=None):
+	global MAINTEMPLATE
+	MAINTEMPLATE = None
+
+
+def getMainTemplateStatic():
+	"""
+	Get the part of the main template context which does not depend on the
+	request. It is built once and dropped again by invalidateMainTemplate
+	whenever one of the config items it depends on changes.
+	"""
+	global MAINTEMPLATE, MAINTEMPLATE_NOTIFIERS
+	if MAINTEMPLATE is not None:
+		return MAINTEMPLATE
+
+	if not MAINTEMPLATE_NOTIFIERS:
+		MAINTEMPLATE_NOTIFIERS = True
+		for item in (
+			config.OpenWebif.webcache.collapsedmenus, config.OpenWebif.identifier, config.OpenWebif.identifier_custom,
+			config.OpenWebif.identifier_text, config.OpenWebif.webcache.theme, config.OpenWebif.webcache.moviedb,
+			config.OpenWebif.webcache.smallremote, config.OpenWebif.displayTracebacks
+		):
+			item.addNotifier(invalidateMainTemplate, initial_call=False)
+
+	ret = getCollapsedMenus()
+	ret['configsections'] = getConfigsSections()['sections']
+	ret['showname'] = getShowName()['showname']
+	ret['customname'] = getCustomName()['customname']
+	ret['boxname'] = getBoxName()['boxname']
+	if not ret['boxname'] or not ret['customname']:
+		ret['boxname'] = getInfo()['brand'] + " " + getInfo()['model']
+	ret['box'] = BoxInfo.getItem("model")
+	if hasattr(eEPGCache, 'FULL_DESCRIPTION_SEARCH'):
+		ret['epgsearchcaps'] = True
+	else:
+		ret['epgsearchcaps'] = False
+	extras = [{'key': 'ajax/settings', 'description': _("Settings")}]
+
+	ip = getIP()
+	if ip != None and isPluginInstalled("LCD4linux", "WebSite"):
+		lcd4linux_key = "lcd4linux/config"
+		if lcd4linux_key:
+			extras.append({'key': lcd4linux_key, 'description': _("LCD4Linux Setup"), 'nw': '1'})
+
+	# the oscam/ncam link is inserted here by prepareMainTemplate
+	ret['extras_head'] = extras
+	extras = []
+
+	if getCapability("HASAUTOTIMER"):
+		extras.append({'key': 'ajax/at', 'description': _('AutoTimers')})
+
+	extras.append({'key': 'ajax/bqe', 'description': _('BouquetEditor')})
+
+	try:
+		from Plugins.Extensions.EPGRefresh.EPGRefresh import epgrefresh  # noqa: F401
+		extras.append({'key': 'ajax/epgr', 'description': _('EPGRefresh')})
+	except ImportError:
+		pass
+
+	try:
+		# this will currenly only works if NO Webiterface plugin installed
+		# TODO: test if webinterface AND openwebif installed
+
+		# 'nw'='1' -> target _blank
+		# 'nw'='2' -> target popup
+		# 'nw'=None -> target _self
+
+		# syntax
+		# addExternalChild( (Link, Resource, Name, Version, HasGUI, WebTarget) )
+		# example addExternalChild( ("webadmin", root, "WebAdmin", 1, True, "_self") )
+
+		from Plugins.Extensions.OpenWebif.WebChilds.Toplevel import loaded_plugins
+		for plugins in loaded_plugins:
+			if plugins[0] in ["fancontrol", "iptvplayer"]:
+				try:
+					extras.append({'key': plugins[0], 'description': plugins[2], 'nw': '2'})
+				except KeyError:
+					pass
+			elif len(plugins) > 4 and plugins[4] is True:
+				try:
+					if len(plugins) > 5 and plugins[5] == "_self":
+						extras.append({'key': plugins[0], 'description': plugins[2]})
+					else:
+						extras.append({'key': plugins[0], 'description': plugins[2], 'nw': '1'})
+				except KeyError:
+					pass
+
+	except ImportError:
+		pass
+
+	if exists('/usr/bin/shellinaboxd'):
+		extras.append({'key': 'ajax/terminal', 'description': _('Terminal')})
+
+	ret['extras_tail'] = extras
+	theme = 'original'
+	if config.OpenWebif.webcache.theme.value:
+		theme = config.OpenWebif.webcache.theme.value
+	if not exists(getPublicPath('themes')):
+		if not (theme == 'original' or theme == 'clear'):
+			theme = 'original'
+			config.OpenWebif.webcache.theme.value = theme
+			config.OpenWebif.webcache.theme.save()
+	ret['theme'] = theme
+	moviedb = config.OpenWebif.webcache.moviedb.value
+	if not moviedb:
+		moviedb = EXT_EVENT_INFO_SOURCE
 		config.OpenWebif.webcache.moviedb.value = moviedb
 		config.OpenWebif.webcache.moviedb.save()
-		ret['moviedb'] = moviedb
-		ret['webtv'] = WEBTV
-		ret['stbLang'] = STB_LANG
-		smallremote = config.OpenWebif.webcache.smallremote.value if config.OpenWebif.webcache.smallremote.value else 'new'
-		ret['smallremote'] = smallremote
-		ret['textinputsupport'] = TEXTINPUTSUPPORT
-		ret['debugModeEnabled'] = config.OpenWebif.displayTracebacks.value == True
-
-		return ret
+	ret['moviedb'] = moviedb
+	ret['webtv'] = getCapability("WEBTV")
+	ret['stbLang'] = STB_LANG
+	smallremote = config.OpenWebif.webcache.smallremote.value if config.OpenWebif.webcache.smallremote.value else 'new'
+	ret['smallremote'] = smallremote
+	ret['textinputsupport'] = TEXTINPUTSUPPORT
+	ret['debugModeEnabled'] = config.OpenWebif.displayTracebacks.value == True
+
+	MAINTEMPLATE = ret
+	return ret
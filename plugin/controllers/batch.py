@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+
+##########################################################################
+# OpenWebif: batch
+##########################################################################
+# Copyright (C) 2011 - 2022 E2OpenPlugins
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston MA 02110-1301, USA.
+##########################################################################
+
+from json import loads
+
+from six import ensure_binary, ensure_str, string_types
+from twisted.internet import defer
+from twisted.web import http
+from twisted.web.http_headers import Headers
+
+from Plugins.Extensions.OpenWebif.controllers.workers import runInWorker
+
+#: maximum number of sub-requests of a batch
+BATCH_MAX_REQUESTS = 20
+
+#: pages which can't be part of a batch
+BATCH_EXCLUDED = ("batch", "profile")
+
+
+class BatchRequest(object):
+	"""
+	Stand-in for the request of a sub-request of a batch. Path and args
+	are its own and its response headers and code are kept to itself,
+	everything else is taken from the request of the batch.
+	"""
+	isCustom = False
+	isImage = False
+
+	def __init__(self, request, path, args):
+		self.request = request
+		self.path = ensure_binary("/api/" + path)
+		self.uri = self.path
+		self.args = args
+		self.code = http.OK
+		self.responseHeaders = Headers()
+		self.written = False
+
+	def __getattr__(self, name):
+		return getattr(self.request, name)
+
+	def setResponseCode(self, code, message=None):
+		self.code = code
+
+	def setHeader(self, name, value):
+		self.responseHeaders.setRawHeaders(ensure_binary(name), [ensure_binary(value)])
+
+	def write(self, data):
+		self.written = True
+
+	def finish(self):
+		self.written = True
+
+
+def parseBatch(request):
+	"""
+	Get the sub-requests of a batch from the JSON body of *request* or its
+	argument requests, a list of objects with the page name as path, an
+	optional object args and an optional id naming it in the response.
+
+	Returns:
+		list of tuples (id, page name, args in the format of request.args)
+	Raises:
+		ValueError: the batch is malformed or too large
+	"""
+	body = request.content.read() if request.method == b"POST" and request.content is not None else b""
+	if not body.strip():
+		body = request.args.get(b"requests", [b""])[0]
+	batch = loads(ensure_str(body))
+	if not isinstance(batch, list):
+		raise ValueError("a batch is a list of requests")
+	if len(batch) > BATCH_MAX_REQUESTS:
+		raise ValueError("a batch has at most %d requests" % BATCH_MAX_REQUESTS)
+	ret = []
+	for index, sub in enumerate(batch):
+		if isinstance(sub, string_types):
+			sub = {"path": sub}
+		if not isinstance(sub, dict) or not isinstance(sub.get("path"), string_types):
+			raise ValueError("request %d has no path" % index)
+		if not isinstance(sub.get("args") or {}, dict):
+			raise ValueError("the args of request %d are no object" % index)
+		path = sub["path"].split("?", 1)[0]
+		if path.startswith("/api/"):
+			path = path[5:]
+		path = path.strip("/").replace(".", "")
+		args = {}
+		for key, value in (sub.get("args") or {}).items():
+			values = value if isinstance(value, list) else [value]
+			args[ensure_binary(key)] = [ensure_binary(value if isinstance(value, string_types) else str(value)) for value in values]
+		ret.append((str(sub.get("id", path)), path, args))
+	return ret
+
+
+def runBatch(controller, request, batch):
+	"""
+	Dispatch the sub-requests of *batch* to the page handlers of
+	*controller*. A failing sub-request only fails its own response.
+
+	Returns:
+		Deferred firing with the dict {id: response}
+	"""
+	routes = controller.getRoutes()
+
+	def _failed(failure, key):
+		return key, {"result": False, "code": http.INTERNAL_SERVER_ERROR, "error": failure.getErrorMessage()}
+
+	def _done(data, key, subrequest):
+		if subrequest.isCustom or subrequest.isImage or subrequest.written:
+			return key, {"result": False, "code": http.NOT_ACCEPTABLE, "error": "not available in a batch"}
+		if data is None:
+			return key, {"result": False, "code": http.NOT_FOUND, "error": "no content"}
+		return key, data
+
+	results = []
+	for key, path, args in batch:
+		if path not in routes or path in BATCH_EXCLUDED:
+			results.append(defer.succeed((key, {"result": False, "code": http.NOT_FOUND, "error": "unknown page %s" % path})))
+			continue
+		subrequest = BatchRequest(request, path, args)
+		func = getattr(controller, routes[path])
+		if path in controller.blockingPages:
+			d = runInWorker(func, subrequest)
+		else:
+			d = defer.maybeDeferred(func, subrequest)
+		results.append(d.addCallback(_done, key, subrequest).addErrback(_failed, key))
+
+	def _collect(responses):
+		ret = {}
+		for index, (key, response) in enumerate(responses):
+			ret[key if key not in ret else "%s#%d" % (key, index)] = response
+		return ret
+
+	return defer.gatherResults(results).addCallback(_collect)
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+##########################################################################
+# OpenWebif: compression
+##########################################################################
+# Copyright (C) 2011 - 2022 E2OpenPlugins
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston MA 02110-1301, USA.
+##########################################################################
+
+from multiprocessing import cpu_count
+from os import getloadavg
+from time import time
+import re
+import zlib
+
+from six import ensure_str
+from twisted.web import http
+from Components.config import config
+
+#: content types compressed, checked by prefix
+COMPRESSIBLE_TYPES = (
+	"text/", "application/json", "application/x-ndjson", "application/javascript",
+	"application/xml", "application/rss+xml", "application/x-mpegurl", "application/vnd.apple.mpegurl",
+	"image/svg+xml"
+)
+
+#: content types never compressed, although they match COMPRESSIBLE_TYPES
+STREAMING_TYPES = ("text/event-stream",)
+
+#: (load per CPU below which, compression level) for the level "auto"
+AUTO_LEVELS = ((0.5, 6), (1.0, 3))
+
+#: compression level of "auto" above the highest load of AUTO_LEVELS
+AUTO_LEVEL_MIN = 1
+
+#: seconds between two checks of the system load
+LOAD_CHECK_INTERVAL = 5
+
+_acceptsGzip = re.compile(r"(?:^|[\s,])gzip\s*(?:$|,|;\s*q=(?!0(?:\.0*)?\s*(?:$|,)))")
+_load = {"level": AUTO_LEVELS[0][1], "lastcheck": 0.0}
+_stats = {"compressed": 0, "skipped": 0, "bytesin": 0, "bytesout": 0}
+
+
+def getCompressionLevel():
+	"""
+	Get the zlib level of the setting compression, 0 if it is off. The
+	level "auto" lowers the level when the CPU is busy.
+	"""
+	level = config.OpenWebif.compression.value
+	if level == "off":
+		return 0
+	if level != "auto":
+		return int(level)
+	now = time()
+	if now - _load["lastcheck"] >= LOAD_CHECK_INTERVAL:
+		_load["lastcheck"] = now
+		try:
+			load = getloadavg()[0] / (cpu_count() or 1)
+		except OSError:
+			load = 0.0
+		_load["level"] = AUTO_LEVEL_MIN
+		for maxload, level in AUTO_LEVELS:
+			if load < maxload:
+				_load["level"] = level
+				break
+	return _load["level"]
+
+
+def _header(request, name):
+	return ensure_str(request.responseHeaders.getRawHeaders(name, [b""])[-1])
+
+
+class CompressionEncoder(object):
+	"""
+	Request encoder deciding at the first write whether to gzip the
+	response, when its headers and the size of the body or of its first
+	chunk are known.
+	"""
+
+	def __init__(self, request, level):
+		self.request = request
+		self.level = level
+		self.compressor = None
+		self.decided = False
+
+	def decide(self, data):
+		request = self.request
+		self.decided = True
+		if request.code != http.OK or _header(request, b"content-encoding"):
+			return
+		contentType = _header(request, b"content-type").lower()
+		if not contentType.startswith(COMPRESSIBLE_TYPES) or contentType.startswith(STREAMING_TYPES):
+			return
+		request.setHeader(b"vary", b"Accept-Encoding")
+		length = _header(request, b"content-length")
+		size = int(length) if length.isdigit() else len(data)
+		if size < config.OpenWebif.compression_minsize.value or not _acceptsGzip.search(ensure_str(b",".join(request.requestHeaders.getRawHeaders(b"accept-encoding", [])))):
+			_stats["skipped"] += 1
+			return
+		request.setHeader(b"content-encoding", b"gzip")
+		request.responseHeaders.removeHeader(b"content-length")
+		self.compressor = zlib.compressobj(self.level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+		_stats["compressed"] += 1
+
+	def encode(self, data):
+		if not self.decided:
+			self.decide(data)
+		if self.compressor is None:
+			return data
+		_stats["bytesin"] += len(data)
+		data = self.compressor.compress(data)
+		_stats["bytesout"] += len(data)
+		return data
+
+	def finish(self):
+		if self.compressor is None:
+			return b""
+		data = self.compressor.flush()
+		self.compressor = None
+		_stats["bytesout"] += len(data)
+		return data
+
+
+def getEncoder(request):
+	"""
+	Get the CompressionEncoder of *request*, None if compression is off.
+	"""
+	level = getCompressionLevel()
+	return CompressionEncoder(request, level) if level else None
+
+
+def getCompressionStats():
+	ret = dict(_stats)
+	ret["level"] = getCompressionLevel()
+	ret["ratio"] = float(ret["bytesout"]) / ret["bytesin"] if ret["bytesin"] else 0.0
+	return ret
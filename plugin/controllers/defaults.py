@@ -4,6 +4,8 @@ from os.path import dirname, exists, isdir, isfile, join as pathjoin, islink
 import sys
 from glob import glob
 from re import search, MULTILINE
+from time import time
+from six import PY2
 
 from Components.Language import language
 from Components.config import config as comp_config
@@ -11,6 +13,7 @@ from Components.Network import iNetwork
 from Tools.Directories import isPluginInstalled
 from Components.SystemInfo import BoxInfo
 from Plugins.Extensions.OpenWebif import __version__
+from Plugins.Extensions.OpenWebif.controllers.startup import recordStep
 
 OPENWEBIFVER = "OWIF %s" % __version__
 
@@ -139,16 +142,8 @@ def getIP():
 	return None
 
 
-PICON_PATH = getPiconPath()
-
 EXT_EVENT_INFO_SOURCE = getExtEventInfoProvider()
 
-TRANSCODING = getTranscoding()
-
-VXGENABLED = isfile(getPublicPath("/vxg/media_player.pexe"))
-
-WEBTV = VXGENABLED or TRANSCODING
-
 
 def getOpenwebifPackageVersion():
 	control = glob('/var/lib/opkg/info/*openwebif.control')
@@ -172,7 +167,7 @@ def getAutoTimer():
 
 
 def getAutoTimerChangeResource():
-	if HASAUTOTIMER:
+	if getCapability("HASAUTOTIMER"):
 		try:
 			from Plugins.Extensions.AutoTimer.AutoTimerResource import AutoTimerChangeResource  # noqa: F401
 			return True
@@ -183,7 +178,7 @@ def getAutoTimerChangeResource():
 
 
 def getAutoTimerTestResource():
-	if HASAUTOTIMER:
+	if getCapability("HASAUTOTIMER"):
 		try:
 			from Plugins.Extensions.AutoTimer.AutoTimerResource import AutoTimerTestResource  # noqa: F401
 			return True
@@ -271,23 +266,50 @@ def getCustomCSS(css):
 	return ""
 
 
-OPENWEBIFPACKAGEVERSION = getOpenwebifPackageVersion()
-
-USERCSSCLASSIC = getCustomCSS("classic")
-
-USERCSSMODERN = getCustomCSS("modern")
-
-HASAUTOTIMER = getAutoTimer()
-
-HASAUTOTIMERCHANGE = getAutoTimerChangeResource()
-
-HASAUTOTIMERTEST = getAutoTimerTestResource()
-
-HASVPS = getVPSPlugin()
-
-HASSERIES = getSeriesPlugin()
-
-ATSEARCHTYPES = getATSearchtypes()
+#: capabilities of the box and of the installed plugins, probed on their
+#: first use (see __getattr__) instead of while enigma2 boots
+PROBES = {
+	"PICON_PATH": getPiconPath,
+	"TRANSCODING": getTranscoding,
+	"VXGENABLED": lambda: isfile(getPublicPath("/vxg/media_player.pexe")),
+	"WEBTV": lambda: getCapability("VXGENABLED") or getCapability("TRANSCODING"),
+	"OPENWEBIFPACKAGEVERSION": getOpenwebifPackageVersion,
+	"USERCSSCLASSIC": lambda: getCustomCSS("classic"),
+	"USERCSSMODERN": lambda: getCustomCSS("modern"),
+	"HASAUTOTIMER": getAutoTimer,
+	"HASAUTOTIMERCHANGE": getAutoTimerChangeResource,
+	"HASAUTOTIMERTEST": getAutoTimerTestResource,
+	"HASVPS": getVPSPlugin,
+	"HASSERIES": getSeriesPlugin,
+	"ATSEARCHTYPES": getATSearchtypes,
+}
+
+
+def __getattr__(name):
+	"""
+	Probe the capability *name* of PROBES on its first use and keep the
+	result as attribute of this module.
+	"""
+	probe = PROBES.get(name)
+	if probe is None:
+		raise AttributeError("module %r has no attribute %r" % (__name__, name))
+	started = time()
+	value = globals()[name] = probe()
+	recordStep("probe", name, time() - started)
+	return value
+
+
+def getCapability(name):
+	"""
+	Get the capability *name* of PROBES, e.g. within this module, where
+	__getattr__ is not used for global names.
+	"""
+	return globals()[name] if name in globals() else __getattr__(name)
+
+
+if PY2:
+	# modules have no __getattr__ before Python 3.7
+	list(map(__getattr__, PROBES))
 
 TEXTINPUTSUPPORT = getTextInputSupport()
 
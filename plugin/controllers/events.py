@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+
+##########################################################################
+# OpenWebif: events
+##########################################################################
+# Copyright (C) 2011 - 2022 E2OpenPlugins
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston MA 02110-1301, USA.
+##########################################################################
+
+from json import dumps
+
+from six import ensure_binary, ensure_str
+from twisted.internet import reactor
+from twisted.internet.task import LoopingCall
+from twisted.web import resource, server
+from Components.config import config
+
+from Plugins.Extensions.OpenWebif.controllers.models.info import getStatusInfo, getFrontendStatus
+from Plugins.Extensions.OpenWebif.controllers.models.volume import getVolumeStatus
+from Plugins.Extensions.OpenWebif.controllers.versions import versionListeners, getVersion
+
+#: topic -> seconds between two polls of its state, 0 if it is only
+#: updated by events; the signal has no event and is polled
+TOPIC_INTERVALS = {"status": 0, "volume": 0, "signal": 2, "versions": 0}
+
+#: content sources of the topic versions
+VERSION_SOURCES = ("timers", "bouquets", "movies", "epg")
+
+#: seconds after an event until the state is computed, so a burst of
+#: events costs one computation
+EVENT_DELAY = 0.2
+
+#: seconds between two keep-alive comments to the subscribers
+KEEPALIVE_INTERVAL = 15
+
+# subscribed request -> topics
+_subscribers = {}
+_state = {"session": None, "poll": None, "ticks": 0, "pending": set(), "delayed": None, "seq": 0}
+# topic -> last state sent
+_states = {}
+_stats = {"computations": 0, "events": 0, "writes": 0}
+
+
+def _computeState(topic):
+	_stats["computations"] += 1
+	if topic == "status":
+		return getStatusInfo(None)
+	elif topic == "volume":
+		ret = getVolumeStatus()
+		return {"current": ret["current"], "ismute": ret["ismute"]}
+	elif topic == "signal":
+		return getFrontendStatus(_state["session"])
+	return dict((source, getVersion(source)) for source in VERSION_SOURCES)
+
+
+def _format(topic, data):
+	_state["seq"] += 1
+	return ensure_binary("id: %d\nevent: %s\ndata: %s\n\n" % (_state["seq"], topic, dumps(data)))
+
+
+def _send(subscribers, data):
+	for request in subscribers:
+		request.write(data)
+		_stats["writes"] += 1
+
+
+def refreshTopic(topic):
+	"""
+	Compute the state of *topic* and push what changed to its subscribers.
+	"""
+	subscribers = [request for request, topics in _subscribers.items() if topic in topics]
+	if not subscribers:
+		_states.pop(topic, None)
+		return
+	try:
+		new = _computeState(topic)
+	except Exception as exc:
+		print("[OpenWebif] event state of '%s' failed: %s" % (topic, exc))
+		return
+	old = _states.get(topic) or {}
+	delta = dict((key, value) for key, value in new.items() if key not in old or old[key] != value)
+	for key in old:
+		if key not in new:
+			delta[key] = None
+	_states[topic] = new
+	if delta:
+		_stats["events"] += 1
+		_send(subscribers, _format(topic, delta))
+
+
+def _refreshPending():
+	_state["delayed"] = None
+	pending = _state["pending"]
+	_state["pending"] = set()
+	for topic in pending:
+		refreshTopic(topic)
+
+
+def notifyTopic(topic):
+	"""
+	Tell the subscribers of *topic* that its state changed soon.
+	"""
+	if not _subscribers:
+		return
+	_state["pending"].add(topic)
+	if _state["delayed"] is None:
+		_state["delayed"] = reactor.callLater(EVENT_DELAY, _refreshPending)
+
+
+def _poll():
+	_state["ticks"] += 1
+	ticks = _state["ticks"]
+	for topic, interval in TOPIC_INTERVALS.items():
+		if interval and ticks % interval == 0:
+			refreshTopic(topic)
+	if ticks % KEEPALIVE_INTERVAL == 0:
+		_send(list(_subscribers), b": keep-alive\n\n")
+
+
+def _serviceEvent(*args):
+	notifyTopic("status")
+
+
+def _volumeChanged(configElement):
+	notifyTopic("volume")
+	notifyTopic("status")
+
+
+def _leftStandby():
+	notifyTopic("status")
+
+
+def _standbyChanged(configElement):
+	notifyTopic("status")
+	from Screens.Standby import inStandby
+	if inStandby is not None and _leftStandby not in inStandby.onClose:
+		inStandby.onClose.append(_leftStandby)
+
+
+def _versionChanged(source):
+	if source in VERSION_SOURCES:
+		notifyTopic("versions")
+
+
+def _startEvents(session):
+	_state["session"] = session
+	if _state["poll"] is not None:
+		return
+	nav = getattr(session, "nav", None)
+	for event in (getattr(nav, "event", None), getattr(nav, "record_event", None)):
+		if event is not None:
+			event.append(_serviceEvent)
+	versionListeners.append(_versionChanged)
+	# the volume is saved to the settings on every change
+	config.audio.volume.addNotifier(_volumeChanged, initial_call=False)
+	config.misc.standbyCounter.addNotifier(_standbyChanged, initial_call=False)
+	_state["poll"] = LoopingCall(_poll)
+
+
+def subscribe(session, request, topics):
+	"""
+	Subscribe *request* to *topics* and send it their last state. The
+	state of all topics is computed and polled only while there are
+	subscribers, once for all of them.
+	"""
+	_startEvents(session)
+	_subscribers[request] = topics
+	for topic in topics:
+		state = _states.get(topic)
+		if state is None:
+			try:
+				state = _states[topic] = _computeState(topic)
+			except Exception as exc:
+				print("[OpenWebif] event state of '%s' failed: %s" % (topic, exc))
+				continue
+		request.write(_format(topic, state))
+	if not _state["poll"].running:
+		_state["poll"].start(1, now=False)
+
+
+def unsubscribe(request):
+	_subscribers.pop(request, None)
+	for topic in list(_states):
+		if not any(topic in topics for topics in _subscribers.values()):
+			del _states[topic]
+	if not _subscribers and _state["poll"] is not None and _state["poll"].running:
+		_state["poll"].stop()
+
+
+def getEventStats():
+	ret = dict(_stats)
+	ret["subscribers"] = len(_subscribers)
+	return ret
+
+
+class EventsResource(resource.Resource):
+	"""
+	Server-Sent Events stream of the box state. The argument topics selects
+	a comma separated subset of status, volume, signal and versions. The
+	first event of each topic holds its whole state, later ones only the
+	keys which changed.
+	"""
+	isLeaf = True
+
+	def __init__(self, session):
+		resource.Resource.__init__(self)
+		self.session = session
+
+	def render_GET(self, request):
+		request.endpoint = "/api/events"
+		topics = [topic for topic in ensure_str(request.args.get(b"topics", [b""])[0]).split(",") if topic in TOPIC_INTERVALS] or sorted(TOPIC_INTERVALS)
+		request.setHeader("content-type", "text/event-stream; charset=utf-8")
+		request.setHeader("cache-control", "no-cache")
+		request.setHeader("x-accel-buffering", "no")
+		request.notifyFinish().addBoth(lambda result: unsubscribe(request))
+		subscribe(self.session, request, topics)
+		return server.NOT_DONE_YET
@@ -27,11 +27,12 @@ from six.moves.urllib.parse import quote
 from json import dumps
 from six import ensure_binary
 
-from twisted.web import static, resource, http
+from twisted.web import static, resource, http, server
 
 from Screens.LocationBox import defaultInhibitDirs
 from Components.config import config
 from Plugins.Extensions.OpenWebif.controllers.utilities import lenient_force_utf_8, sanitise_filename_slashes, getUrlArg
+from Plugins.Extensions.OpenWebif.controllers.workers import runInWorker
 
 
 def new_getRequestHostname(self):
@@ -85,54 +86,76 @@ class FileController(resource.Resource):
 			else:
 				return "wrong action parameter"
 
+		# globbing large directories blocks, so the listings are made in the worker pool
 		path = getUrlArg(request, "dir")
 		if path != None:
-			pattern = '*'
-			nofiles = False
 			pattern = getUrlArg(request, "pattern", "*")
 			nofiles = getUrlArg(request, "nofiles") != None
-			directories = []
-			files = []
-			request.setHeader("content-type", "application/json; charset=utf-8")
-			if exists(path):
-				if path == '/':
-					path = ''
-				try:
-					files = glob(path + '/' + pattern)
-				except OSError:
-					files = []
-				files.sort()
-				tmpfiles = files[:]
-				for x in tmpfiles:
-					if isdir(x):
-						directories.append(x + '/')
-						files.remove(x)
-				if nofiles:
-					files = []
-				return ensure_binary(dumps({"result": True, "dirs": directories, "files": files}, indent=2))
-			else:
-				return ensure_binary(dumps({"result": False, "message": "path %s not exits" % (path)}, indent=2))
+			return self.renderJSON(request, runInWorker(listDirectory, path, pattern, nofiles), indent=2)
 
 		tree = "tree" in request.args
 		path = getUrlArg(request, "id")
 		if tree:
-			request.setHeader("content-type", "application/json; charset=utf-8")
-			directories = []
-			if path is None or path == "#":
-				path = "/"
-			if exists(path):
-				if path == "/":
-					path = ""
-				try:
-					files = glob(path + '/*')
-				except OSError:
-					files = []
-				files.sort()
-				tmpfiles = files[:]
-				for x in tmpfiles:
-					if isdir(x) and x not in defaultInhibitDirs:
-						directories.append({"id": x, "text": basename(x), "children": True})
-			if path == "":
-				return ensure_binary(dumps([{"id": "/", "text": "Root", "children": directories}]))
-			else:
-				return ensure_binary(dumps([{"id": path, "text": basename(path), "children": directories}]))
+			return self.renderJSON(request, runInWorker(listTree, path))
+
+	def renderJSON(self, request, d, **kwargs):
+		request.setHeader("content-type", "application/json; charset=utf-8")
+
+		def _write(data):
+			if not request._disconnected:
+				request.write(ensure_binary(dumps(data, **kwargs)))
+				request.finish()
+
+		def _failed(failure):
+			print("[OpenWebif] file listing '%s' failed: %s" % (request.uri, failure.getErrorMessage()))
+			if not request._disconnected:
+				request.setResponseCode(http.INTERNAL_SERVER_ERROR)
+				request.finish()
+
+		d.addCallbacks(_write, _failed)
+		return server.NOT_DONE_YET
+
+
+def listDirectory(path, pattern, nofiles):
+	directories = []
+	files = []
+	if exists(path):
+		if path == '/':
+			path = ''
+		try:
+			files = glob(path + '/' + pattern)
+		except OSError:
+			files = []
+		files.sort()
+		tmpfiles = files[:]
+		for x in tmpfiles:
+			if isdir(x):
+				directories.append(x + '/')
+				files.remove(x)
+		if nofiles:
+			files = []
+		return {"result": True, "dirs": directories, "files": files}
+	else:
+		return {"result": False, "message": "path %s not exits" % (path)}
+
+
+def listTree(path):
+	directories = []
+	if path is None or path == "#":
+		path = "/"
+	if exists(path):
+		if path == "/":
+			path = ""
+		try:
+			files = glob(path + '/*')
+		except OSError:
+			files = []
+		files.sort()
+		tmpfiles = files[:]
+		for x in tmpfiles:
+			if isdir(x) and x not in defaultInhibitDirs:
+				directories.append({"id": x, "text": basename(x), "children": True})
+	if path == "":
+		return [{"id": "/", "text": "Root", "children": directories}]
+	else:
+		return [{"id": path, "text": basename(path), "children": directories}]
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+
+##########################################################################
+# OpenWebif: metrics
+##########################################################################
+# Copyright (C) 2011 - 2022 E2OpenPlugins
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston MA 02110-1301, USA.
+##########################################################################
+
+from bisect import bisect_left
+
+#: upper bounds in seconds of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+#: upper bounds in bytes of the response size histogram buckets
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+#: upper bounds in seconds of the TLS handshake histogram buckets
+HANDSHAKE_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+#: number of endpoints tracked separately, further ones are counted as "other"
+METRICS_MAX_ENDPOINTS = 300
+
+# endpoint -> [{code: count}, latency buckets, latency sum, size buckets, size sum]
+_endpoints = {}
+# "full" or "resumed" -> [handshake buckets, handshake sum]
+_handshakes = {}
+
+
+def recordRequest(endpoint, code, duration, size):
+	"""
+	Count a finished request.
+
+	Args:
+		endpoint: name of the endpoint, e.g. /api/getservices
+		code: HTTP status code or "aborted"
+		duration: seconds from the start of processing to the end of the response
+		size: bytes of the response body sent
+	"""
+	entry = _endpoints.get(endpoint)
+	if entry is None:
+		if len(_endpoints) >= METRICS_MAX_ENDPOINTS:
+			endpoint = "other"
+			entry = _endpoints.get(endpoint)
+		if entry is None:
+			entry = _endpoints[endpoint] = [{}, [0] * (len(LATENCY_BUCKETS) + 1), 0.0, [0] * (len(SIZE_BUCKETS) + 1), 0]
+	entry[0][code] = entry[0].get(code, 0) + 1
+	entry[1][bisect_left(LATENCY_BUCKETS, duration)] += 1
+	entry[2] += duration
+	entry[3][bisect_left(SIZE_BUCKETS, size)] += 1
+	entry[4] += size
+
+
+def recordHandshake(duration, resumed):
+	"""
+	Count a finished TLS handshake of the HTTPS listener.
+
+	Args:
+		duration: seconds from the connection to the end of the handshake
+		resumed: True if the client resumed an earlier TLS session
+	"""
+	kind = "resumed" if resumed else "full"
+	entry = _handshakes.get(kind)
+	if entry is None:
+		entry = _handshakes[kind] = [[0] * (len(HANDSHAKE_BUCKETS) + 1), 0.0]
+	entry[0][bisect_left(HANDSHAKE_BUCKETS, duration)] += 1
+	entry[1] += duration
+
+
+def _label(value):
+	return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _histogram(lines, name, labels, bounds, buckets, total):
+	count = 0
+	for bound, value in zip(bounds, buckets):
+		count += value
+		lines.append('%s_bucket{%s,le="%s"} %d' % (name, labels, bound, count))
+	count += buckets[-1]
+	lines.append('%s_bucket{%s,le="+Inf"} %d' % (name, labels, count))
+	lines.append('%s_sum{%s} %s' % (name, labels, total))
+	lines.append('%s_count{%s} %d' % (name, labels, count))
+
+
+def getPrometheusMetrics():
+	"""
+	Get the request metrics in the Prometheus text exposition format. All
+	the formatting is done here, so recording stays cheap.
+	"""
+	endpoints = sorted(_endpoints.items())
+	lines = [
+		"# HELP openwebif_requests_total Requests by endpoint and status code.",
+		"# TYPE openwebif_requests_total counter"
+	]
+	for endpoint, entry in endpoints:
+		for code, count in sorted(entry[0].items(), key=lambda item: str(item[0])):
+			lines.append('openwebif_requests_total{endpoint="%s",code="%s"} %d' % (_label(endpoint), code, count))
+	lines.append("# HELP openwebif_request_duration_seconds Time to respond to a request.")
+	lines.append("# TYPE openwebif_request_duration_seconds histogram")
+	for endpoint, entry in endpoints:
+		_histogram(lines, "openwebif_request_duration_seconds", 'endpoint="%s"' % _label(endpoint), LATENCY_BUCKETS, entry[1], entry[2])
+	lines.append("# HELP openwebif_response_size_bytes Size of the response body.")
+	lines.append("# TYPE openwebif_response_size_bytes histogram")
+	for endpoint, entry in endpoints:
+		_histogram(lines, "openwebif_response_size_bytes", 'endpoint="%s"' % _label(endpoint), SIZE_BUCKETS, entry[3], entry[4])
+	if _handshakes:
+		lines.append("# HELP openwebif_tls_handshake_duration_seconds Time of the TLS handshakes of the HTTPS listener.")
+		lines.append("# TYPE openwebif_tls_handshake_duration_seconds histogram")
+		for kind, entry in sorted(_handshakes.items()):
+			_histogram(lines, "openwebif_tls_handshake_duration_seconds", 'session="%s"' % kind, HANDSHAKE_BUCKETS, entry[0], entry[1])
+	return "\n".join(lines) + "\n"
@@ -42,7 +42,7 @@ from Tools.Directories import fileExists
 from enigma import eDVBVolumecontrol, eServiceCenter, eServiceReference, getEnigmaVersionString, eGetEnigmaDebugLvl, getE2Rev
 from Tools.StbHardware import getFPVersion, getBoxProc, getBoxProcType, getHWSerial, getBoxRCType
 from Plugins.Extensions.OpenWebif.controllers.i18n import _
-from Plugins.Extensions.OpenWebif.controllers.defaults import OPENWEBIFVER, TRANSCODING, TEXTINPUTSUPPORT, LCD, GRABPIP
+from Plugins.Extensions.OpenWebif.controllers.defaults import OPENWEBIFVER, TEXTINPUTSUPPORT, LCD, GRABPIP, getCapability
 from Plugins.Extensions.OpenWebif.controllers.utilities import removeBad, removeBad2
 from Plugins.Extensions.OpenWebif.controllers.epg import EPG
 from Tools.OEMInfo import getOEMShowDisplayModel, getOEMShowDisplayBrand, getOEMShowModel
@@ -474,7 +474,7 @@ def getInfo(session=None, need_fullinfo=False):
 					})
 	# TODO: fstab
 
-	info["transcoding"] = TRANSCODING
+	info["transcoding"] = getCapability("TRANSCODING")
 
 	info['EX'] = ''
 
@@ -685,7 +685,7 @@ def getStatusInfo(self):
 	statusinfo = {
 		'volume': vcontrol.getVolume(),
 		'muted': vcontrol.isMuted(),
-		'transcoding': TRANSCODING,
+		'transcoding': getCapability("TRANSCODING"),
 		'currservice_filename': "",
 		'currservice_id': -1,
 	}
@@ -34,7 +34,7 @@ from Components.MovieList import MovieList
 from Tools.Directories import fileExists
 from Screens.MovieSelection import defaultMoviePath
 from Plugins.Extensions.OpenWebif.controllers.i18n import _
-from Plugins.Extensions.OpenWebif.controllers.utilities import getUrlArg2, PY3
+from Plugins.Extensions.OpenWebif.controllers.utilities import getUrlArg2, wantsField, projectFields, PY3
 from Components.MovieList import moviePlayState
 
 
@@ -92,19 +92,11 @@ def ConvertDesc(desc):
 		return text_type(desc, 'utf_8', errors='ignore').encode('utf_8', 'ignore')
 
 
-def getMovieList(rargs=None, locations=None, directory=None):
-	movieliste = []
-	tag = None
-	fields = None
-	internal = None
-	bookmarklist = []
-
-	if rargs:
-		tag = getUrlArg2(rargs, "tag")
-		directory = getUrlArg2(rargs, "dirname")
-		fields = getUrlArg2(rargs, "fields")
-		internal = getUrlArg2(rargs, "internal")
-
+def getMovieDirectory(directory=None):
+	"""
+	Get the normalized movie directory with a trailing slash, the default
+	movie path if *directory* is None.
+	"""
 	if directory is None:
 		directory = defaultMoviePath()
 	else:
@@ -122,7 +114,46 @@ def getMovieList(rargs=None, locations=None, directory=None):
 	elif directory.startswith("/hdd/movie/"):
 		directory = directory.replace("/hdd/movie/", "/media/hdd/movie/")
 
-	directory = join(directory, "")
+	return join(directory, "")
+
+
+def getMovieSubdirs(directory):
+	"""
+	Walk the movie *directory*, which does not call into enigma2 and may
+	run in a worker thread.
+
+	Returns:
+		tuple (list of absolute paths, list of paths relative to *directory*)
+	"""
+	dirs = []
+	locations = []
+	if PY3:
+		from glob import glob
+		for subdirpath in glob(directory + "**/", recursive=True):
+			locations.append(subdirpath)
+			subdirpath = subdirpath[len(directory):]
+			dirs.append(subdirpath)
+	else:
+		# FIXME SLOW!!!
+		for subdirpath in [x[0] for x in walk(directory)]:
+			locations.append(subdirpath)
+			subdirpath = subdirpath[len(directory):]
+			dirs.append(subdirpath)
+	return locations, dirs
+
+
+def getMovieList(rargs=None, locations=None, directory=None, subdirs=None, fields=None):
+	movieliste = []
+	tag = None
+	internal = None
+	bookmarklist = []
+
+	if rargs:
+		tag = getUrlArg2(rargs, "tag")
+		directory = getUrlArg2(rargs, "dirname")
+		internal = getUrlArg2(rargs, "internal")
+
+	directory = getMovieDirectory(directory)
 
 	if not isdir(directory):
 		return {
@@ -143,20 +174,8 @@ def getMovieList(rargs=None, locations=None, directory=None):
 	brecursive = False
 	if rargs and b"recursive" in list(rargs.keys()):
 		brecursive = True
-		dirs = []
-		locations = []
-		if PY3:
-			from glob import glob
-			for subdirpath in glob(directory + "**/", recursive=True):
-				locations.append(subdirpath)
-				subdirpath = subdirpath[len(directory):]
-				dirs.append(subdirpath)
-		else:
-			# FIXME SLOW!!!
-			for subdirpath in [x[0] for x in walk(directory)]:
-				locations.append(subdirpath)
-				subdirpath = subdirpath[len(directory):]
-				dirs.append(subdirpath)
+		# subdirs may have been collected by getMovieSubdirs in a worker thread
+		locations, dirs = subdirs if subdirs is not None else getMovieSubdirs(directory)
 
 		for f in sorted(dirs):
 			if f != '':
@@ -238,10 +257,10 @@ def getMovieList(rargs=None, locations=None, directory=None):
 
 				if length_minutes:
 					movie['length'] = "%d:%02d" % (length_minutes / 60, length_minutes % 60)
-					if fields is None or 'pos' in fields:
+					if wantsField(fields, 'lastseen'):
 						movie['lastseen'] = moviePlayState(filename + '.cuts', serviceref, length_minutes) or 0
 
-				if fields is None or 'desc' in fields:
+				if wantsField(fields, 'description', 'descriptionExtended'):
 					txtfile = name + '.txt'
 					if ext.lower() != '.ts' and isfile(txtfile):
 						with open(txtfile, "rb") as handle:
@@ -256,7 +275,7 @@ def getMovieList(rargs=None, locations=None, directory=None):
 					desc = info.getInfoString(serviceref, iServiceInformation.sDescription)
 					movie['description'] = ConvertDesc(desc)
 
-				if fields is None or 'size' in fields:
+				if wantsField(fields, 'filesize', 'filesize_readable'):
 					size = 0
 					sz = ''
 
@@ -274,7 +293,7 @@ def getMovieList(rargs=None, locations=None, directory=None):
 					movie['filesize'] = size
 					movie['filesize_readable'] = sz
 
-				movieliste.append(movie)
+				movieliste.append(projectFields(movie, fields))
 #		del movielist
 
 	if locations is None:
@@ -301,9 +320,9 @@ def getMovieList(rargs=None, locations=None, directory=None):
 		}
 
 
-def getAllMovies():
+def getAllMovies(fields=None):
 	locations = config.movielist.videodirs.value[:] or []
-	return getMovieList(locations=locations)
+	return getMovieList(locations=locations, fields=fields)
 
 
 def removeMovie(session, sRef, Force=False):
@@ -38,9 +38,9 @@ from Screens.InfoBar import InfoBar
 from Tools.Directories import fileExists
 
 from Plugins.Extensions.OpenWebif.controllers.models.info import GetWithAlternative, getOrbitalText, getOrb
-from Plugins.Extensions.OpenWebif.controllers.utilities import parse_servicereference, SERVICE_TYPE_LOOKUP, NS_LOOKUP, PY3
+from Plugins.Extensions.OpenWebif.controllers.utilities import parse_servicereference, wantsField, projectFields, SERVICE_TYPE_LOOKUP, NS_LOOKUP, PY3
 from Plugins.Extensions.OpenWebif.controllers.i18n import _, tstrings
-from Plugins.Extensions.OpenWebif.controllers.defaults import PICON_PATH
+from Plugins.Extensions.OpenWebif.controllers.defaults import getCapability
 from Plugins.Extensions.OpenWebif.controllers.epg import EPG
 
 try:
@@ -547,8 +547,11 @@ def getChannels(idbouquet, stype):
 	return {"channels": ret}
 
 
-def getServices(sRef, showAll=True, showHidden=False, pos=0, showProviders=False, picon=False, noiptv=False, removeNameFromsref=False):
+def getServices(sRef, showAll=True, showHidden=False, pos=0, showProviders=False, picon=False, noiptv=False, removeNameFromsref=False, fields=None, excludeprogram=False, excludevod=False):
 	starttime = datetime.now()
+	# the providers, picons and the start positions are only looked up if selected
+	showProviders = showProviders and wantsField(fields, "provider")
+	picon = picon and wantsField(fields, "picon")
 	services = []
 	allproviders = {}
 	CalcPos = False
@@ -561,6 +564,7 @@ def getServices(sRef, showAll=True, showHidden=False, pos=0, showProviders=False
 		CalcPos = True
 	elif ' "bouquets.tv" ' in sRef:
 		CalcPos = True
+	CalcPos = CalcPos and wantsField(fields, "startpos")
 
 	if showProviders:
 		s_type = service_types_tv
@@ -598,6 +602,9 @@ def getServices(sRef, showAll=True, showHidden=False, pos=0, showProviders=False
 		if noiptv:
 			if '4097:' in sref or '5002:' in sref or 'http%3a' in sref or 'https%3a' in sref:
 				showiptv = False
+		# video on demand of IPTV providers, e.g. http%3a//host/movie/user/password/1234.mkv
+		if excludevod and ('/movie/' in sitem[0] or '/series/' in sitem[0]):
+			showiptv = False
 
 		flags = int(sitem[0].split(":")[1])
 		sp = flags & 256  # (sitem[0][:7] == '1:832:D') or (sitem[0][:7] == '1:832:1') or (sitem[0][:6] == '1:320:')
@@ -614,13 +621,14 @@ def getServices(sRef, showAll=True, showHidden=False, pos=0, showProviders=False
 					service['picon'] = getPicon(sr)
 				service['servicename'] = convertUnicode(sitem[1])
 				service['servicereference'] = sr
-				service['program'] = int(service['servicereference'].split(':')[3], 16)
+				if not excludeprogram:
+					service['program'] = int(service['servicereference'].split(':')[3], 16)
 				if showProviders:
 					if sitem[0] in allproviders:
 						service['provider'] = allproviders[sitem[0]]
 					else:
 						service['provider'] = ""
-				services.append(service)
+				services.append(projectFields(service, fields))
 
 	timeelapsed = datetime.now() - starttime
 	return {
@@ -631,7 +639,7 @@ def getServices(sRef, showAll=True, showHidden=False, pos=0, showProviders=False
 	}
 
 
-def getAllServices(type, noiptv=False, nolastscanned=False, removeNameFromsref=False, showAll=True, showProviders=False):
+def getAllServices(type, noiptv=False, nolastscanned=False, removeNameFromsref=False, showAll=True, showProviders=False, excludeprogram=False, excludevod=False):
 	starttime = datetime.now()
 	services = []
 	if type is None:
@@ -641,7 +649,7 @@ def getAllServices(type, noiptv=False, nolastscanned=False, removeNameFromsref=F
 	for bouquet in bouquets:
 		if nolastscanned and 'LastScanned' in bouquet[0]:
 			continue
-		sv = getServices(sRef=bouquet[0], showAll=showAll, showHidden=False, pos=pos, showProviders=showProviders, noiptv=noiptv, removeNameFromsref=removeNameFromsref)
+		sv = getServices(sRef=bouquet[0], showAll=showAll, showHidden=False, pos=pos, showProviders=showProviders, noiptv=noiptv, removeNameFromsref=removeNameFromsref, excludeprogram=excludeprogram, excludevod=excludevod)
 		services.append({
 			"servicereference": bouquet[0],
 			"servicename": bouquet[1],
@@ -876,13 +884,24 @@ def getSimilarEpg(sRef, eventId, encode=False):
 	return getChannelEpg(sRef, None, None, encode, eventId)
 
 
-def getBouquetEpg(bqRef, begintime=-1, endtime=-1, encode=False):
-
+def getBouquetEpg(bqRef, begintime=-1, endtime=-1, encode=False, fields=None):
 	bqRef = unquote(bqRef)
-	ret = []
 	services = eServiceCenter.getInstance().list(eServiceReference(bqRef))
 	if not services:
-		return {"events": ret, "result": False}
+		return {"events": [], "result": False}
+	return {"events": list(iterBouquetEpg(bqRef, begintime, endtime, encode, fields)), "result": True}
+
+
+def iterBouquetEpg(bqRef, begintime=-1, endtime=-1, encode=False, fields=None):
+	"""
+	Generate the events of the bouquet with the unquoted reference *bqRef*
+	one by one, converting each only when it is needed, e.g. by a
+	CooperativeProducer. Descriptions, service names and genres are only
+	fetched from the EPG if *fields* selects them.
+	"""
+	services = eServiceCenter.getInstance().list(eServiceReference(bqRef))
+	if not services:
+		return
 
 	epg = EPG()
 
@@ -893,7 +912,14 @@ def getBouquetEpg(bqRef, begintime=-1, endtime=-1, encode=False):
 	if endtime > 100000:
 		endtime = -1
 
-	search = ['IBDCTSERNW']
+	query = "IBDCT"
+	query += "S" if wantsField(fields, "shortdesc") else ""
+	query += "E" if wantsField(fields, "longdesc") else ""
+	query += "R"
+	query += "N" if wantsField(fields, "sname") else ""
+	query += "W" if wantsField(fields, "genre", "genreid") else ""
+	column = dict((key, index) for index, key in enumerate(query))
+	search = [query]
 	for service in services.getContent('S'):
 		search.append((service, 0, begintime, endtime))
 
@@ -905,15 +931,17 @@ def getBouquetEpg(bqRef, begintime=-1, endtime=-1, encode=False):
 			ev['begin_timestamp'] = event[1]
 			ev['duration_sec'] = event[2]
 			ev['title'] = filterName(event[4], encode)
-			ev['shortdesc'] = convertDesc(event[5], encode)
-			ev['longdesc'] = convertDesc(event[6], encode)
-			ev['sref'] = event[7]
-			ev['sname'] = filterName(event[8], encode)
+			if "S" in column:
+				ev['shortdesc'] = convertDesc(event[column["S"]], encode)
+			if "E" in column:
+				ev['longdesc'] = convertDesc(event[column["E"]], encode)
+			ev['sref'] = event[column["R"]]
+			if "N" in column:
+				ev['sname'] = filterName(event[column["N"]], encode)
 			ev['now_timestamp'] = event[3]
-			ev['genre'], ev['genreid'] = convertGenre(event[9])
-			ret.append(ev)
-
-	return {"events": ret, "result": True}
+			if "W" in column:
+				ev['genre'], ev['genreid'] = convertGenre(event[column["W"]])
+			yield projectFields(ev, fields)
 
 
 def getMultiChannelNowNextEpg(sList, encode=False):
@@ -1082,7 +1110,7 @@ def _getNowNextEpg(sRef, nowOrNext, encode=False):
 
 
 # TODO: add sort options
-def getSearchEpg(sstr, endtime=None, fulldesc=False, bouquetsonly=False, encode=False):
+def getSearchEpg(sstr, endtime=None, fulldesc=False, bouquetsonly=False, encode=False, fields=None):
 	ret = []
 	epg = EPG()
 	epgEvents = epg.search(sstr, fulldesc)
@@ -1103,9 +1131,13 @@ def getSearchEpg(sstr, endtime=None, fulldesc=False, bouquetsonly=False, encode=
 		for epgEvent in epgEvents:
 			if bouquetsonly and not epgEvent[7] in bsref:
 				continue
+			# don't show events if begin after endtime
+			if endtime and epgEvent[1] > endtime:
+				continue
 			ev = {}
 			ev['id'] = epgEvent[0]
-			ev['date'] = "%s %s" % (tstrings[("day_" + strftime("%w", (localtime(epgEvent[1]))))], strftime(_("%d.%m.%Y"), (localtime(epgEvent[1]))))
+			if wantsField(fields, "date"):
+				ev['date'] = "%s %s" % (tstrings[("day_" + strftime("%w", (localtime(epgEvent[1]))))], strftime(_("%d.%m.%Y"), (localtime(epgEvent[1]))))
 			ev['begin_timestamp'] = epgEvent[1]
 			ev['begin'] = strftime("%H:%M", (localtime(epgEvent[1])))
 			ev['duration_sec'] = epgEvent[2]
@@ -1116,25 +1148,21 @@ def getSearchEpg(sstr, endtime=None, fulldesc=False, bouquetsonly=False, encode=
 			ev['longdesc'] = convertDesc(epgEvent[5], encode)
 			ev['sref'] = epgEvent[7]
 			ev['sname'] = filterName(epgEvent[6], encode)
-			ev['picon'] = getPicon(epgEvent[7])
+			if wantsField(fields, "picon"):
+				ev['picon'] = getPicon(epgEvent[7])
 			ev['now_timestamp'] = None
 			ev['genre'], ev['genreid'] = convertGenre(epgEvent[8])
 
-			if endtime:
-				# don't show events if begin after endtime
-				if epgEvent[1] <= endtime:
-					ret.append(ev)
-			else:
-				ret.append(ev)
-
-			psref = parse_servicereference(epgEvent[7])
-			ev['service_type'] = SERVICE_TYPE_LOOKUP.get(psref.get('service_type'), "UNKNOWN")
-			nsi = psref.get('ns')
-			ns = NS_LOOKUP.get(nsi, "DVB-S")
-			if ns == "DVB-S":
-				ev['ns'] = getOrb(nsi >> 16 & 0xFFF)
-			else:
-				ev['ns'] = ns
+			if wantsField(fields, "service_type", "ns"):
+				psref = parse_servicereference(epgEvent[7])
+				ev['service_type'] = SERVICE_TYPE_LOOKUP.get(psref.get('service_type'), "UNKNOWN")
+				nsi = psref.get('ns')
+				ns = NS_LOOKUP.get(nsi, "DVB-S")
+				if ns == "DVB-S":
+					ev['ns'] = getOrb(nsi >> 16 & 0xFFF)
+				else:
+					ev['ns'] = ns
+			ret.append(projectFields(ev, fields))
 
 	return {"events": ret, "result": True}
 
@@ -1269,7 +1297,7 @@ def getMultiEpg(self, ref, begintime=-1, endtime=None, Mode=1):
 def getPicon(sname, pp=None, defaultpicon=True):
 
 	if pp is None:
-		pp = PICON_PATH
+		pp = getCapability("PICON_PATH")
 	if pp is not None:
 		# remove URL part
 		if ("://" in sname) or ("%3a//" in sname) or ("%3A//" in sname):
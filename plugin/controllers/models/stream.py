@@ -10,6 +10,7 @@
 ##############################################################################
 from enigma import eServiceReference, getBestPlayableServiceReference
 from ServiceReference import ServiceReference
+from six import ensure_str
 from six.moves.urllib.parse import unquote, quote
 from os.path import exists
 from Components.config import config
@@ -25,15 +26,15 @@ ENC0VCODEC = "/proc/stb/encoder/0/vcodec"
 
 class GetSession(Resource):
 	def GetSID(self, request):
-		sid = request.getSession().uid
-		return sid
+		return ensure_str(request.getSession().uid)
 
 	def GetAuth(self, request):
-		session = request.getSession().sessionNamespaces
-		if "pwd" in list(session.keys()) and session["pwd"] is not None:
-			return (session["user"], session["pwd"])
-		else:
-			return None
+		return getattr(request.getSession(), "streamAuth", None)
+
+	def GetTokenAuth(self, request):
+		session = request.getSession()
+		token = getattr(session, "streamToken", None)
+		return None if token is None else (session.user, token)
 
 
 def getStream(session, request, m3ufile):
@@ -222,6 +223,8 @@ def getTS(self, request):
 		if config.OpenWebif.service_name_for_stream.value and sRef != '' and portNumber != transcoder_port:
 			progopt = "%s#EXTVLCOPT:program=%d\n" % (progopt, int(sRef.split(':')[3], 16))
 
+		# the streaming ports of enigma2 check the system credentials
+		ownServer = portNumber is None
 		if portNumber is None:
 			from re import match
 			portNumber = config.OpenWebif.port.value
@@ -235,8 +238,9 @@ def getTS(self, request):
 
 		if config.OpenWebif.auth_for_streaming.value:
 			asession = GetSession()
-			if asession.GetAuth(request) is not None:
-				auth = ':'.join(asession.GetAuth(request)) + "@"
+			streamAuth = asession.GetTokenAuth(request) if ownServer else asession.GetAuth(request)
+			if streamAuth is not None:
+				auth = ':'.join(streamAuth) + "@"
 			else:
 				auth = '-sid:' + str(asession.GetSID(request)) + "@"
 		else:
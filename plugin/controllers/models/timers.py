@@ -32,7 +32,7 @@ from time import time, strftime, localtime, mktime
 from six.moves.urllib.parse import unquote
 from Plugins.Extensions.OpenWebif.controllers.models.info import GetWithAlternative
 from Plugins.Extensions.OpenWebif.controllers.i18n import _
-from Plugins.Extensions.OpenWebif.controllers.utilities import removeBad
+from Plugins.Extensions.OpenWebif.controllers.utilities import removeBad, wantsField, projectFields
 from Plugins.Extensions.OpenWebif.controllers.epg import EPG
 
 
@@ -74,7 +74,7 @@ def FuzzyTime(t, inPast=False):
 	return date, timeres
 
 
-def getTimers(session):
+def getTimers(session, fields=None):
 	rt = session.nav.RecordTimer
 	epg = EPG()
 	timers = []
@@ -87,7 +87,7 @@ def getTimers(session):
 		descriptionextended = "N/A"
 		filename = None
 		nextactivation = None
-		if timer.eit and timer.service_ref:
+		if timer.eit and timer.service_ref and wantsField(fields, "descriptionextended"):
 			descriptionextended = epg.getEventDescription(timer.service_ref, timer.eit)
 
 		try:
@@ -131,7 +131,7 @@ def getTimers(session):
 			toggledisabledimg = "on"
 
 		asrefs = ""
-		achannels = GetWithAlternative(str(timer.service_ref), False)
+		achannels = wantsField(fields, "asrefs") and GetWithAlternative(str(timer.service_ref), False)
 		if achannels:
 			asrefs = achannels
 
@@ -198,7 +198,7 @@ def getTimers(session):
 		fuzzyBegin = strftime(_("%d.%m.%Y %H:%M"), (localtime(float(timer.begin))))
 		fuzzyEnd = strftime(_("%d.%m.%Y %H:%M"), (localtime(float(timer.end))))
 
-		timers.append({
+		timers.append(projectFields({
 			"serviceref": str(timer.service_ref),
 			"servicename": removeBad(timer.service_ref.getServiceName()),
 			"eit": timer.eit,
@@ -237,7 +237,7 @@ def getTimers(session):
 			"allow_duplicate": allow_duplicate,
 			"recordingtype": recordingtype,
 			"ice_timer_id": ice_timer_id
-		})
+		}, fields))
 
 	return {
 		"result": True,
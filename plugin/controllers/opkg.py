@@ -30,6 +30,84 @@ from Components.config import config
 from Plugins.Extensions.OpenWebif.controllers.base import BaseController
 from Plugins.Extensions.OpenWebif.controllers.i18n import _
 from Plugins.Extensions.OpenWebif.controllers.utilities import getUrlArg, PY3
+from Plugins.Extensions.OpenWebif.controllers.workers import runInWorker
+
+#: file receiving the output of opkg info
+OPKG_OUTPUT = "/tmp/opkg.tmp"  # nosec
+
+
+def parsePackages(output, filters):
+	"""
+	Parse the output of opkg info in the file *output* into the package
+	list of the command listall, without the packages ending with one of
+	the suffixes *filters*. It runs in the worker pool and only uses its
+	arguments.
+	"""
+	map = {}
+	package = None
+	try:
+		for line in open(output, 'r'):
+			if line.startswith('Package:'):
+				package = line.split(":", 1)[1].strip()
+				description = ''
+				status = ''
+				section = ''
+				installed = "0"
+				continue
+			if package is None:
+				continue
+			if line.startswith('Status:'):
+				status = line.split(":", 1)[1].strip()
+				if ' installed' in status.lower():
+					installed = "1"
+			elif line.startswith('Section:'):
+				section = line.split(":", 1)[1].strip()
+			elif line.startswith('Version:'):
+				version = line.split(":", 1)[1].strip()
+			# TDOD : check description
+			elif line.startswith('Description:'):
+				description = line.split(":", 1)[1].strip()
+			elif description and line.startswith(' '):
+				description += line[:-1]
+			elif len(line) <= 1:
+				d = description.split(' ', 3)
+				if len(d) > 3:
+					if d[1] == 'version':
+						description = d[3]
+					# TDOD : check this
+					if description.startswith('gitAUTOINC'):
+						description = description.split(' ', 1)[1]
+				if package in map:
+					v = map[package][0]
+					map[package][3] = v
+					map[package][2] = "1"
+					map[package][0] = version
+				else:
+					map.update({package: [version, description.strip(), installed, "0", section]})
+				package = None
+	except (IOError, OSError):
+		pass
+
+	keys = sorted(map.keys())
+
+	ret = []
+	for name in keys:
+		ignore = False
+		if filters is not None:
+			for f in filters:
+				if name.endswith('-' + f):
+					ignore = True
+					continue
+		if not ignore:
+			ret.append({
+				"name": name,
+				"v": map[name][0],
+				"d": map[name][1],
+				"i": map[name][2],
+				"u": map[name][3],
+				"s": map[name][4]
+			})
+	return ret
 
 
 class OpkgController(BaseController):
@@ -84,73 +162,6 @@ class OpkgController(BaseController):
 		else:
 			return self.ShowHint(request)
 
-	def parseAll(self):
-		map = {}
-		try:
-			for line in open("/tmp/opkg.tmp", 'r'):
-				if line.startswith('Package:'):
-					package = line.split(":", 1)[1].strip()
-					description = ''
-					status = ''
-					section = ''
-					installed = "0"
-					continue
-				if package is None:
-					continue
-				if line.startswith('Status:'):
-					status = line.split(":", 1)[1].strip()
-					if ' installed' in status.lower():
-						installed = "1"
-				elif line.startswith('Section:'):
-					section = line.split(":", 1)[1].strip()
-				elif line.startswith('Version:'):
-					version = line.split(":", 1)[1].strip()
-				# TDOD : check description
-				elif line.startswith('Description:'):
-					description = line.split(":", 1)[1].strip()
-				elif description and line.startswith(' '):
-					description += line[:-1]
-				elif len(line) <= 1:
-					d = description.split(' ', 3)
-					if len(d) > 3:
-						if d[1] == 'version':
-							description = d[3]
-						# TDOD : check this
-						if description.startswith('gitAUTOINC'):
-							description = description.split(' ', 1)[1]
-					if package in map:
-						v = map[package][0]
-						map[package][3] = v
-						map[package][2] = "1"
-						map[package][0] = version
-					else:
-						map.update({package: [version, description.strip(), installed, "0", section]})
-					package = None
-		except (IOError, OSError):
-			pass
-
-		keys = sorted(map.keys())
-		self.ResultString = ""
-
-		ret = []
-		for name in keys:
-			ignore = False
-			if self.filter is not None:
-				for f in self.filter:
-					if name.endswith('-' + f):
-						ignore = True
-						continue
-			if not ignore:
-				ret.append({
-					"name": name,
-					"v": map[name][0],
-					"d": map[name][1],
-					"i": map[name][2],
-					"u": map[name][3],
-					"s": map[name][4]
-				})
-		return ret
-
 	def Runcmd(self, cmd):
 		print("Call /usr/bin/opkg " + cmd)
 		self.container.execute("/usr/bin/opkg " + cmd)
@@ -166,7 +177,7 @@ class OpkgController(BaseController):
 		self.IsAlive = True
 		self.olddata = None
 		if self.action in ("full", "listall"):
-			self.Runcmd("info > /tmp/opkg.tmp")
+			self.Runcmd("info > " + OPKG_OUTPUT)
 		else:
 			self.container.dataAvail.append(self.Moredata)
 			self.Runcmd(self.action)
@@ -202,16 +213,26 @@ class OpkgController(BaseController):
 	def NoMoredata(self, data):
 		if self.IsAlive:
 			if self.action == "listall":
-				self.request.setHeader("content-type", "application/json; charset=utf-8")
-				try:
-					data = self.parseAll()
-					self.request.write(ensure_binary(dumps(data)))
-				except Exception as exc:
-					self.request.setResponseCode(http.INTERNAL_SERVER_ERROR)
-					self.request.write(ensure_binary(dumps({"result": False, "request": self.request.path, "exception": repr(exc)})))
+				# the package list is large, parse it in the worker pool
+				request = self.request
+				request.setHeader("content-type", "application/json; charset=utf-8")
+
+				def _write(data):
+					if not request._disconnected:
+						request.write(ensure_binary(dumps(data)))
+						request.finish()
+
+				def _failed(failure):
+					if not request._disconnected:
+						request.setResponseCode(http.INTERNAL_SERVER_ERROR)
+						request.write(ensure_binary(dumps({"result": False, "request": ensure_str(request.path), "exception": repr(failure.value)})))
+						request.finish()
+
+				runInWorker(parsePackages, OPKG_OUTPUT, list(self.filter)).addCallbacks(_write, _failed)
+				return server.NOT_DONE_YET
 			elif self.action == "full":
 				try:
-					data = open("/tmp/opkg.tmp", 'r').read()
+					data = open(OPKG_OUTPUT, 'r').read()
 					self.request.write(ensure_binary(data))
 				except Exception as exc:
 					self.request.setResponseCode(http.INTERNAL_SERVER_ERROR)
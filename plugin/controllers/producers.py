@@ -0,0 +1,249 @@
+# -*- coding: utf-8 -*-
+
+##########################################################################
+# OpenWebif: producers
+##########################################################################
+# Copyright (C) 2011 - 2022 E2OpenPlugins
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston MA 02110-1301, USA.
+##########################################################################
+
+from json import JSONEncoder
+from six import ensure_binary
+
+from zope.interface import implementer
+from twisted.internet import task
+from twisted.internet.interfaces import IPullProducer, IPushProducer
+
+#: size in bytes of the chunks written to the request
+CHUNK_SIZE = 32768
+
+_stats = {"cooperative": 0, "fragments": 0, "failed": 0}
+
+
+@implementer(IPullProducer)
+class ChunkProducer(object):
+	"""
+	Pull producer joining the text *fragments* into chunks of about
+	CHUNK_SIZE bytes and writing them to *request*. The fragments are only
+	consumed when the transport asks for more data, so a lazily generated
+	body is never held in memory completely.
+
+	Args:
+		request (twisted.web.server.Request): HTTP request object
+		fragments: iterator of strings
+	"""
+
+	def __init__(self, request, fragments):
+		self.request = request
+		self.chunks = iter(fragments)
+		self.done = False
+
+	def nextChunk(self):
+		parts = []
+		size = 0
+		for part in self.chunks:
+			parts.append(part)
+			size += len(part)
+			if size >= CHUNK_SIZE:
+				break
+		else:
+			self.done = True
+		return "".join(parts)
+
+	def start(self, limit=CHUNK_SIZE):
+		"""
+		Produce the first chunks, up to *limit* bytes. Errors in them are
+		raised to the caller, which can still send an error response.
+
+		Returns:
+			the complete body as bytes if it fits into *limit*, otherwise
+			None; the producer then writes the rest and finishes the request
+		"""
+		chunks = []
+		size = 0
+		while not self.done and size < limit:
+			chunk = ensure_binary(self.nextChunk())
+			chunks.append(chunk)
+			size += len(chunk)
+		if self.done:
+			self.chunks = None
+			return b"".join(chunks)
+		self.request.write(b"".join(chunks))
+		self.request.registerProducer(self, False)
+		return None
+
+	def getBody(self):
+		"""
+		Produce the whole body at once instead of writing it to the request.
+		"""
+		body = ensure_binary("".join(self.chunks))
+		self.chunks = None
+		return body
+
+	def resumeProducing(self):
+		if self.chunks is None:
+			return
+		try:
+			chunk = self.nextChunk()
+		except Exception as exc:
+			# headers are already sent, all we can do is to end the response
+			print("[OpenWebif] producing '%s' failed: %r" % (self.request.uri, exc))
+			chunk = ""
+			self.done = True
+		if chunk:
+			self.request.write(ensure_binary(chunk))
+		if self.done:
+			self.chunks = None
+			self.request.unregisterProducer()
+			self.request.finish()
+
+	def stopProducing(self):
+		self.chunks = None
+
+
+class JSONProducer(ChunkProducer):
+	"""
+	Write the JSON encoding of *data* to *request*.
+
+	Args:
+		request (twisted.web.server.Request): HTTP request object
+		data: object to encode
+		kwargs: passed to json.JSONEncoder
+	"""
+
+	def __init__(self, request, data, **kwargs):
+		ChunkProducer.__init__(self, request, JSONEncoder(**kwargs).iterencode(data))
+
+
+class NDJSONProducer(ChunkProducer):
+	"""
+	Write *items* to *request* as newline delimited JSON, one compact
+	document per line.
+	"""
+
+	def __init__(self, request, items):
+		encoder = JSONEncoder(separators=(",", ":"))
+		ChunkProducer.__init__(self, request, (encoder.encode(item) + "\n" for item in items))
+
+
+class CooperativeItems(list):
+	"""
+	List of the items of the iterator *items*, generated only while the
+	list is encoded. A page handler returns it (as its data or one of the
+	values of its data) for a large number of items; the response is then
+	encoded by a CooperativeProducer in time slices, interleaved with the
+	other requests.
+	"""
+
+	def __init__(self, items):
+		list.__init__(self)
+		self.items = iter(items)
+
+	def __iter__(self):
+		return self.items
+
+	def __bool__(self):
+		return True
+
+	__nonzero__ = __bool__
+
+
+def isCooperative(data):
+	"""
+	Check whether *data* returned by a page handler is to be encoded by a
+	CooperativeProducer.
+	"""
+	if isinstance(data, CooperativeItems):
+		return True
+	return isinstance(data, dict) and any(isinstance(value, CooperativeItems) for value in data.values())
+
+
+@implementer(IPushProducer)
+class CooperativeProducer(object):
+	"""
+	Push producer writing the text *fragments* to *request* by the reactor
+	wide cooperator, a few chunks of CHUNK_SIZE bytes per time slice, so a long response
+	doesn't block the other requests while it is generated. The work is
+	paused while the transport is busy.
+
+	Args:
+		request (twisted.web.server.Request): HTTP request object
+		fragments: iterator of strings
+	"""
+
+	def __init__(self, request, fragments):
+		self.request = request
+		self.fragments = iter(fragments)
+		self.task = None
+		self.paused = False
+
+	def start(self):
+		"""
+		Start writing the fragments. The producer finishes the request.
+		"""
+		_stats["cooperative"] += 1
+		self.request.registerProducer(self, True)
+		self.task = task.cooperate(self.produce())
+		self.task.whenDone().addCallbacks(self.finished, self.failed)
+
+	def produce(self):
+		parts = []
+		size = 0
+		for part in self.fragments:
+			_stats["fragments"] += 1
+			parts.append(part)
+			size += len(part)
+			if size >= CHUNK_SIZE:
+				self.request.write(ensure_binary("".join(parts)))
+				parts = []
+				size = 0
+				yield None
+		if parts:
+			self.request.write(ensure_binary("".join(parts)))
+
+	def finished(self, result):
+		self.task = None
+		self.request.unregisterProducer()
+		self.request.finish()
+
+	def failed(self, failure):
+		if failure.check(task.TaskStopped):
+			# the client went away
+			self.task = None
+			self.request.unregisterProducer()
+			return
+		_stats["failed"] += 1
+		# headers are already sent, all we can do is to end the response
+		print("[OpenWebif] producing '%s' failed: %s" % (self.request.uri, failure.getErrorMessage()))
+		self.finished(None)
+
+	def pauseProducing(self):
+		if not self.paused and self.task is not None:
+			self.paused = True
+			self.task.pause()
+
+	def resumeProducing(self):
+		if self.paused and self.task is not None:
+			self.paused = False
+			self.task.resume()
+
+	def stopProducing(self):
+		if self.task is not None:
+			self.task.stop()
+
+
+def getProducerStats():
+	return dict(_stats)
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+##########################################################################
+# OpenWebif: profiler
+##########################################################################
+# Copyright (C) 2011 - 2022 E2OpenPlugins
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston MA 02110-1301, USA.
+##########################################################################
+
+from cProfile import Profile
+from pstats import Stats
+import marshal
+
+from six import StringIO
+from twisted.internet import defer, reactor
+
+#: longest profiling window in seconds
+PROFILE_WINDOW_MAX = 300
+
+#: number of functions listed in the stats
+PROFILE_STATS_LIMIT = 60
+
+#: sort orders accepted for the stats
+PROFILE_SORT_KEYS = ("cumulative", "tottime", "ncalls", "pcalls", "name", "filename")
+
+_window = {"profile": None}
+
+
+def isProfiling():
+	return _window["profile"] is not None
+
+
+def formatStats(profile, sort="cumulative"):
+	"""
+	Get the stats of *profile* as text, sorted by *sort*.
+	"""
+	if sort not in PROFILE_SORT_KEYS:
+		sort = "cumulative"
+	stream = StringIO()
+	Stats(profile, stream=stream).strip_dirs().sort_stats(sort).print_stats(PROFILE_STATS_LIMIT)
+	return stream.getvalue()
+
+
+def dumpStats(profile):
+	"""
+	Get the stats of *profile* in the format of pstats.Stats.dump_stats,
+	to be loaded with pstats or a profile viewer.
+	"""
+	profile.create_stats()
+	return marshal.dumps(profile.stats)
+
+
+def profileWindow(seconds):
+	"""
+	Profile everything the reactor thread does for *seconds*.
+
+	Returns:
+		Deferred firing with the cProfile.Profile at the end of the window,
+		or None if a window is already open
+	"""
+	if _window["profile"] is not None:
+		return None
+	profile = _window["profile"] = Profile()
+	d = defer.Deferred()
+
+	def _stop():
+		profile.disable()
+		_window["profile"] = None
+		d.callback(profile)
+
+	profile.enable()
+	reactor.callLater(min(seconds, PROFILE_WINDOW_MAX), _stop)
+	return d
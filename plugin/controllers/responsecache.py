@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+##########################################################################
+# OpenWebif: responsecache
+##########################################################################
+# Copyright (C) 2011 - 2022 E2OpenPlugins
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston MA 02110-1301, USA.
+##########################################################################
+
+from collections import OrderedDict
+from time import time
+
+from Plugins.Extensions.OpenWebif.controllers.utilities import moveToEnd
+from Plugins.Extensions.OpenWebif.controllers.versions import versionListeners
+
+#: bytes of rendered responses kept at most
+RESPONSE_CACHE_BUDGET = 4 * 1024 * 1024
+
+#: bytes accounted per entry in addition to its body
+ENTRY_OVERHEAD = 256
+
+# key -> [body, content type, digest, expires, sources, version], least recently used first
+_responses = OrderedDict()
+_stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0, "invalidations": 0, "size": 0}
+
+
+def _drop(key):
+	entry = _responses.pop(key)
+	_stats["size"] -= len(entry[0]) + ENTRY_OVERHEAD
+
+
+def getResponse(key, version=None):
+	"""
+	Get a cached response.
+
+	Args:
+		key: cache key of the request
+		version: current version of the page content or None
+	Returns:
+		tuple (body, content type, digest) or None
+	"""
+	entry = _responses.get(key)
+	if entry is None:
+		_stats["misses"] += 1
+		return None
+	if entry[3] < time() or entry[5] != version:
+		_drop(key)
+		_stats["expired"] += 1
+		_stats["misses"] += 1
+		return None
+	moveToEnd(_responses, key)
+	_stats["hits"] += 1
+	return entry[0], entry[1], entry[2]
+
+
+def putResponse(key, body, contentType, digest, ttl, sources, version=None):
+	"""
+	Cache the rendered *body* of a response for *ttl* seconds or until one
+	of the content *sources* changes. The least recently used responses
+	are dropped to stay within RESPONSE_CACHE_BUDGET.
+	"""
+	size = len(body) + ENTRY_OVERHEAD
+	if size > RESPONSE_CACHE_BUDGET // 4:
+		return
+	if key in _responses:
+		_drop(key)
+	_responses[key] = [body, contentType, digest, time() + ttl, sources, version]
+	_stats["size"] += size
+	while _stats["size"] > RESPONSE_CACHE_BUDGET:
+		_drop(next(iter(_responses)))
+		_stats["evictions"] += 1
+
+
+def invalidateResponses(source=None):
+	"""
+	Drop the cached responses depending on the content *source*, or all of
+	them if *source* is None.
+	"""
+	for key in [key for key, entry in _responses.items() if source is None or source in entry[4]]:
+		_drop(key)
+		_stats["invalidations"] += 1
+
+
+def getResponseCacheStats():
+	ret = dict(_stats)
+	ret["entries"] = len(_responses)
+	ret["budget"] = RESPONSE_CACHE_BUDGET
+	lookups = ret["hits"] + ret["misses"]
+	ret["ratio"] = float(ret["hits"]) / lookups if lookups else 0.0
+	return ret
+
+
+versionListeners.append(invalidateResponses)
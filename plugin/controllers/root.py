@@ -20,62 +20,107 @@
 # Inc., 51 Franklin Street, Fifth Floor, Boston MA 02110-1301, USA.
 ##########################################################################
 
+from importlib import import_module
 from os.path import exists
-from six import ensure_binary
+from six import ensure_binary, ensure_str
 
 from twisted.web import static, http, proxy
 from Components.config import config
 from Components.Harddisk import harddiskmanager
 
-from Plugins.Extensions.OpenWebif.controllers.models.grab import grabScreenshot
 from Plugins.Extensions.OpenWebif.controllers.base import BaseController
-from Plugins.Extensions.OpenWebif.controllers.web import WebController, ApiController
-from Plugins.Extensions.OpenWebif.controllers.ajax import AjaxController
-from Plugins.Extensions.OpenWebif.controllers.opkg import OpkgController
-from Plugins.Extensions.OpenWebif.controllers.AT import ATController
-from Plugins.Extensions.OpenWebif.controllers.ER import ERController
-from Plugins.Extensions.OpenWebif.controllers.BQE import BQEController
-from Plugins.Extensions.OpenWebif.controllers.wol import WOLSetupController, WOLClientController
-from Plugins.Extensions.OpenWebif.controllers.file import FileController
+from Plugins.Extensions.OpenWebif.controllers.assets import COMPRESSIBLE_EXTENSIONS, IMMUTABLE_CACHE_CONTROL, loadManifest, resolveAsset
+from Plugins.Extensions.OpenWebif.controllers.defaults import getCapability, getPublicPath, VIEWS_PATH, setMobile, refreshPiconPath
 
-from Plugins.Extensions.OpenWebif.controllers.defaults import PICON_PATH, getPublicPath, VIEWS_PATH, setMobile, refreshPiconPath
+
+def lazyController(module, name, *args):
+	"""
+	Get a factory for putLazyChild making the controller *name* of the
+	module *module* of the controllers with *args*.
+	"""
+	def factory():
+		return getattr(import_module("Plugins.Extensions.OpenWebif.controllers." + module), name)(*args)
+	return factory
+
+
+def optionalController(module, name, *args):
+	"""
+	Like lazyController, for a controller which is missing from some
+	images.
+	"""
+	def factory():
+		try:
+			return lazyController(module, name, *args)()
+		except ImportError:
+			return None
+	return factory
+
+
+class AssetFile(static.File):
+	"""
+	Static files which are also served by the content hashed names of the
+	asset manifest, with an immutable Cache-Control, and from their .gz
+	sidecars to clients accepting gzip.
+	"""
+
+	def getChild(self, path, request):
+		if not request.postpath:
+			url = resolveAsset(ensure_str(request.path))
+			if url is not None:
+				request.setHeader("Cache-Control", IMMUTABLE_CACHE_CONTROL)
+				path = ensure_binary(url.rsplit("/", 1)[1])
+		return static.File.getChild(self, path, request)
+
+	def render_GET(self, request):
+		if self.isfile() and ensure_str(self.path).endswith(COMPRESSIBLE_EXTENSIONS):
+			request.setHeader("Vary", "Accept-Encoding")
+			if "gzip" in ensure_str(request.getHeader("accept-encoding") or ""):
+				sidecar = static.File(ensure_str(self.path) + ".gz")
+				# a sidecar older than the file is stale
+				if sidecar.isfile() and sidecar.getModificationTime() >= self.getModificationTime():
+					sidecar.type = static.getTypeAndEncoding(self.basename(), self.contentTypes, self.contentEncodings, self.defaultType)[0]
+					sidecar.encoding = "gzip"
+					return sidecar.render_GET(request)
+		return static.File.render_GET(self, request)
 
 
 class RootController(BaseController):
 	"""
 	Root Web Controller
 	"""
+	# every page of the root controller is rendered with the main template
+	withMainTemplate = True
 
 	def __init__(self, session, path=""):
 		BaseController.__init__(self, path=path, session=session)
 
-		self.putChild2("web", WebController(session))
-		self.putGZChild("api", ApiController(session))
-		self.putGZChild("ajax", AjaxController(session))
-		self.putChild2("file", FileController())
-		self.putChild2("grab", grabScreenshot(session))
+		# the controllers are imported on the first request to them
+		self.putLazyChild("web", lazyController("web", "WebController", session))
+		self.putLazyChild("api", lazyController("web", "ApiController", session), isGZ=True)
+		self.putLazyChild("ajax", lazyController("ajax", "AjaxController", session), isGZ=True)
+		self.putLazyChild("file", lazyController("file", "FileController"))
+		self.putLazyChild("grab", lazyController("models.grab", "grabScreenshot", session))
 		self.putChild2('hardware', static.File(ensure_binary("/usr/share/enigma2/hardware")))
-		for static_val in ('js', 'css', 'static', 'images', 'fonts'):
+		loadManifest(getPublicPath())
+		for static_val in ('static', 'images', 'fonts'):
 			self.putChild2(static_val, static.File(ensure_binary(getPublicPath() + '/' + static_val)))
+		for static_val in ('js', 'css'):
+			self.putChild2(static_val, AssetFile(ensure_binary(getPublicPath() + '/' + static_val)))
 		for static_val in ('modern', 'themes', 'webtv', 'vxg'):
 			if exists(getPublicPath(static_val)):
-				self.putChild2(static_val, static.File(ensure_binary(getPublicPath() + '/' + static_val)))
+				self.putChild2(static_val, AssetFile(ensure_binary(getPublicPath() + '/' + static_val)))
 
 		if exists('/usr/bin/shellinaboxd'):
 			self.putChild2("terminal", proxy.ReverseProxyResource('::1', 4200, b'/'))
-		self.putGZChild("opkg", OpkgController(session))
-		self.putChild2("autotimer", ATController(session))
-		self.putChild2("epgrefresh", ERController(session))
-		self.putChild2("bouqueteditor", BQEController(session))
-		self.putChild2("wol", WOLClientController())
-		self.putChild2("wolsetup", WOLSetupController(session))
-		if PICON_PATH:
-			self.setPiconChild(PICON_PATH)
-		try:
-			from Plugins.Extensions.OpenWebif.controllers.NET import NetController
-			self.putChild2("net", NetController(session))
-		except:  # nosec # noqa: E722
-			pass
+		self.putLazyChild("opkg", lazyController("opkg", "OpkgController", session), isGZ=True)
+		self.putLazyChild("autotimer", lazyController("AT", "ATController", session))
+		self.putLazyChild("epgrefresh", lazyController("ER", "ERController", session))
+		self.putLazyChild("bouqueteditor", lazyController("BQE", "BQEController", session))
+		self.putLazyChild("wol", lazyController("wol", "WOLClientController"))
+		self.putLazyChild("wolsetup", lazyController("wol", "WOLSetupController", session))
+		self.putLazyChild("net", optionalController("NET", "NetController", session))
+		# the picon path is probed on the first request for a picon
+		self.putLazyChild("picon", self.makePiconChild)
 		try:
 			harddiskmanager.on_partition_list_change.append(self.onPartitionChange)
 		except:  # nosec # noqa: E722
@@ -83,17 +128,16 @@ class RootController(BaseController):
 
 	def onPartitionChange(self, why, part):
 		refreshPiconPath()
-		if PICON_PATH:
-			self.setPiconChild(PICON_PATH)
+		if getCapability("PICON_PATH"):
+			self.setPiconChild(getCapability("PICON_PATH"))
+
+	def makePiconChild(self):
+		pp = getCapability("PICON_PATH")
+		return static.File(ensure_binary(pp)) if pp else None
 
 	def setPiconChild(self, pp):
 		self.putChild2("picon", static.File(ensure_binary(pp)))
 
-	# this function will be called before a page is loaded
-	def prePageLoad(self, request):
-		# we set withMainTemplate here so it's a default for every page
-		self.withMainTemplate = True
-
 	# the "pages functions" must be called P_pagename
 	# example http://boxip/index => P_index
 	def P_index(self, request):
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+
+##########################################################################
+# OpenWebif: sessions
+##########################################################################
+# Copyright (C) 2011 - 2022 E2OpenPlugins
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston MA 02110-1301, USA.
+##########################################################################
+
+from binascii import hexlify
+from collections import OrderedDict
+from os import urandom
+
+from six import ensure_binary, ensure_str
+from twisted.internet.task import LoopingCall
+from twisted.web import server
+
+from Plugins.Extensions.OpenWebif.controllers.utilities import moveToEnd
+
+#: seconds a session lives after its last request
+SESSION_TIMEOUT = 900
+
+#: seconds between two ticks of the timing wheel expiring the sessions
+WHEEL_TICK = 30
+
+#: slots of the timing wheel, more than SESSION_TIMEOUT / WHEEL_TICK
+WHEEL_SLOTS = 64
+
+#: maximum number of sessions, the oldest one-shot session (see WebifSession.use)
+#: or else the least recently used one is dropped first
+SESSION_CACHE_SIZE = 512
+
+# uid -> WebifSession of the HTTP and HTTPS sites, least recently used first
+_sessions = OrderedDict()
+# slot -> uids of the sessions expiring when the wheel reaches the slot
+_wheel = [set() for slot in range(WHEEL_SLOTS)]
+# uids of the sessions used by a single request so far, oldest first
+_oneShot = OrderedDict()
+# stream token -> uid of the session it was issued to
+_streamTokens = {}
+_state = {"tick": 0, "loop": None}
+_stats = {"created": 0, "expired": 0, "evicted": 0, "found": 0, "missed": 0}
+
+
+class WebifSession(server.Session):
+	"""
+	Session kept in the store shared by all sites. Instead of a timer per
+	session, the timing wheel expires the sessions not used for
+	SESSION_TIMEOUT seconds, give or take WHEEL_TICK.
+
+	The authentication keeps its state in the attributes logged, user and,
+	for users without shell whose stream URLs need credentials, streamAuth
+	and streamToken. The streaming port of enigma2 checks the system
+	credentials, so its URLs carry streamAuth, the user and password; the
+	URLs served by OpenWebif carry streamToken in place of the password.
+	"""
+	sessionTimeout = SESSION_TIMEOUT
+	slot = None
+	used = 0
+	logged = False
+	user = None
+	streamAuth = None
+	streamToken = None
+
+	def startCheckingExpiration(self):
+		_stats["created"] += 1
+		while len(_sessions) > SESSION_CACHE_SIZE:
+			_stats["evicted"] += 1
+			uid = next(iter(_oneShot)) if _oneShot else next(iter(_sessions))
+			_sessions[uid].expire()
+		_oneShot[self.uid] = None
+		if _state["loop"] is None:
+			_state["loop"] = LoopingCall(_tick)
+		if not _state["loop"].running:
+			_state["loop"].start(WHEEL_TICK, now=False)
+
+	def use(self):
+		"""
+		Touch the session for a request. Clients sending no cookie, like
+		most API clients with basic authentication, get a new session with
+		every request; a session is kept with the browser sessions only once
+		a second request used it.
+		"""
+		self.used += 1
+		if self.used == 2:
+			_oneShot.pop(self.uid, None)
+		self.touch()
+
+	def touch(self):
+		self.lastModified = self._reactor.seconds()
+		if self.uid in _sessions:
+			moveToEnd(_sessions, self.uid)
+		slot = (_state["tick"] + -(-self.sessionTimeout // WHEEL_TICK)) % WHEEL_SLOTS
+		if slot != self.slot:
+			if self.slot is not None:
+				_wheel[self.slot].discard(self.uid)
+			_wheel[slot].add(self.uid)
+			self.slot = slot
+
+	def expire(self):
+		if self.slot is not None:
+			_wheel[self.slot].discard(self.uid)
+			self.slot = None
+		_oneShot.pop(self.uid, None)
+		self.logged = False
+		self.streamAuth = None
+		self.dropStreamToken()
+		if self.uid in _sessions:
+			server.Session.expire(self)
+
+	def issueStreamToken(self):
+		"""
+		Give the session a new random stream token.
+		"""
+		self.dropStreamToken()
+		self.streamToken = ensure_str(hexlify(urandom(16)))
+		_streamTokens[self.streamToken] = self.uid
+
+	def dropStreamToken(self):
+		if self.streamToken is not None:
+			_streamTokens.pop(self.streamToken, None)
+			self.streamToken = None
+
+
+def _tick():
+	_state["tick"] += 1
+	slot = _wheel[_state["tick"] % WHEEL_SLOTS]
+	for uid in list(slot):
+		session = _sessions.get(uid)
+		if session is not None:
+			_stats["expired"] += 1
+			session.expire()
+	slot.clear()
+	if not _sessions:
+		_state["loop"].stop()
+
+
+def attachSite(site):
+	"""
+	Keep the sessions of *site* in the shared store.
+	"""
+	site.sessionFactory = WebifSession
+	site.sessions = _sessions
+
+
+def findSession(uid):
+	"""
+	Get the session *uid* of any site, e.g. one named by a stream URL, or
+	None if it expired.
+	"""
+	session = _sessions.get(ensure_binary(uid))
+	if session is None:
+		_stats["missed"] += 1
+		return None
+	_stats["found"] += 1
+	session.touch()
+	return session
+
+
+def findStreamSession(user, token):
+	"""
+	Get the logged in session of *user* the stream token *token* was
+	issued to, or None.
+	"""
+	session = _sessions.get(_streamTokens.get(token))
+	if session is None or not session.logged or session.user != user:
+		return None
+	session.touch()
+	return session
+
+
+def getSessionStats():
+	ret = dict(_stats)
+	ret["sessions"] = len(_sessions)
+	ret["oneshot"] = len(_oneShot)
+	ret["logged"] = sum(1 for session in _sessions.values() if session.logged)
+	return ret
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+##########################################################################
+# OpenWebif: singleflight
+##########################################################################
+# Copyright (C) 2011 - 2022 E2OpenPlugins
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston MA 02110-1301, USA.
+##########################################################################
+
+from twisted.internet import defer, reactor
+from twisted.python.failure import Failure
+
+# key -> Deferreds waiting for the computation in flight
+_flights = {}
+_stats = {"computations": 0, "coalesced": 0}
+
+
+def coalesce(key, compute, *args):
+	"""
+	Run compute(*args) once for all callers asking for the same *key* while
+	it is in flight and give all of them its result.
+
+	The computation starts in the next reactor iteration, so identical
+	requests which arrived together join it as well. *compute* may return
+	a Deferred.
+
+	Returns:
+		Deferred firing with the result of the computation
+	"""
+	d = defer.Deferred()
+	waiting = _flights.get(key)
+	if waiting is not None:
+		waiting.append(d)
+		_stats["coalesced"] += 1
+		return d
+	_flights[key] = [d]
+	_stats["computations"] += 1
+
+	def _done(result):
+		for waiter in _flights.pop(key):
+			if isinstance(result, Failure):
+				waiter.errback(result)
+			else:
+				waiter.callback(result)
+
+	reactor.callLater(0, lambda: defer.maybeDeferred(compute, *args).addBoth(_done))
+	return d
+
+
+def getSingleFlightStats():
+	ret = dict(_stats)
+	ret["inflight"] = len(_flights)
+	return ret
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+##########################################################################
+# OpenWebif: startup
+##########################################################################
+# Copyright (C) 2011 - 2022 E2OpenPlugins
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston MA 02110-1301, USA.
+##########################################################################
+
+from time import time
+
+#: steps taking longer than this many seconds are marked in the report
+STARTUP_SLOW_STEP = 0.1
+
+# kind -> [(step, seconds)] in the order they were recorded
+_steps = {"boot": [], "probe": [], "mount": []}
+_state = {"loaded": time(), "started": None}
+
+
+def recordStep(kind, step, seconds):
+	"""
+	Record that *step* of *kind* (boot, probe or mount) took *seconds*.
+	"""
+	_steps[kind].append((step, seconds))
+
+
+class timedStep(object):
+	"""
+	Context manager recording the time its block took as *step* of *kind*.
+	"""
+
+	def __init__(self, kind, step):
+		self.kind = kind
+		self.step = step
+		self.started = None
+
+	def __enter__(self):
+		self.started = time()
+		return self
+
+	def __exit__(self, excType, excValue, traceback):
+		recordStep(self.kind, self.step, time() - self.started)
+		return False
+
+
+def startupDone():
+	"""
+	Note that the web server is up and print the boot steps to the log.
+	"""
+	if _state["started"] is None:
+		_state["started"] = time()
+	for line in formatStartupReport():
+		print("[OpenWebif] startup: %s" % line)
+
+
+def formatStartupReport():
+	ret = []
+	if _state["started"] is not None:
+		ret.append("%.3fs from loading the plugin to listening" % (_state["started"] - _state["loaded"]))
+	for kind in ("boot", "probe", "mount"):
+		for step, seconds in _steps[kind]:
+			ret.append("%s %s %.3fs%s" % (kind, step, seconds, " (slow)" if seconds >= STARTUP_SLOW_STEP else ""))
+	return ret
+
+
+def getStartupReport():
+	ret = {"total": _state["started"] - _state["loaded"] if _state["started"] is not None else None}
+	for kind, steps in _steps.items():
+		ret[kind] = [{"step": step, "seconds": round(seconds, 4), "slow": seconds >= STARTUP_SLOW_STEP} for step, seconds in steps]
+	return ret
@@ -0,0 +1,276 @@
+# -*- coding: utf-8 -*-
+
+##########################################################################
+# OpenWebif: templates
+##########################################################################
+# Copyright (C) 2011 - 2022 E2OpenPlugins
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston MA 02110-1301, USA.
+##########################################################################
+
+from os import makedirs, stat, walk
+from os.path import basename, dirname, isdir, join as pathjoin, relpath
+from time import time
+import io
+import sys
+
+from six import PY3, ensure_text
+from Cheetah.Compiler import Compiler
+from Cheetah.Template import Template
+
+#: seconds between two mtime checks of a cached template
+CHECK_INTERVAL = 10
+
+#: template sources in order of preference
+TEMPLATE_EXTENSIONS = (".pyo", ".pyc", ".py", ".tmpl")
+
+#: views loaded by warmupTemplates, most requested pages first
+WARMUP_VIEWS = (
+	"main", "index", "ajax/tv", "ajax/current", "ajax/bouquets", "ajax/channels",
+	"ajax/multiepg", "ajax/timers", "ajax/movies", "ajax/radio"
+)
+
+# resolved view path (w/o extension) + module -> [class, source, mtime, lastcheck]
+_templates = {}
+_stats = {"hits": 0, "misses": 0, "reloads": 0}
+# source -> seconds spent to compile/import it
+_compileTimes = {}
+
+if PY3:
+	from importlib.machinery import SourceFileLoader, SourcelessFileLoader
+	from importlib.util import module_from_spec, spec_from_loader
+
+	def _loadModule(module, source):
+		loader = (SourceFileLoader if source.endswith(".py") else SourcelessFileLoader)(module, source)
+		template = module_from_spec(spec_from_loader(module, loader))
+		loader.exec_module(template)
+		return template
+else:
+	import imp
+
+	def _loadModule(module, source):
+		if source.endswith(".py"):
+			return imp.load_source(module, source)
+		return imp.load_compiled(module, source)
+
+
+def _getMtime(filename):
+	try:
+		return stat(filename).st_mtime
+	except OSError:
+		return None
+
+
+def _findSource(basepath):
+	for ext in TEMPLATE_EXTENSIONS:
+		mtime = _getMtime(basepath + ext)
+		if mtime is not None:
+			return basepath + ext, mtime
+	return None, None
+
+
+def _compileSource(source, module):
+	"""
+	Return the template class of *source*, or None if there is none.
+
+	Compiled python modules must provide a class named *module*, plain
+	templates are compiled by Cheetah. Touches no module state, so it may
+	run in a worker thread.
+	"""
+	if source.endswith(".tmpl"):
+		klass = Template.compile(file=source)
+	else:
+		klass = getattr(_loadModule(module, source), module, None)
+	return klass if callable(klass) else None
+
+
+def _loadView(basepath, module):
+	"""
+	Find and compile the source of a view.
+
+	Returns:
+		tuple (template class or None, source, mtime, seconds taken)
+	"""
+	source, mtime = _findSource(basepath)
+	start = time()
+	klass = _compileSource(source, module) if source is not None else None
+	return klass, source, mtime, time() - start
+
+
+def getTemplateClass(basepath, module):
+	"""
+	Get the (cached) template class for a view.
+
+	Args:
+		basepath: resolved view path without extension
+		module: name of the template class in compiled views
+	Returns:
+		tuple (template class, source file) or (None, None)
+	"""
+	key = (basepath, module)
+	now = time()
+	entry = _templates.get(key)
+	if entry is not None:
+		if now - entry[3] < CHECK_INTERVAL:
+			_stats["hits"] += 1
+			return entry[0], entry[1]
+		source, mtime = _findSource(basepath)
+		if source == entry[1] and mtime == entry[2]:
+			entry[3] = now
+			_stats["hits"] += 1
+			return entry[0], entry[1]
+		_stats["reloads"] += 1
+	else:
+		source, mtime = _findSource(basepath)
+
+	_stats["misses"] += 1
+	if source is None:
+		_templates.pop(key, None)
+		return None, None
+	start = time()
+	klass = _compileSource(source, module)
+	_compileTimes[source] = time() - start
+	if klass is None:
+		_templates.pop(key, None)
+		return None, None
+	_templates[key] = [klass, source, mtime, now]
+	return klass, source
+
+
+def renderTemplate(basepath, module, args):
+	"""
+	Render a view with the variables in *args*.
+
+	Returns:
+		rendered template as string or None if the view does not exist
+	"""
+	klass, source = getTemplateClass(basepath, module)
+	if klass is None:
+		return None
+	return str(klass(searchList=[args]))
+
+
+def clearTemplateCache():
+	_templates.clear()
+
+
+def getTemplateCacheStats():
+	ret = dict(_stats)
+	ret["size"] = len(_templates)
+	lookups = ret["hits"] + ret["misses"]
+	ret["ratio"] = float(ret["hits"]) / lookups if lookups else 0.0
+	return ret
+
+
+def getTemplateCompileTimes():
+	return dict(_compileTimes)
+
+
+def warmupTemplates(views, resolve):
+	"""
+	Load *views* into the template cache and print how long each one took.
+	The views are compiled in the worker pool, one after the other, and
+	put into the cache in the reactor thread, so the cache is only used by
+	one thread and a slow compile does not hold up the requests.
+
+	Args:
+		views: view paths relative to the views directory
+		resolve: function returning the resolved path of a view
+	Returns:
+		Deferred firing with the list of tuples (source, seconds taken)
+	"""
+	from twisted.internet import task
+	from Plugins.Extensions.OpenWebif.controllers.workers import runInWorker
+
+	report = []
+
+	def _install(result, key, view):
+		klass, source, mtime, taken = result
+		if source is not None:
+			_compileTimes[source] = taken
+		if klass is None:
+			print("[OpenWebif] template warm-up of '%s' found no template" % view)
+		elif key not in _templates:
+			# a request may have loaded the view meanwhile
+			_templates[key] = [klass, source, mtime, time()]
+			report.append((source, taken))
+
+	def _failed(failure, view):
+		print("[OpenWebif] template warm-up of '%s' failed: %s" % (view, failure.getErrorMessage()))
+
+	def _warmup():
+		for view in views:
+			key = (resolve(view), basename(view))
+			if key not in _templates:
+				yield runInWorker(_loadView, *key).addCallback(_install, key, view).addErrback(_failed, view)
+
+	def _report(result):
+		for source, taken in report:
+			print("[OpenWebif] template '%s' loaded in %.3fs" % (source, taken))
+		print("[OpenWebif] %d templates warmed up in %.3fs" % (len(report), sum(x[1] for x in report)))
+		return report
+
+	return task.cooperate(_warmup()).whenDone().addCallback(_report)
+
+
+def compileView(source, target=None):
+	"""
+	Compile a Cheetah template into an importable python module, which is
+	preferred by getTemplateClass when installed next to the template.
+
+	Args:
+		source: template file
+		target: python module written, defaults to the one next to source
+	Returns:
+		seconds taken
+	"""
+	start = time()
+	module = basename(source)[:-5]
+	target = target or source[:-5] + ".py"
+	folder = dirname(target)
+	if folder and not isdir(folder):
+		makedirs(folder)
+	code = ensure_text(str(Compiler(file=source, moduleName=module, mainClassName=module)))
+	with io.open(target, "w", encoding="UTF-8") as fd:
+		fd.write(code)
+	return time() - start
+
+
+def compileViews(root, destination=None):
+	"""
+	Compile all templates below *root* into the same tree below
+	*destination*, or next to the templates.
+
+	Returns:
+		list of tuples (template file, seconds taken)
+	"""
+	report = []
+	for dirpath, dirnames, filenames in walk(root):
+		dirnames.sort()
+		for filename in sorted(filenames):
+			if filename.endswith(".tmpl"):
+				source = pathjoin(dirpath, filename)
+				target = pathjoin(destination, relpath(source, root))[:-5] + ".py" if destination else None
+				report.append((source, compileView(source, target)))
+	return report
+
+
+if __name__ == '__main__':
+	# templates.py <views directory> [<destination directory>]
+	total = 0.0
+	for source, taken in compileViews(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None):
+		total += taken
+		print("%8.3fs  %s" % (taken, source))
+	print("[templates] compiled in %.3fs" % total)
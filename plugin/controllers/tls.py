@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+
+##########################################################################
+# OpenWebif: tls
+##########################################################################
+# Copyright (C) 2011 - 2022 E2OpenPlugins
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston MA 02110-1301, USA.
+##########################################################################
+
+from time import time
+import re
+
+from OpenSSL import SSL
+from six import ensure_str
+from twisted.internet import ssl
+from twisted.internet.interfaces import IHandshakeListener
+from twisted.protocols import policies
+from zope.interface import implementer
+from Components.config import config
+
+from Plugins.Extensions.OpenWebif.controllers.metrics import recordHandshake
+
+#: cipher preference -> OpenSSL cipher list up to TLS 1.2, fast AEAD
+#: suites only, the first one preferred
+CIPHER_PREFERENCES = {
+	"chacha": "ECDHE+CHACHA20:ECDHE+AESGCM:DHE+CHACHA20:DHE+AESGCM:!aNULL:!MD5:!DSS",
+	"aesgcm": "ECDHE+AESGCM:ECDHE+CHACHA20:DHE+AESGCM:DHE+CHACHA20:!aNULL:!MD5:!DSS"
+}
+
+#: cipher preference -> TLS 1.3 cipher suites, set if pyOpenSSL allows it
+TLS13_SUITES = {
+	"chacha": b"TLS_CHACHA20_POLY1305_SHA256:TLS_AES_128_GCM_SHA256:TLS_AES_256_GCM_SHA384",
+	"aesgcm": b"TLS_AES_128_GCM_SHA256:TLS_AES_256_GCM_SHA384:TLS_CHACHA20_POLY1305_SHA256"
+}
+
+#: seconds a client may resume its TLS session
+TLS_SESSION_TIMEOUT = 3600
+
+#: session id context of the session cache, the same for all listeners
+TLS_SESSION_CONTEXT = b"OpenWebif"
+
+CPUINFO = "/proc/cpuinfo"
+
+_hasAES = re.compile(r"^(?:flags|features)\s*:.*\baes\b", re.I | re.M)
+_state = {"preference": None}
+_stats = {"handshakes": 0, "resumed": 0, "seconds": 0.0}
+# negotiated protocol and cipher -> handshakes
+_ciphers = {}
+
+
+def getCipherPreference():
+	"""
+	Get the cipher preference of the setting https_ciphers. The preference
+	"auto" is AES-GCM if the CPU has AES instructions and ChaCha20-Poly1305
+	otherwise, which is faster in software, e.g. on ARM and MIPS receivers
+	without the crypto extensions.
+	"""
+	preference = config.OpenWebif.https_ciphers.value
+	if preference != "auto":
+		return preference
+	if _state["preference"] is None:
+		try:
+			with open(CPUINFO) as fd:
+				_state["preference"] = "aesgcm" if _hasAES.search(fd.read()) else "chacha"
+		except (IOError, OSError):
+			_state["preference"] = "aesgcm"
+	return _state["preference"]
+
+
+def getCertificateOptions(key, cert, chain=None):
+	"""
+	Get the CertificateOptions of the HTTPS listener with session tickets
+	and the ciphers of the cipher preference.
+	"""
+	preference = getCipherPreference()
+	if preference in CIPHER_PREFERENCES:
+		ciphers = ssl.AcceptableCiphers.fromOpenSSLCipherString(CIPHER_PREFERENCES[preference])
+		return ssl.CertificateOptions(privateKey=key, certificate=cert, extraCertChain=chain, enableSessionTickets=True, acceptableCiphers=ciphers)
+	return ssl.CertificateOptions(privateKey=key, certificate=cert, extraCertChain=chain, enableSessionTickets=True)
+
+
+def tuneContext(ctx):
+	"""
+	Let clients of the SSL context *ctx* resume their session with a short
+	handshake from the server side session cache and make the server pick
+	the cipher. The TLS 1.3 suites of the cipher preference are set if
+	pyOpenSSL has a call for them, else OpenSSL's defaults apply.
+	"""
+	ctx.set_session_cache_mode(SSL.SESS_CACHE_SERVER)
+	ctx.set_session_id(TLS_SESSION_CONTEXT)
+	ctx.set_timeout(TLS_SESSION_TIMEOUT)
+	ctx.set_options(SSL.OP_CIPHER_SERVER_PREFERENCE)
+	suites = TLS13_SUITES.get(getCipherPreference())
+	setSuites = getattr(ctx, "set_ciphersuites", None) or getattr(ctx, "set_tls13_ciphersuites", None)
+	if suites and setSuites is not None:
+		setSuites(suites)
+
+
+def _isResumed(connection):
+	"""
+	Check whether *connection* resumed a session. Without a call for it in
+	pyOpenSSL, all handshakes count as full ones.
+	"""
+	reused = getattr(connection, "session_reused", None)
+	return bool(reused()) if reused is not None else False
+
+
+@implementer(IHandshakeListener)
+class TLSChannel(policies.ProtocolWrapper):
+	"""
+	Protocol of the HTTPS listener timing the TLS handshake of its
+	connection. It wraps the channel built by the site, which switches
+	to HTTP/2 when the client negotiates it.
+	"""
+	handshakeStarted = None
+
+	def makeConnection(self, transport):
+		# the wrapped channel gets connectionMade from its own makeConnection
+		self.handshakeStarted = time()
+		policies.ProtocolWrapper.makeConnection(self, transport)
+
+	def handshakeCompleted(self):
+		duration = time() - self.handshakeStarted
+		connection = self.transport.getHandle()
+		resumed = _isResumed(connection)
+		_stats["handshakes"] += 1
+		_stats["seconds"] += duration
+		if resumed:
+			_stats["resumed"] += 1
+		try:
+			cipher = "%s %s" % (ensure_str(connection.get_protocol_version_name()), ensure_str(connection.get_cipher_name()))
+		except (AttributeError, TypeError):
+			cipher = "unknown"
+		_ciphers[cipher] = _ciphers.get(cipher, 0) + 1
+		recordHandshake(duration, resumed)
+
+
+class TLSSiteFactory(policies.WrappingFactory):
+	"""
+	Factory of the HTTPS listener wrapping the channels of its site in a
+	TLSChannel.
+	"""
+	protocol = TLSChannel
+
+
+def getTLSStats():
+	ret = dict(_stats)
+	ret["preference"] = getCipherPreference() if config.OpenWebif.https_enabled.value else None
+	ret["average"] = ret["seconds"] / ret["handshakes"] if ret["handshakes"] else 0.0
+	ret["ciphers"] = dict(_ciphers)
+	return ret
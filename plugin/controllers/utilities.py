@@ -308,6 +308,116 @@ def getUrlArg2(args, key, default=None):
 	return default
 
 
+def moveToEnd(ordered, key):
+	"""
+	Move *key* to the end of the OrderedDict *ordered*, like its method
+	move_to_end, which Python 2 lacks.
+
+	>>> from collections import OrderedDict
+	>>> ordered = OrderedDict([("a", 1), ("b", 2)])
+	>>> moveToEnd(ordered, "a")
+	>>> list(ordered)
+	['b', 'a']
+	"""
+	if PY3:
+		ordered.move_to_end(key)
+	else:
+		ordered[key] = ordered.pop(key)
+
+
+#: names selecting a group of fields, the former fields of the movie list
+FIELD_GROUPS = {
+	"pos": ("lastseen",),
+	"desc": ("description", "descriptionExtended"),
+	"size": ("filesize", "filesize_readable"),
+}
+
+
+#: names of all fields in a group of FIELD_GROUPS
+GROUPED_FIELDS = frozenset(name for group in FIELD_GROUPS.values() for name in group)
+
+
+class FieldSelection(frozenset):
+	"""
+	Names of the fields selected by the argument fields, see getMovieFields.
+	With *others* set, the fields that are in no group of FIELD_GROUPS are
+	selected as well.
+	"""
+	others = False
+
+	def __contains__(self, name):
+		return frozenset.__contains__(self, name) or (self.others and name not in GROUPED_FIELDS)
+
+
+def getFieldNames(args):
+	"""
+	Get the names in the argument fields of the request arguments *args*.
+	"""
+	return [name.strip() for name in (getUrlArg2(args, "fields") or "").split(",") if name.strip()]
+
+
+def getFields(args):
+	"""
+	Get the names of the fields of list items selected by the argument
+	fields of the request arguments *args*, a comma separated list of keys,
+	or None for all fields.
+
+	>>> sorted(getFields({b"fields": [b"servicename, pos"]}))
+	['pos', 'servicename']
+	>>> getFields({}) is None
+	True
+	"""
+	names = getFieldNames(args)
+	return frozenset(names) if names else None
+
+
+def getMovieFields(args):
+	"""
+	Get the names of the fields of movie list items selected by the
+	argument fields of the request arguments *args*, see getFields. The
+	name of a group in FIELD_GROUPS selects all of its fields; a list of
+	group names only (the former form of the movie list) selects those
+	groups and all fields that are in no group.
+
+	>>> sorted(getMovieFields({b"fields": [b"eventname, desc"]}))
+	['description', 'descriptionExtended', 'eventname']
+	>>> fields = getMovieFields({b"fields": [b"pos,size"]})
+	>>> sorted(fields)
+	['filesize', 'filesize_readable', 'lastseen']
+	>>> "eventname" in fields, "lastseen" in fields, "description" in fields
+	(True, True, False)
+	"""
+	names = getFieldNames(args)
+	if not names:
+		return None
+	fields = set()
+	for name in names:
+		fields.update(FIELD_GROUPS.get(name, (name,)))
+	fields = FieldSelection(fields)
+	fields.others = all(name in FIELD_GROUPS for name in names)
+	return fields
+
+
+def wantsField(fields, *names):
+	"""
+	Check whether one of the fields *names* is selected by *fields*, see
+	getFields.
+	"""
+	return fields is None or any(name in fields for name in names)
+
+
+def projectFields(item, fields):
+	"""
+	Get the dict *item* with only the keys selected by *fields*.
+
+	>>> projectFields({"a": 1, "b": 2}, frozenset(["b", "c"]))
+	{'b': 2}
+	"""
+	if fields is None:
+		return item
+	return dict((key, value) for key, value in item.items() if key in fields)
+
+
 def removeBad(val):
 	if val is not None:
 		if PY3:
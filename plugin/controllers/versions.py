@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+##########################################################################
+# OpenWebif: versions
+##########################################################################
+# Copyright (C) 2011 - 2022 E2OpenPlugins
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston MA 02110-1301, USA.
+##########################################################################
+
+from hashlib import sha1
+from os import listdir, stat
+from os.path import join
+
+from six import ensure_binary
+import NavigationInstance
+
+BOUQUETS_PATH = "/etc/enigma2"
+
+# content source -> number of changes made through OpenWebif
+_counters = {"timers": 0, "bouquets": 0, "movies": 0, "epg": 0}
+
+# functions called with the name of a changed content source
+versionListeners = []
+
+
+def bumpVersion(source):
+	"""
+	Record a change of the content *source* (timers, bouquets, movies or
+	epg) and tell the listeners.
+	"""
+	_counters[source] += 1
+	for listener in versionListeners[:]:
+		listener(source)
+
+
+def getVersion(source):
+	return _counters[source]
+
+
+def _timerChanged(*args):
+	bumpVersion("timers")
+
+
+def watchRecordTimer():
+	"""
+	Bump the timers version whenever enigma2 adds, removes or changes a
+	record timer, if the RecordTimer of this image tells about it.
+	"""
+	rt = NavigationInstance.instance.RecordTimer
+	for name in ("onTimerAdded", "onTimerRemoved", "onTimerChanged"):
+		callbacks = getattr(rt, name, None)
+		if callbacks is not None and _timerChanged not in callbacks:
+			callbacks.append(_timerChanged)
+
+
+def getTimersVersion():
+	"""
+	Get a version of the timer list. Besides our own changes it covers
+	timers added, changed or run by enigma2 itself. The fingerprint is a
+	digest, not hash(), so it stays the same across restarts.
+	"""
+	rt = NavigationInstance.instance.RecordTimer
+	fingerprint = sha1(ensure_binary(repr([
+		(timer.begin, timer.end, timer.state, timer.disabled, timer.justplay, timer.name, timer.description, str(timer.service_ref), timer.repeated, timer.afterEvent, timer.dirname, len(timer.log_entries))
+		for timer in rt.timer_list + rt.processed_timers
+	]))).hexdigest()
+	return "%d.%s" % (_counters["timers"], fingerprint[:12])
+
+
+def getBouquetsVersion():
+	"""
+	Get a version of the bouquets, which enigma2 writes to the bouquet
+	files whenever they are changed.
+	"""
+	latest = 0
+	try:
+		for filename in listdir(BOUQUETS_PATH):
+			if filename.startswith("bouquets.") or filename.startswith("userbouquet.") or filename == "lamedb":
+				latest = max(latest, stat(join(BOUQUETS_PATH, filename)).st_mtime)
+	except OSError:
+		return None
+	return "%d.%d" % (_counters["bouquets"], latest * 1000)
+
+
+def getMoviesVersion(directory):
+	"""
+	Get a version of the movie *directory*. It changes with the directory
+	and with every file in it, so growing recordings and updated cut
+	lists are covered as well.
+	"""
+	try:
+		latest = stat(directory).st_mtime
+		for filename in listdir(directory):
+			latest = max(latest, stat(join(directory, filename)).st_mtime)
+	except OSError:
+		return None
+	return "%d.%d" % (_counters["movies"], latest * 1000)
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+##########################################################################
+# OpenWebif: watchdog
+##########################################################################
+# Copyright (C) 2011 - 2022 E2OpenPlugins
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston MA 02110-1301, USA.
+##########################################################################
+
+from collections import deque
+from threading import Thread, current_thread
+from time import time, sleep
+from traceback import format_stack
+import sys
+
+from six import ensure_str
+from twisted.internet.task import LoopingCall
+
+#: seconds between two heartbeats of the reactor
+HEARTBEAT_INTERVAL = 0.5
+
+#: seconds the reactor may be late before it counts as stalled
+STALL_THRESHOLD = 1.0
+
+#: number of stalls kept
+STALL_LOG_SIZE = 20
+
+_stalls = deque(maxlen=STALL_LOG_SIZE)
+_state = {"beat": 0.0, "lag": 0.0, "maxlag": 0.0, "stalls": 0, "request": None, "thread": None}
+
+
+def setCurrentRequest(request):
+	"""
+	Remember the request being processed by the reactor, for the stall
+	reports.
+	"""
+	_state["request"] = request
+
+
+def _heartbeat():
+	now = time()
+	if _state["beat"]:
+		lag = max(now - _state["beat"] - HEARTBEAT_INTERVAL, 0.0)
+		_state["lag"] = lag
+		_state["maxlag"] = max(_state["maxlag"], lag)
+	_state["beat"] = now
+
+
+def _watch(ident):
+	stalled = None
+	while True:
+		sleep(HEARTBEAT_INTERVAL / 2)
+		beat = _state["beat"]
+		lag = time() - beat - HEARTBEAT_INTERVAL
+		if lag < STALL_THRESHOLD:
+			stalled = None
+		elif stalled is None or stalled["beat"] != beat:
+			# capture the stack once per stall, while the reactor is still stuck
+			frame = sys._current_frames().get(ident)
+			request = _state["request"]
+			stalled = {
+				"beat": beat,
+				"begin": beat + HEARTBEAT_INTERVAL,
+				"lag": lag,
+				"uri": ensure_str(request.uri) if request is not None else None,
+				"stack": "".join(format_stack(frame)) if frame is not None else ""
+			}
+			_stalls.append(stalled)
+			_state["stalls"] += 1
+			print("[OpenWebif] reactor stalled for %.1fs in '%s'" % (lag, stalled["uri"]))
+		else:
+			stalled["lag"] = lag
+
+
+def startWatchdog():
+	"""
+	Start the reactor heartbeat and the thread watching it. Must be called
+	from the reactor thread.
+	"""
+	if _state["thread"] is not None:
+		return
+	_state["beat"] = 0.0
+	LoopingCall(_heartbeat).start(HEARTBEAT_INTERVAL)
+	thread = Thread(target=_watch, args=(current_thread().ident,), name="OpenWebif watchdog")
+	thread.daemon = True
+	thread.start()
+	_state["thread"] = thread
+
+
+def getStalls():
+	"""
+	Get the state of the watchdog and the recorded stalls, latest first.
+	"""
+	return {
+		"running": _state["thread"] is not None,
+		"threshold": STALL_THRESHOLD,
+		"lag": _state["lag"],
+		"maxlag": _state["maxlag"],
+		"count": _state["stalls"],
+		"stalls": [dict((key, value) for key, value in stall.items() if key != "beat") for stall in reversed(_stalls)]
+	}
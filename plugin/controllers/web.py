@@ -21,34 +21,77 @@
 ##########################################################################
 
 from __future__ import absolute_import, division
+from datetime import datetime
 from re import match
+from xml.sax.saxutils import escape as xmlescape, quoteattr
 from six import ensure_str, ensure_binary
+from six.moves.urllib.parse import unquote
+from twisted.internet import defer
+from twisted.web import http
 from Components.config import config as comp_config
 from Screens.InfoBar import InfoBar
 
 from .models.info import getInfo, getCurrentTime, getStatusInfo, getFrontendStatus, testPipStatus
-from .models.services import getCurrentService, getBouquets, getServices, getSubServices, getSatellites, getBouquetEpg, getBouquetNowNextEpg, getMultiChannelNowNextEpg, getSearchEpg, getSimilarEpg, getChannelEpg, getNowNextEpg, getAllServices, getPlayableServices, getPlayableService, getParentalControlList, getEvent, getServiceRef, getPicon
+from .models.services import getCurrentService, getBouquets, getServices, getSubServices, getSatellites, getBouquetEpg, iterBouquetEpg, getBouquetNowNextEpg, getMultiChannelNowNextEpg, getSearchEpg, getSimilarEpg, getChannelEpg, getNowNextEpg, getAllServices, getPlayableServices, getPlayableService, getParentalControlList, getEvent, getServiceRef, getPicon
 from .models.volume import getVolumeStatus, setVolumeUp, setVolumeDown, setVolumeMute, setVolume
 from .models.audiotrack import getAudioTracks, setAudioTrack
 from .models.control import zapService, remoteControl, setPowerState, getStandbyState
 from .models.locations import getLocations, getCurrentLocation, addLocation, removeLocation
 from .models.timers import getTimers, addTimer, addTimerByEventId, editTimer, removeTimer, toggleTimerStatus, cleanupTimer, writeTimerList, recordNow, tvbrowser, getSleepTimer, setSleepTimer, getPowerTimer, setPowerTimer, getVPSChannels
 from .models.message import sendMessage, getMessageAnswer
-from .models.movies import getMovieList, removeMovie, getMovieInfo, moveMovie, renameMovie, getAllMovies, getMovieDetails
+from .models.movies import getMovieList, getMovieDirectory, getMovieSubdirs, removeMovie, getMovieInfo, moveMovie, renameMovie, getAllMovies, getMovieDetails
 from .models.config import getSettings, addCollapsedMenu, removeCollapsedMenu, saveConfig, getConfigs, getConfigsSections, getUtcOffset
 from .models.stream import getStream, getTS, getStreamSubservices, GetSession
 from .models.servicelist import reloadServicesLists
 from .models.mediaplayer import mediaPlayerAdd, mediaPlayerRemove, mediaPlayerPlay, mediaPlayerCommand, mediaPlayerCurrent, mediaPlayerList, mediaPlayerLoad, mediaPlayerSave, mediaPlayerFindFile
 from .models.plugins import reloadPlugins
+from .versions import bumpVersion, getTimersVersion, getBouquetsVersion, getMoviesVersion
+from .responsecache import getResponseCacheStats
+from .singleflight import getSingleFlightStats
+from .workers import runInWorker, getWorkerStats
+from .watchdog import getStalls
+from .compression import getCompressionStats
+from .batch import parseBatch, runBatch
+from .events import EventsResource, getEventStats, notifyTopic
+from .admission import getAdmissionStats
+from .sessions import getSessionStats
+from .startup import getStartupReport
+from .tls import getTLSStats
+from .metrics import getPrometheusMetrics
+from .profiler import profileWindow, formatStats, dumpStats
+from .templates import getTemplateCacheStats
+from .producers import CooperativeItems, getProducerStats
 
 from .i18n import _
 from .base import BaseController
 from .stream import StreamController
-from .utilities import getUrlArg
-from .defaults import PICON_PATH
+from .utilities import getUrlArg, getMovieFields, e2simplexmlresult
+from .defaults import getCapability
 from .epg import EPG
 
 
+def getCacheStats():
+	return {
+		"responses": getResponseCacheStats(),
+		"templates": getTemplateCacheStats(),
+		"singleflight": getSingleFlightStats()
+	}
+
+
+#: section of /api/stats -> function getting its statistics
+STATS_SECTIONS = {
+	"admission": getAdmissionStats,
+	"cache": getCacheStats,
+	"compression": getCompressionStats,
+	"events": getEventStats,
+	"producers": getProducerStats,
+	"sessions": getSessionStats,
+	"startup": getStartupReport,
+	"tls": getTLSStats,
+	"workers": getWorkerStats,
+}
+
+
 def whoami(request):
 	port = comp_config.OpenWebif.port.value
 	proto = 'http'
@@ -70,6 +113,41 @@ class WebController(BaseController):
 	https://dream.reichholf.net/e2web/.
 	"""
 
+	# page: (seconds to cache the response, content sources it depends on)
+	cachedPages = {
+		"getservices": (300, ("bouquets",)),
+		"getallservices": (300, ("bouquets",)),
+		"bouquets": (300, ("bouquets",)),
+		"getsatellites": (300, ("bouquets",)),
+		"timerlist": (60, ("timers",)),
+		"movielist": (60, ("movies",)),
+		"epgnow": (10, ("epg", "bouquets", "timers")),
+		"epgnext": (10, ("epg", "bouquets", "timers")),
+		"epgnownext": (10, ("epg", "bouquets", "timers")),
+		"epgbouquet": (30, ("epg", "bouquets", "timers")),
+		"epgmulti": (30, ("epg", "bouquets", "timers")),
+		"epgservice": (30, ("epg", "timers")),
+		"epgsearch": (30, ("epg", "timers")),
+	}
+
+	# polled pages without version source answered with 304 Not Modified by the hash of their body
+	etagPages = ("statusinfo", "getcurrent")
+
+	# pages whose handler runs once for identical concurrent requests
+	coalescedPages = ("getservices", "getallservices", "epgbouquet", "epgmulti", "epgnow", "epgnext", "epgnownext")
+
+	# pages run in the worker pool
+	blockingPages = ("mediaplayerfindfile",)
+
+	# pages limited by the admission control like the blocking pages
+	heavyPages = (
+		"getallservices", "epgbouquet", "epgmulti", "epgsearch", "epgsearchrss", "epgservice", "epgsimilar",
+		"epgmultichannelnownext", "movielist", "fullmovielist", "movielisthtml", "batch"
+	)
+
+	# pages exporting large lists, with the lowest limits of the admission control
+	exportPages = ("epgxmltv", "epgmultigz", "servicesm3u", "servicesxspf", "movielistm3u", "movielistrss", "saveepg")
+
 	def __init__(self, session, path=""):
 		BaseController.__init__(self, path=path, session=session)
 		self.putChild(b"stream", StreamController(session))
@@ -94,6 +172,27 @@ class WebController(BaseController):
 
 		return None
 
+	def getTimeRange(self, request):
+		"""
+		Get the arguments time and endTime of an EPG request, -1 if not given.
+		"""
+		begintime = -1
+		if b"time" in list(request.args.keys()):
+			try:
+				begintime = int(request.args[b"time"][0])
+			except ValueError:
+				pass
+
+		# TODO: test -1 actually works
+		endtime = -1
+		if b"endTime" in list(request.args.keys()):
+			try:
+				endtime = int(request.args[b"endTime"][0])
+			except ValueError:
+				pass
+		return begintime, endtime
+
+
 	def P_tsstart(self, request):
 		"""
 		Request handler for the `tsstart` endpoint.
@@ -192,7 +291,7 @@ class WebController(BaseController):
 
 	def P_statusinfo(self, request):
 		# we don't need to fill logs with this api (it's called too many times)
-		self.suppresslog = True
+		request.suppresslog = True
 		return getStatusInfo(self)
 
 	def P_pipinfo(self, request):
@@ -238,6 +337,9 @@ class WebController(BaseController):
 		elif _set == "down":
 			return setVolumeDown()
 		elif _set == "mute":
+			# muting does not change the saved volume, which the event stream watches
+			notifyTopic("volume")
+			notifyTopic("status")
 			return setVolumeMute()
 		elif _set[:3] == "set":
 			try:
@@ -494,7 +596,7 @@ class WebController(BaseController):
 		excludeiptv = "iptv" in excludes
 		excludelastscanned = "lastscanned" in excludes
 
-		bouquets = getAllServices(mode, noiptv=noiptv or excludeiptv, nolastscanned=nolastscanned or excludelastscanned, removenamefromsref=removenamefromsref, showall=showall, showproviders=showproviders, excludeprogram=excludeprogram, excludevod=excludevod)
+		bouquets = getAllServices(mode, noiptv=noiptv or excludeiptv, nolastscanned=nolastscanned or excludelastscanned, removeNameFromsref=removeNameFromsref, showAll=showAll, showProviders=showProviders, excludeprogram=excludeprogram, excludevod=excludevod)
 		if b"renameserviceforxmbc" in list(request.args.keys()):
 			for bouquet in bouquets["services"]:
 				for service in bouquet["subservices"]:
@@ -502,6 +604,9 @@ class WebController(BaseController):
 						service["servicename"] = "%d - %s" % (service["pos"], service["servicename"])
 		return bouquets
 
+	def V_getallservices(self, request):
+		return getBouquetsVersion()
+
 	def P_getservices(self, request):
 		"""
 		Request handler for the `getservices` endpoint.
@@ -524,7 +629,10 @@ class WebController(BaseController):
 			showProviders = True
 		picon = True if getUrlArg(request, "picon", "0") in ("1", "true") else False
 		removeNameFromsref = True if getUrlArg(request, "removenamefromsref", "0") in ("1", "true") else False
-		return getServices(sRef=sRef, showAll=True, showHidden=hidden, showProviders=showProviders, picon=picon, removeNameFromsref=removeNameFromsref)
+		return getServices(sRef=sRef, showAll=True, showHidden=hidden, showProviders=showProviders, picon=picon, removeNameFromsref=removeNameFromsref, fields=self.getFields(request))
+
+	def V_getservices(self, request):
+		return getBouquetsVersion()
 
 	def P_servicesxspf(self, request):
 		"""
@@ -774,10 +882,36 @@ class WebController(BaseController):
 		Returns:
 			HTTP response with headers
 		"""
-		return getMovieList(request.args)
+		return self.getMovieList(request)
+
+	def V_movielist(self, request):
+		if b"recursive" in request.args:
+			return None
+		return getMoviesVersion(getMovieDirectory(getUrlArg(request, "dirname")))
+
+	def getMovieList(self, request):
+		"""
+		Get the movie list for *request*. The directories of recursive lists
+		are collected in the worker pool. The argument fields applies to the
+		templates of the movie list too and keeps its group names, as it did
+		before it was extended to the other lists (see getMovieFields).
+
+		Returns:
+			movie list or, for recursive lists, a Deferred firing with it
+		"""
+		fields = request.fields = getMovieFields(request.args)
+		if b"recursive" in request.args:
+			d = runInWorker(getMovieSubdirs, getMovieDirectory(getUrlArg(request, "dirname")))
+			return d.addCallback(lambda subdirs: getMovieList(request.args, subdirs=subdirs, fields=fields))
+		return getMovieList(request.args, fields=fields)
+
+	def addMovieListHost(self, movielist, request):
+		movielist["host"] = "%s://%s:%s" % (whoami(request)['proto'], request.getRequestHostname(), whoami(request)['port'])
+		return movielist
 
 	def P_fullmovielist(self, request):
-		return getAllMovies()
+		fields = request.fields = getMovieFields(request.args)
+		return getAllMovies(fields)
 
 	def P_movielisthtml(self, request):
 		"""
@@ -794,7 +928,7 @@ class WebController(BaseController):
 			HTTP response with headers
 		"""
 		request.setHeader("content-type", "text/html")
-		return getMovieList(request.args)
+		return self.getMovieList(request)
 
 	def P_movielistm3u(self, request):
 		"""
@@ -811,9 +945,7 @@ class WebController(BaseController):
 			HTTP response with headers
 		"""
 		request.setHeader('Content-Type', 'application/x-mpegurl')
-		movielist = getMovieList(request.args)
-		movielist["host"] = "%s://%s:%s" % (whoami(request)['proto'], request.getRequestHostname(), whoami(request)['port'])
-		return movielist
+		return defer.maybeDeferred(self.getMovieList, request).addCallback(self.addMovieListHost, request)
 
 	def P_movielistrss(self, request):
 		"""
@@ -828,9 +960,7 @@ class WebController(BaseController):
 		Returns:
 			HTTP response with headers
 		"""
-		movielist = getMovieList(request.args)
-		movielist["host"] = "%s://%s:%s" % (whoami(request)['proto'], request.getRequestHostname(), whoami(request)['port'])
-		return movielist
+		return defer.maybeDeferred(self.getMovieList, request).addCallback(self.addMovieListHost, request)
 
 	def P_moviedelete(self, request):
 		"""
@@ -850,6 +980,7 @@ class WebController(BaseController):
 			return res
 		sRef = getUrlArg(request, "sRef")
 		force = getUrlArg(request, "force") != None
+		bumpVersion("movies")
 		return removeMovie(self.session, sRef, force)
 
 	def P_moviemove(self, request):
@@ -874,6 +1005,7 @@ class WebController(BaseController):
 
 		sRef = getUrlArg(request, "sRef")
 		dirname = getUrlArg(request, "dirname")
+		bumpVersion("movies")
 		return moveMovie(self.session, sRef, dirname)
 
 	def P_movierename(self, request):
@@ -897,6 +1029,7 @@ class WebController(BaseController):
 			return res
 		sRef = getUrlArg(request, "sRef")
 		newname = getUrlArg(request, "newname")
+		bumpVersion("movies")
 		return renameMovie(self.session, sRef, newname)
 
 	# DEPRECATED use movieinfo
@@ -918,6 +1051,8 @@ class WebController(BaseController):
 		_sRef = getUrlArg(request, "sRef")
 		if _sRef == None:
 			_sRef = getUrlArg(request, "sref")
+		if _add or _del:
+			bumpVersion("movies")
 		return getMovieInfo(_sRef, _add, _del)
 
 	def P_movieinfo(self, request):
@@ -941,6 +1076,7 @@ class WebController(BaseController):
 			_title = getUrlArg(request, "title")
 			_cuts = getUrlArg(request, "cuts")
 			_desc = getUrlArg(request, "desc")
+			bumpVersion("movies")
 			return getMovieInfo(_sRef, _addtag, _deltag, _title, _cuts, _desc, True)
 		else:
 			return getMovieInfo()
@@ -1042,11 +1178,14 @@ class WebController(BaseController):
 		Returns:
 			HTTP response with headers
 		"""
-		ret = getTimers(self.session)
+		ret = getTimers(self.session, self.getFields(request))
 		ret["locations"] = comp_config.movielist.videodirs.value
 		ret["default"] = comp_config.usage.default_path.value
 		return ret
 
+	def V_timerlist(self, request):
+		return getTimersVersion()
+
 	def _AddEditTimer(self, request, mode):
 
 		disabled = getUrlArg(request, "disabled") == "1"
@@ -1194,6 +1333,7 @@ class WebController(BaseController):
 		if res:
 			return res
 
+		bumpVersion("timers")
 		return self._AddEditTimer(request, 0)
 
 	def P_timeraddbyeventid(self, request):
@@ -1223,6 +1363,7 @@ class WebController(BaseController):
 		if res:
 			return res
 
+		bumpVersion("timers")
 		return self._AddEditTimer(request, 1)
 
 	def P_timerchange(self, request):
@@ -1260,6 +1401,7 @@ class WebController(BaseController):
 		if res:
 			return res
 
+		bumpVersion("timers")
 		return self._AddEditTimer(request, 2)
 
 	def P_timertogglestatus(self, request):
@@ -1294,6 +1436,7 @@ class WebController(BaseController):
 				"message": "The parameter 'end' must be a number"
 			}
 
+		bumpVersion("timers")
 		return toggleTimerStatus(self.session, getUrlArg(request, "sRef"), begin, end)
 
 	def P_timerdelete(self, request):
@@ -1335,6 +1478,7 @@ class WebController(BaseController):
 		except Exception:  # nosec # noqa: E722
 			eit = None
 
+		bumpVersion("timers")
 		return removeTimer(self.session, getUrlArg(request, "sRef"), begin, end, eit)
 
 	def P_timercleanup(self, request):
@@ -1350,6 +1494,7 @@ class WebController(BaseController):
 		Returns:
 			HTTP response with headers
 		"""
+		bumpVersion("timers")
 		return cleanupTimer(self.session)
 
 	def P_timerlistwrite(self, request):
@@ -1383,6 +1528,7 @@ class WebController(BaseController):
 		infinite = False
 		if b"undefinitely" in list(request.args.keys()) or b"infinite" in list(request.args.keys()):
 			infinite = True
+		bumpVersion("timers")
 		return recordNow(self.session, infinite)
 
 	def P_currenttime(self, request):
@@ -1437,22 +1583,8 @@ class WebController(BaseController):
 		if res:
 			return res
 
-		begintime = -1
-		if b"time" in list(request.args.keys()):
-			try:
-				begintime = int(request.args[b"time"][0])
-			except ValueError:
-				pass
-
-		# TODO: test -1 actually works
-		endtime = -1
-		if b"endTime" in list(request.args.keys()):
-			try:
-				endtime = int(request.args[b"endTime"][0])
-			except ValueError:
-				pass
-
-		return getBouquetEpg(getUrlArg(request, "bRef"), begintime, endtime, self.isJson)
+		begintime, endtime = self.getTimeRange(request)
+		return getBouquetEpg(getUrlArg(request, "bRef"), begintime, endtime, self.isJson, self.getFields(request))
 
 	# http://enigma2/api/epgmulti?bRef=1%3A7%3A1%3A0%3A0%3A0%3A0%3A0%3A0%3A0%3A%20FROM%20BOUQUET%20"userbouquet.favourites.tv"%20ORDER%20BY%20bouquet
 	# http://enigma2/web/epgmulti?bRef=1%3A7%3A1%3A0%3A0%3A0%3A0%3A0%3A0%3A0%3A%20FROM%20BOUQUET%20"userbouquet.favourites.tv"%20ORDER%20BY%20bouquet
@@ -1474,21 +1606,8 @@ class WebController(BaseController):
 		if res:
 			return res
 
-		begintime = -1
-		if b"time" in list(request.args.keys()):
-			try:
-				begintime = int(request.args[b"time"][0])
-			except ValueError:
-				pass
-
-		# TODO: test -1 actually works
-		endtime = -1
-		if b"endTime" in list(request.args.keys()):
-			try:
-				endtime = int(request.args[b"endTime"][0])
-			except ValueError:
-				pass
-		return getBouquetEpg(getUrlArg(request, "bRef"), begintime, endtime, self.isJson)
+		begintime, endtime = self.getTimeRange(request)
+		return getBouquetEpg(getUrlArg(request, "bRef"), begintime, endtime, self.isJson, self.getFields(request))
 
 	def P_epgxmltv(self, request):
 		"""
@@ -1507,13 +1626,39 @@ class WebController(BaseController):
 		"""
 		res = self.testMandatoryArguments(request, ["bRef", "lang"])
 		if res:
-			return res
-		ret = self.P_epgmulti(request)
+			if self.isJson:
+				return res
+			# there is no template for epgxmltv, so the error is sent as it is
+			request.isCustom = True
+			return e2simplexmlresult(False, ensure_binary(xmlescape(res["message"])))
 		bRef = getUrlArg(request, "bRef")
-		ret["services"] = getServices(bRef, True, False)["services"]
-		ret["lang"] = getUrlArg(request, "lang")
-		ret["offset"] = getUtcOffset()
-		return ret
+		begintime, endtime = self.getTimeRange(request)
+		# the events are converted and sent in time slices, see CooperativeProducer
+		events = iterBouquetEpg(unquote(bRef), begintime, endtime, self.isJson, self.getFields(request))
+		services = getServices(bRef, True, False)["services"]
+		lang = getUrlArg(request, "lang")
+		offset = getUtcOffset()
+		if self.isJson:
+			return {"events": CooperativeItems(events), "result": True, "services": services, "lang": lang, "offset": offset}
+		return self.renderXMLTV(services, events, lang, offset["utcoffset"])
+
+	def renderXMLTV(self, services, events, lang, utcoffset):
+		lang = quoteattr(lang)
+		yield '<?xml version="1.0" encoding="UTF-8"?>\n<tv source-info-url="https://github.com/OpenVisionE2/OpenWebif" source-info-name="OpenWebif">\n'
+		for service in services:
+			yield '\t<channel id=%s>\n\t\t<display-name>%s</display-name>\n\t</channel>\n' % (quoteattr(service["servicereference"]), xmlescape(service["servicename"]))
+		for event in events:
+			begin = event["begin_timestamp"]
+			yield '\t<programme start="%s %s" stop="%s %s" channel=%s>\n\t\t<title lang=%s>%s</title>\n\t\t<sub-title lang=%s>%s</sub-title>\n\t\t<desc lang=%s>%s</desc>\n%s\t</programme>\n' % (
+				datetime.utcfromtimestamp(begin).strftime("%Y%m%d%H%M%S"), utcoffset,
+				datetime.utcfromtimestamp(begin + event["duration_sec"]).strftime("%Y%m%d%H%M%S"), utcoffset,
+				quoteattr(event["sref"]),
+				lang, xmlescape(str(event["title"])),
+				lang, xmlescape(str(event["shortdesc"])),
+				lang, xmlescape(str(event["longdesc"])),
+				'\t\t<category lang=%s id="%s">%s</category>\n' % (lang, event["genreid"], xmlescape(event["genre"])) if event["genreid"] != 0 else ""
+			)
+		yield '</tv>\n'
 
 	# http://enigma2/api/epgnow?bRef=1%3A7%3A1%3A0%3A0%3A0%3A0%3A0%3A0%3A0%3A%20FROM%20BOUQUET%20"userbouquet.favourites.tv"%20ORDER%20BY%20bouquet
 	# http://enigma2/web/epgnow?bRef=1%3A7%3A1%3A0%3A0%3A0%3A0%3A0%3A0%3A0%3A%20FROM%20BOUQUET%20"userbouquet.favourites.tv"%20ORDER%20BY%20bouquet
@@ -1592,7 +1737,7 @@ class WebController(BaseController):
 			fulldesc = False
 			if b"full" in list(request.args.keys()):
 				fulldesc = True
-			return getSearchEpg(search, endtime, fulldesc, False, self.isJson)
+			return getSearchEpg(search, endtime, fulldesc, False, self.isJson, self.getFields(request))
 		else:
 			res = self.testMandatoryArguments(request, ["eventid"])
 			if res:
@@ -1852,7 +1997,7 @@ class WebController(BaseController):
 			:query string ref: service reference
 			:query string name: service name
 		"""
-		self.isCustom = True
+		request.isCustom = True
 		if comp_config.OpenWebif.webcache.zapstream.value:
 			ref = getUrlArg(request, "ref")
 			if ref != None:
@@ -1876,11 +2021,11 @@ class WebController(BaseController):
 		.. http:get:: /web/ts.m3u
 
 		"""
-		self.isCustom = True
+		request.isCustom = True
 		return getTS(self.session, request)
 
 	def P_videom3u(self, request):
-		self.isCustom = True
+		request.isCustom = True
 		return getStream(self.session, request, "video.m3u")
 
 	def P_streamcurrentm3u(self, request):
@@ -1899,7 +2044,7 @@ class WebController(BaseController):
 		.. http:get:: /web/streamcurrent.m3u
 
 		"""
-		self.isCustom = True
+		request.isCustom = True
 		return getStream(self.session, request, "streamcurrent.m3u")
 
 	def P_streamsubservices(self, request):
@@ -1936,6 +2081,7 @@ class WebController(BaseController):
 			HTTP response with headers
 		"""
 		mode = getUrlArg(request, "mode")
+		bumpVersion("bouquets")
 		return reloadServicesLists(self.session, mode)
 
 	def P_tvbrowser(self, request):
@@ -1951,6 +2097,7 @@ class WebController(BaseController):
 		Returns:
 			HTTP response with headers
 		"""
+		bumpVersion("timers")
 		return tvbrowser(self.session, request)
 
 	def P_saveconfig(self, request):
@@ -2189,6 +2336,9 @@ class WebController(BaseController):
 		stype = getUrlArg(request, "stype", "tv")
 		return getBouquets(stype)
 
+	def V_bouquets(self, request):
+		return getBouquetsVersion()
+
 	def P_epgmultigz(self, request):
 		return self.P_epgmulti(request)
 
@@ -2230,6 +2380,7 @@ class WebController(BaseController):
 			HTTP response with headers
 		"""
 		EPG().load()
+		bumpVersion("epg")
 
 		return {
 			"result": True,
@@ -2402,7 +2553,7 @@ class WebController(BaseController):
 		pp = getPicon(sRef, path, False)
 		if pp is not None:
 			if path is None:
-				path = PICON_PATH
+				path = getCapability("PICON_PATH")
 			link = pp
 			pp = pp.replace("/picon/", path)
 		if json == 'true':
@@ -2411,7 +2562,7 @@ class WebController(BaseController):
 			else:
 				return {"result": False}
 		else:
-			self.isImage = True
+			request.isImage = True
 			return pp
 
 	def P_setthememode(self, request):
@@ -2432,8 +2583,144 @@ class WebController(BaseController):
 
 
 class ApiController(WebController):
+	isJson = True
+
 	def __init__(self, session, path=""):
 		WebController.__init__(self, session, path)
+		self.putChild2("events", EventsResource(session))
 
 	def prePageLoad(self, request):
-		self.isJson = True
+		# JSON responses set their own content type
+		pass
+
+	def P_batch(self, request):
+		"""
+		Request handler for the `batch` endpoint.
+		Run several API requests in one round-trip. The requests are posted
+		as JSON list (or given in the argument requests), e.g.
+		`[{"path": "statusinfo"}, {"id": "tv", "path": "getservices", "args": {"sRef": "..."}}]`,
+		and answered with the response of each one by its id, which
+		defaults to its path. A failing request only fails its own response.
+
+		.. note::
+
+			Not available in *Enigma2 WebInterface API*.
+
+		Args:
+			request (twisted.web.server.Request): HTTP request object
+		Returns:
+			HTTP response with headers
+		"""
+		try:
+			batch = parseBatch(request)
+		except ValueError as exc:
+			request.setResponseCode(http.BAD_REQUEST)
+			return {"result": False, "message": str(exc)}
+		return runBatch(self, request, batch).addCallback(lambda responses: {"result": True, "responses": responses})
+
+	def P_stats(self, request):
+		"""
+		Request handler for the `stats` endpoint.
+		Get the statistics of the web server. The argument section selects
+		a comma separated subset of the sections in STATS_SECTIONS:
+
+		* admission: limits of the admission control, requests running, waiting, admitted and rejected
+		* cache: size and hit ratio of the response and template caches, requests which shared the data of another one
+		* compression: current level, responses compressed or skipped and the ratio achieved
+		* events: subscribers of `/api/events`, box states computed and pushed
+		* producers: responses written in time slices, their fragments and failures
+		* sessions: web sessions and how many were created, expired or dropped
+		* startup: time of the boot steps, capability probes and controller mounts
+		* tls: TLS handshakes of the HTTPS listener, sessions resumed and ciphers negotiated
+		* workers: queue depth and timings of the worker pool
+
+		.. note::
+
+			Not available in *Enigma2 WebInterface API*.
+
+		Args:
+			request (twisted.web.server.Request): HTTP request object
+		Returns:
+			HTTP response with headers
+		"""
+		sections = [section.strip() for section in (getUrlArg(request, "section") or "").split(",") if section.strip()] or sorted(STATS_SECTIONS)
+		unknown = [section for section in sections if section not in STATS_SECTIONS]
+		if unknown:
+			return {"result": False, "message": "unknown section %s" % ",".join(unknown)}
+		ret = dict((section, STATS_SECTIONS[section]()) for section in sections)
+		ret["result"] = True
+		return ret
+
+	def P_stalls(self, request):
+		"""
+		Request handler for the `stalls` endpoint.
+		Get the reactor lag and the latest stalls with the stack of the
+		reactor thread and the request it was processing.
+
+		.. note::
+
+			Not available in *Enigma2 WebInterface API*.
+
+		Args:
+			request (twisted.web.server.Request): HTTP request object
+		Returns:
+			HTTP response with headers
+		"""
+		ret = getStalls()
+		ret["result"] = True
+		return ret
+
+	def P_metrics(self, request):
+		"""
+		Request handler for the `metrics` endpoint.
+		Get request counts, latency and response size histograms per
+		endpoint in the Prometheus text format.
+
+		.. note::
+
+			Not available in *Enigma2 WebInterface API*.
+
+		Args:
+			request (twisted.web.server.Request): HTTP request object
+		Returns:
+			HTTP response with headers
+		"""
+		request.isCustom = True
+		request.setHeader("content-type", "text/plain; version=0.0.4; charset=utf-8")
+		return getPrometheusMetrics()
+
+	def P_profile(self, request):
+		"""
+		Request handler for the `profile` endpoint.
+		Profile everything the web server does for some seconds and
+		respond with the stats, as text or as pstats dump.
+
+		.. note::
+
+			Not available in *Enigma2 WebInterface API*.
+
+		Args:
+			request (twisted.web.server.Request): HTTP request object
+		Query:
+			seconds: length of the profiling window, default 10
+			sort: sort order of the text stats, default cumulative
+			format: text or pstats
+		Returns:
+			HTTP response with headers
+		"""
+		if not comp_config.OpenWebif.profiling.value:
+			return {"result": False, "message": _("Profiling is disabled in the settings")}
+		try:
+			seconds = max(int(getUrlArg(request, "seconds", "10")), 1)
+		except ValueError:
+			seconds = 10
+		d = profileWindow(seconds)
+		if d is None:
+			return {"result": False, "message": _("Profiling is already running")}
+		request.isCustom = True
+		if getUrlArg(request, "format") == "pstats":
+			request.setHeader("content-type", "application/octet-stream")
+			request.setHeader("content-disposition", 'attachment; filename="openwebif.pstats"')
+			return d.addCallback(dumpStats)
+		request.setHeader("content-type", "text/plain; charset=utf-8")
+		return d.addCallback(formatStats, getUrlArg(request, "sort", "cumulative"))
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+##########################################################################
+# OpenWebif: workers
+##########################################################################
+# Copyright (C) 2011 - 2022 E2OpenPlugins
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software Foundation,
+# Inc., 51 Franklin Street, Fifth Floor, Boston MA 02110-1301, USA.
+##########################################################################
+
+from threading import Lock
+from time import time
+
+from twisted.internet import reactor, threads
+from twisted.python.threadable import isInIOThread
+from twisted.python.threadpool import ThreadPool
+
+#: maximum number of threads running blocking handlers
+WORKER_THREADS = 3
+
+_pool = None
+_lock = Lock()
+_stats = {"queued": 0, "running": 0, "completed": 0, "failed": 0, "maxqueued": 0, "waittime": 0.0, "runtime": 0.0}
+
+
+def getWorkerPool():
+	global _pool
+	if _pool is None:
+		_pool = ThreadPool(0, WORKER_THREADS, "OpenWebif")
+		_pool.start()
+		reactor.addSystemEventTrigger("during", "shutdown", _pool.stop)
+	return _pool
+
+
+def runInWorker(func, *args, **kwargs):
+	"""
+	Run the blocking function *func* in the worker pool, so the reactor
+	keeps serving other clients. Calls into enigma2 from *func* must go
+	through callInReactor.
+
+	Returns:
+		Deferred firing with the result of *func* in the reactor thread
+	"""
+	queued = time()
+
+	def _run():
+		with _lock:
+			_stats["queued"] -= 1
+			_stats["running"] += 1
+			_stats["waittime"] += time() - queued
+		start = time()
+		failed = True
+		try:
+			ret = func(*args, **kwargs)
+			failed = False
+			return ret
+		finally:
+			with _lock:
+				_stats["running"] -= 1
+				_stats["failed" if failed else "completed"] += 1
+				_stats["runtime"] += time() - start
+
+	with _lock:
+		_stats["queued"] += 1
+		_stats["maxqueued"] = max(_stats["maxqueued"], _stats["queued"])
+	return threads.deferToThreadPool(reactor, getWorkerPool(), _run)
+
+
+def callInReactor(func, *args, **kwargs):
+	"""
+	Call *func* in the reactor thread and wait for its result. enigma2 is
+	not thread safe, so workers must call into it this way.
+	"""
+	if isInIOThread():
+		return func(*args, **kwargs)
+	return threads.blockingCallFromThread(reactor, func, *args, **kwargs)
+
+
+def getWorkerStats():
+	with _lock:
+		ret = dict(_stats)
+	ret["threads"] = WORKER_THREADS
+	done = ret["completed"] + ret["failed"]
+	ret["avgwait"] = ret["waittime"] / done if done else 0.0
+	ret["avgrun"] = ret["runtime"] / done if done else 0.0
+	return ret
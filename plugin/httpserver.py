@@ -30,17 +30,34 @@ from twisted.web import server, http, resource
 from twisted.internet.error import CannotListenError
 
 from Plugins.Extensions.OpenWebif.controllers.root import RootController
+from Plugins.Extensions.OpenWebif.controllers.base import invalidateMainTemplate
+from Plugins.Extensions.OpenWebif.controllers.templates import warmupTemplates, WARMUP_VIEWS
+from Plugins.Extensions.OpenWebif.controllers.defaults import getViewsPath
+from Plugins.Extensions.OpenWebif.controllers.versions import watchRecordTimer
+from Plugins.Extensions.OpenWebif.controllers.watchdog import startWatchdog, setCurrentRequest
+from Plugins.Extensions.OpenWebif.controllers.metrics import recordRequest
+from Plugins.Extensions.OpenWebif.controllers.profiler import isProfiling, formatStats
+from Plugins.Extensions.OpenWebif.controllers.compression import getEncoder
+from Plugins.Extensions.OpenWebif.controllers.sessions import attachSite, findSession, findStreamSession
+from Plugins.Extensions.OpenWebif.controllers.startup import timedStep, startupDone
+from Plugins.Extensions.OpenWebif.controllers.utilities import moveToEnd
+from Plugins.Extensions.OpenWebif.controllers.tls import getCertificateOptions, tuneContext, TLSSiteFactory
 from Plugins.Extensions.OpenWebif.sslcertificate import SSLCertificateGenerator, KEY_FILE, CERT_FILE, CA_FILE, CHAIN_FILE
 from socket import has_ipv6
 from OpenSSL import SSL
 from OpenSSL import crypto
 from Components.Network import iNetwork
 
-from os import listdir, remove
+from os import listdir, remove, stat, urandom
 from os.path import exists
+from time import time
+from collections import OrderedDict
+from hashlib import sha256
+from cProfile import Profile
+import hmac
 import imp
 import ipaddress
-from six import text_type, ensure_str
+from six import text_type, ensure_str, ensure_binary
 import shutil
 
 global listener, server_to_stop, site, sslsite
@@ -48,6 +65,34 @@ listener = []
 
 INET6 = "/proc/net/if_inet6"
 
+# seconds the parsed local networks are used before they are read again
+NETWORKS_TTL = 60
+
+# seconds the parsed local networks are used at least before a peer outside of them reads them again
+NETWORKS_RECHECK = 5
+
+# maximum number of peers remembered by checkPeer
+PEER_CACHE_SIZE = 256
+
+_networks = {"expires": 0, "built": 0, "table": []}
+_peers = {}
+
+# seconds a successful login is remembered
+CREDENTIALS_TTL = 300
+
+# maximum number of remembered logins
+CREDENTIALS_CACHE_SIZE = 32
+
+CREDENTIALS_FILES = ("/etc/passwd", "/etc/shadow")
+
+# (user, password digest, peer class) -> expiry time
+_credentials = OrderedDict()
+_credentialsState = {"mtimes": None, "salt": urandom(16)}
+_noshell = {}
+
+# seconds to wait after start before warming up templates
+WARMUP_DELAY = 30
+
 
 def getAllNetworks():
 	tempaddrs = []
@@ -86,6 +131,175 @@ def getAllNetworks():
 		return tempaddrs
 
 
+def invalidateNetworks():
+	_networks["expires"] = 0
+	_peers.clear()
+
+
+def getNetworkTable():
+	"""
+	Get the local networks as pre-parsed tuples (ip version, network, netmask)
+	of integers. The table is rebuilt after NETWORKS_TTL seconds, when the
+	network configuration changes or, see checkPeer, for a peer outside of
+	the local networks.
+	"""
+	now = time()
+	if now >= _networks["expires"]:
+		table = []
+		for network in getAllNetworks() or []:
+			net = ipaddress.ip_network(text_type(network), strict=False)
+			table.append((net.version, int(net.network_address), int(net.netmask)))
+		_networks["table"] = table
+		_networks["built"] = now
+		_networks["expires"] = now + NETWORKS_TTL
+		_peers.clear()
+	return _networks["table"]
+
+
+def checkPeer(peer):
+	"""
+	Check if *peer* is in one of the local networks or in private address space.
+
+	Args:
+		peer: ip address as string
+	Returns:
+		tuple (samenet, private)
+	"""
+	table = getNetworkTable()
+	result = _peers.get(peer)
+	if result is None:
+		try:
+			ip = ipaddress.ip_address(text_type(peer))
+		except ValueError:
+			result = (False, False)
+		else:
+			value = int(ip)
+			samenet = any(version == ip.version and value & mask == network for version, network, mask in table)
+			result = (samenet, ip.is_private)
+		if len(_peers) >= PEER_CACHE_SIZE:
+			_peers.clear()
+		_peers[peer] = result
+	if not result[0] and time() - _networks["built"] >= NETWORKS_RECHECK:
+		# the peer may be in a network which came up after the table was built
+		invalidateNetworks()
+		return checkPeer(peer)
+	return result
+
+
+def _checkCredentialFiles():
+	mtimes = []
+	for file in CREDENTIALS_FILES:
+		try:
+			mtimes.append(stat(file).st_mtime)
+		except OSError:
+			mtimes.append(None)
+	if mtimes != _credentialsState["mtimes"]:
+		_credentialsState["mtimes"] = mtimes
+		_credentials.clear()
+		_noshell.clear()
+
+
+def credentialsKey(user, passwd, peerclass):
+	# never keep the password itself, only a digest salted per process
+	digest = hmac.new(_credentialsState["salt"], ensure_binary(passwd), sha256).hexdigest()
+	return (user, digest, peerclass)
+
+
+def isCredentialCached(key):
+	_checkCredentialFiles()
+	expires = _credentials.get(key)
+	if expires is None:
+		return False
+	if expires < time():
+		del _credentials[key]
+		return False
+	moveToEnd(_credentials, key)
+	return True
+
+
+def cacheCredential(key):
+	_credentials[key] = time() + CREDENTIALS_TTL
+	moveToEnd(_credentials, key)
+	while len(_credentials) > CREDENTIALS_CACHE_SIZE:
+		_credentials.popitem(last=False)
+
+
+class WebifRequest(server.Request):
+	"""
+	Request telling the watchdog which request the reactor is processing
+	and recording its metrics when it is done.
+
+	Controllers name the endpoint in the attribute endpoint, other
+	resources are counted by the first path segment.
+
+	With profiling enabled in the settings, a request with the argument
+	profile=1 runs under cProfile and is answered with the stats instead
+	of its body, unless it got rejected by the authentication.
+
+	Responses of all resources are compressed according to the policy of
+	the compression module.
+	"""
+	profile = None
+
+	def process(self):
+		self.started = time()
+		self.notifyFinish().addBoth(self.recordMetrics)
+		if self.args.get(b"profile") == [b"1"] and config.OpenWebif.profiling.value and not isProfiling():
+			self.profiledBody = []
+			self.profile = Profile()
+			self.profile.enable()
+		setCurrentRequest(self)
+		try:
+			server.Request.process(self)
+		finally:
+			setCurrentRequest(None)
+
+	def render(self, resrc):
+		if self._encoder is None:
+			self._encoder = getEncoder(self)
+		server.Request.render(self, resrc)
+
+	def write(self, data):
+		if self.profile is not None:
+			self.profiledBody.append(data)
+		else:
+			server.Request.write(self, data)
+
+	def finish(self):
+		if self.profile is not None:
+			profile = self.profile
+			self.profile = None
+			profile.disable()
+			if self.code in (http.UNAUTHORIZED, http.FORBIDDEN):
+				body = b"".join(self.profiledBody)
+			else:
+				self.setResponseCode(http.OK)
+				self.responseHeaders.removeHeader(b"content-length")
+				self.responseHeaders.removeHeader(b"etag")
+				self.setHeader(b"content-type", b"text/plain; charset=utf-8")
+				body = ensure_binary(formatStats(profile, ensure_str(self.args.get(b"sort", [b"cumulative"])[0])))
+			self.profiledBody = None
+			if body:
+				server.Request.write(self, body)
+		return server.Request.finish(self)
+
+	def connectionLost(self, reason):
+		if self.profile is not None:
+			self.profile.disable()
+			self.profile = None
+		server.Request.connectionLost(self, reason)
+
+	def recordMetrics(self, result):
+		endpoint = getattr(self, "endpoint", None)
+		if endpoint is None:
+			if self.code == http.NOT_FOUND:
+				endpoint = "notfound"
+			else:
+				endpoint = "/" + ensure_str(self.prepath[0] if self.prepath else b"", errors="replace")
+		code = "aborted" if result is not None else self.code
+		recordRequest(endpoint, code, time() - self.started, self.sentLength)
+
+
 def verifyCallback(connection, x509, errnum, errdepth, ok):
 	if not ok:
 		print('[OpenWebif] Invalid cert from subject: %s' % str(x509.get_subject()))
@@ -136,6 +350,8 @@ def buildRootTree(session):
 			print("[OpenWebif] plugin '%s' loaded on path '/%s'" % (plugin[2], plugin[0]))
 	else:
 		print("[OpenWebif] no plugins to load")
+	# the menu lists the loaded plugins
+	invalidateMainTemplate()
 	return root
 
 
@@ -146,6 +362,10 @@ def HttpdStart(session):
 	Args:
 		session: (?) session object
 	"""
+	# the network configuration may have changed
+	invalidateNetworks()
+	# cached responses depend on the record timers
+	watchRecordTimer()
 	if config.OpenWebif.enabled.value is True:
 		global listener, site, sslsite
 		port = config.OpenWebif.port.value
@@ -153,9 +373,12 @@ def HttpdStart(session):
 			print("[OpenWebif] httpserver already started")
 			return
 
-		temproot = buildRootTree(session)
+		with timedStep("boot", "resource tree"):
+			temproot = buildRootTree(session)
 		root = AuthResource(session, temproot)
 		site = server.Site(root)
+		site.requestFactory = WebifRequest
+		attachSite(site)
 		site.displayTracebacks = config.OpenWebif.displayTracebacks.value
 
 		# start http webserver on configured port
@@ -180,7 +403,8 @@ def HttpdStart(session):
 
 		if config.OpenWebif.https_enabled.value is True:
 			httpsPort = config.OpenWebif.https_port.value
-			installCertificates(session)
+			with timedStep("boot", "certificates"):
+				installCertificates(session)
 			# start https webserver on port configured port
 			try:
 				try:
@@ -191,7 +415,7 @@ def HttpdStart(session):
 					if exists(CHAIN_FILE):
 						chain = [crypto.load_certificate(crypto.FILETYPE_PEM, open(CHAIN_FILE, 'rt').read())]
 						print("[OpenWebif] ssl chain file found - loading")
-					context = ssl.CertificateOptions(privateKey=key, certificate=cert, extraCertChain=chain)
+					context = getCertificateOptions(key, cert, chain)
 				except:  # nosec # noqa: E722
 					# THIS EXCEPTION IS ONLY CATCHED WHEN CERT FILES ARE BAD (look below for error)
 					print("[OpenWebif] failed to get valid cert files. (It could occure bad file save or format, removing...)")
@@ -204,8 +428,10 @@ def HttpdStart(session):
 					installCertificates(session)
 					context = ssl.DefaultOpenSSLContextFactory(KEY_FILE, CERT_FILE)
 
+				# the context is built once and shared by all connections
+				ctx = context.getContext()
+				tuneContext(ctx)
 				if config.OpenWebif.https_clientcert.value is True:
-					ctx = context.getContext()
 					ctx.set_verify(
 						SSL.VERIFY_PEER | SSL.VERIFY_FAIL_IF_NO_PEER_CERT,
 						verifyCallback
@@ -214,13 +440,15 @@ def HttpdStart(session):
 
 				sslroot = AuthResource(session, temproot)
 				sslsite = server.Site(sslroot)
+				sslsite.requestFactory = WebifRequest
+				attachSite(sslsite)
 
 				if has_ipv6 and fileExists(INET6) and version.major >= 12:
 					# use ipv6
-					listener.append(reactor.listenSSL(httpsPort, sslsite, context, interface='::'))
+					listener.append(reactor.listenSSL(httpsPort, TLSSiteFactory(sslsite), context, interface='::'))
 				else:
 					# ipv4 only
-					listener.append(reactor.listenSSL(httpsPort, sslsite, context))
+					listener.append(reactor.listenSSL(httpsPort, TLSSiteFactory(sslsite), context))
 				print("[OpenWebif] started on port:%s" % str(httpsport))
 				BJregisterService('https', httpsPort)
 			except CannotListenError:
@@ -246,6 +474,14 @@ def HttpdStart(session):
 			except CannotListenError:
 				print("[OpenWebif] port 80 busy")
 
+		if config.OpenWebif.template_warmup.value:
+			reactor.callLater(WARMUP_DELAY, warmupTemplates, WARMUP_VIEWS, getViewsPath)
+
+		if config.OpenWebif.stall_watchdog.value:
+			startWatchdog()
+
+		startupDone()
+
 
 def HttpdStop(session):
 	StopServer(session).doStop()
@@ -261,12 +497,18 @@ class AuthResource(resource.Resource):
 		self.resource = root
 
 	def noShell(self, user):
+		_checkCredentialFiles()
+		if user in _noshell:
+			return _noshell[user]
+		ret = False
 		if fileExists('/etc/passwd'):
 			for line in open('/etc/passwd').readlines():
 				line = line.strip()
 				if line.startswith(user + ":") and (line.endswith(":/bin/false") or line.endswith(":/sbin/nologin")):
-					return True
-		return False
+					ret = True
+					break
+		_noshell[user] = ret
+		return ret
 
 	def render(self, request):
 		host = request.getHost().host
@@ -288,8 +530,9 @@ class AuthResource(resource.Resource):
 			return self.resource.render(request)
 
 	def getChildWithDefault(self, path, request):
-		global site, sslsite
-		session = request.getSession().sessionNamespaces
+		session = request.getSession()
+		# sessions found by their cookie are not touched by twisted
+		session.use()
 		host = request.getHost().host
 		peer = request.getClientIP()
 		host = ensure_str(host)
@@ -305,20 +548,19 @@ class AuthResource(resource.Resource):
 
 		if peer.startswith("fe80::") and "%" in peer:
 			peer = peer.split("%")[0]
+		# the client as seen by the admission control
+		request.peer = peer
 
 		# Handle all conditions where auth may be skipped/disabled
 
 		# #1: Auth is disabled and access is from local network
 		if (not request.isSecure() and config.OpenWebif.auth.value is False) or (request.isSecure() and config.OpenWebif.https_auth.value is False):
-			networks = getAllNetworks()
-			if networks:
-				for network in networks:
-					if ipaddress.ip_address(text_type(peer)) in ipaddress.ip_network(text_type(network), strict=False):
-						return self.resource.getChildWithDefault(path, request)
+			samenet, private = checkPeer(peer)
+			if samenet:
+				return self.resource.getChildWithDefault(path, request)
 
-		# #2: Auth is disabled and access is from private address space (Usually VPN) and access for VPNs has been granted
-		if (not request.isSecure() and config.OpenWebif.auth.value is False) or (request.isSecure() and config.OpenWebif.https_auth.value is False):
-			if config.OpenWebif.vpn_access.value is True and ipaddress.ip_address(text_type(peer)).is_private:
+			# #2: Auth is disabled and access is from private address space (Usually VPN) and access for VPNs has been granted
+			if config.OpenWebif.vpn_access.value is True and private:
 				return self.resource.getChildWithDefault(path, request)
 
 		# #3: Access is from localhost and streaming auth is disabled - or - we only want to see our IPv6 (For inadyn-mt)
@@ -329,24 +571,15 @@ class AuthResource(resource.Resource):
 		ruser = ensure_str(request.getUser())
 		rpw = ensure_str(request.getPassword())
 		if ruser == "-sid":
-			sid = str(rpw)
-			try:
-				oldsession = site.getSession(sid).sessionNamespaces
-				if "logged" in list(oldsession.keys()) and oldsession["logged"]:
-					session = request.getSession().sessionNamespaces
-					session["logged"] = True
-					return self.resource.getChildWithDefault(path, request)
-			except:  # nosec # noqa: E722
-				pass
-
-			try:
-				oldsession = sslsite.getSession(sid).sessionNamespaces
-				if "logged" in list(oldsession.keys()) and oldsession["logged"]:
-					session = request.getSession().sessionNamespaces
-					session["logged"] = True
-					return self.resource.getChildWithDefault(path, request)
-			except:  # nosec # noqa: E722
-				pass
+			# the sessions of the HTTP and HTTPS sites share one store
+			parent = findSession(rpw or "")
+			if parent is not None and parent.logged:
+				session.logged = True
+				return self.resource.getChildWithDefault(path, request)
+		# ... or, for users without shell, by the stream token of their session
+		elif ruser and findStreamSession(ruser, rpw) is not None:
+			session.logged = True
+			return self.resource.getChildWithDefault(path, request)
 
 		# If we get to here, no exception applied
 		# Either block with forbidden (If auth is disabled) ...
@@ -354,31 +587,32 @@ class AuthResource(resource.Resource):
 			return resource.ErrorPage(http.FORBIDDEN, 'Forbidden', '403.6 IP address rejected')
 
 		# ... or auth
-		if "logged" in list(session.keys()) and session["logged"]:
+		if session.logged:
 			return self.resource.getChildWithDefault(path, request)
 
 		if self.login(ruser, rpw, peer) is False:
 			request.setHeader('WWW-authenticate', 'Basic realm="%s"' % ("OpenWebif"))
 			return resource.ErrorPage(http.UNAUTHORIZED, "Unauthorized", "401 Authentication required")
 		else:
-			session["logged"] = True
-			session["user"] = ruser
-			session["pwd"] = None
+			session.logged = True
+			session.user = ruser
 			if self.noShell(ruser):
-				session["pwd"] = rpw
+				session.streamAuth = (ruser, rpw)
+				session.issueStreamToken()
 			return self.resource.getChildWithDefault(path, request)
 
 	def login(self, user, passwd, peer):
+		peerclass = checkPeer(peer)
 		if user == "root" and config.OpenWebif.no_root_access.value:
 			# Override "no root" for logins from local/private networks
-			samenet = False
-			networks = getAllNetworks()
-			if networks:
-				for network in networks:
-					if ipaddress.ip_address(text_type(peer)) in ipaddress.ip_network(text_type(network), strict=False):
-						samenet = True
-			if not (ipaddress.ip_address(text_type(peer)).is_private or samenet):
+			samenet, private = peerclass
+			if not (private or samenet):
 				return False
+		if not user or passwd is None:
+			return False
+		key = credentialsKey(user, passwd, peerclass)
+		if isCredentialCached(key):
+			return True
 		from crypt import crypt
 		from pwd import getpwnam
 		from spwd import getspnam
@@ -393,7 +627,9 @@ class AuthResource(resource.Resource):
 					cpass = getspnam(user)[1]
 				except:  # nosec # noqa: E722
 					return False
-			return crypt(passwd, cpass) == cpass
+			if crypt(passwd, cpass) == cpass:
+				cacheCredential(key)
+				return True
 		return False
 
 
@@ -74,6 +74,8 @@ config.OpenWebif.https_enabled = ConfigYesNo(default=False)
 config.OpenWebif.https_port = ConfigInteger(default=443, limits=(1, 65535))
 config.OpenWebif.https_auth = ConfigYesNo(default=False)
 config.OpenWebif.https_clientcert = ConfigYesNo(default=False)
+# ciphers preferred for HTTPS, "auto" picks AES-GCM if the CPU has AES instructions
+config.OpenWebif.https_ciphers = ConfigSelection(default="auto", choices=[("auto", _("auto")), ("chacha", "ChaCha20-Poly1305"), ("aesgcm", "AES-GCM"), ("default", _("default"))])
 config.OpenWebif.parentalenabled = ConfigYesNo(default=False)
 # Use service name for stream
 config.OpenWebif.service_name_for_stream = ConfigYesNo(default=True)
@@ -89,6 +91,24 @@ config.OpenWebif.epg_encoding = ConfigSelection(default='utf-8', choices=['utf-8
 config.OpenWebif.displayTracebacks = ConfigYesNo(default=False)
 config.OpenWebif.playiptvdirect = ConfigYesNo(default=True)
 config.OpenWebif.verbose_debug_enabled = ConfigYesNo(default=False)
+# load the most used templates in background after start
+config.OpenWebif.template_warmup = ConfigYesNo(default=True)
+# record stack traces when the web server stops responding
+config.OpenWebif.stall_watchdog = ConfigYesNo(default=False)
+# allow profiling requests with profile=1 and /api/profile
+config.OpenWebif.profiling = ConfigYesNo(default=False)
+# gzip level of the responses, "auto" lowers it when the CPU is busy
+config.OpenWebif.compression = ConfigSelection(default="auto", choices=[("auto", _("auto")), ("off", _("off")), ("1", _("fastest")), ("6", _("default")), ("9", _("smallest"))])
+# smallest response body compressed
+config.OpenWebif.compression_minsize = ConfigInteger(default=1024, limits=(0, 1048576))
+# limit the requests each client and all clients may run at once, 0 for no limit
+config.OpenWebif.admission_control = ConfigYesNo(default=False)
+config.OpenWebif.admission_cheap = ConfigInteger(default=8, limits=(0, 100))
+config.OpenWebif.admission_heavy = ConfigInteger(default=2, limits=(0, 100))
+config.OpenWebif.admission_export = ConfigInteger(default=1, limits=(0, 100))
+config.OpenWebif.admission_cheap_total = ConfigInteger(default=0, limits=(0, 100))
+config.OpenWebif.admission_heavy_total = ConfigInteger(default=4, limits=(0, 100))
+config.OpenWebif.admission_export_total = ConfigInteger(default=2, limits=(0, 100))
 
 setDebugEnabled(config.OpenWebif.verbose_debug_enabled.value)
 
@@ -6,6 +6,7 @@ from distutils import cmd
 from distutils.command.build import build as _build
 import glob
 import os
+import sys
 
 
 class build_trans(cmd.Command):
@@ -38,8 +39,41 @@ class build_trans(cmd.Command):
 			print("we got no domain -> no translation was compiled")
 
 
+class build_views(cmd.Command):
+	description = 'Compile Cheetah templates into python modules in the build directory'
+
+	def initialize_options(self):
+		self.build_lib = None
+
+	def finalize_options(self):
+		self.set_undefined_options('build', ('build_lib', 'build_lib'))
+
+	def run(self):
+		views = os.path.join('plugin', 'controllers', 'views')
+		destination = os.path.join(self.build_lib, 'Extensions', 'OpenWebif', 'controllers', 'views')
+		compiler = os.path.join('plugin', 'controllers', 'templates.py')
+		if os.system("'%s' '%s' '%s' '%s'" % (sys.executable, compiler, views, destination)) != 0:
+			raise Exception("Failed to compile templates in: " + views)
+
+
+class build_assets(cmd.Command):
+	description = 'Compress static assets and write the manifest of their hashed names'
+
+	def initialize_options(self):
+		pass
+
+	def finalize_options(self):
+		pass
+
+	def run(self):
+		public = os.path.join('plugin', 'public')
+		builder = os.path.join('plugin', 'controllers', 'assets.py')
+		if os.system("'%s' '%s' '%s'" % (sys.executable, builder, public)) != 0:
+			raise Exception("Failed to build assets in: " + public)
+
+
 class build(_build):
-	sub_commands = _build.sub_commands + [('build_trans', None)]
+	sub_commands = _build.sub_commands + [('build_trans', None), ('build_views', None), ('build_assets', None)]
 
 	def run(self):
 		_build.run(self)
@@ -48,4 +82,6 @@ class build(_build):
 cmdclass = {
 	'build': build,
 	'build_trans': build_trans,
+	'build_views': build_views,
+	'build_assets': build_assets,
 }
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Unit Test for the parsing of request batches.
+"""
+import os
+import sys
+import types
+import unittest
+from io import BytesIO
+
+# hack: let the absolute imports of the plugin modules find them in ../plugin
+PLUGIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../plugin')
+for name, path in (("Plugins", None), ("Plugins.Extensions", None), ("Plugins.Extensions.OpenWebif", PLUGIN_DIR)):
+	sys.modules.setdefault(name, types.ModuleType(name)).__path__ = [path] if path else []
+
+from Plugins.Extensions.OpenWebif.controllers import batch
+
+
+class BatchRequestMockup(object):
+	"""
+	Mock implementation of the parts of
+	:py:class:`twisted.web.server.Request` read by parseBatch.
+	"""
+
+	def __init__(self, body=b"", args=None, method=b"POST"):
+		self.method = method
+		self.content = BytesIO(body)
+		self.args = args or {}
+
+
+class TestParseBatch(unittest.TestCase):
+
+	def test_body(self):
+		request = BatchRequestMockup(b'[{"id": "now", "path": "/api/epgnow", "args": {"bRef": "1:7:1", "count": 3, "x": ["a", "b"]}}, "statusinfo"]')
+		self.assertEqual([
+			("now", "epgnow", {b"bRef": [b"1:7:1"], b"count": [b"3"], b"x": [b"a", b"b"]}),
+			("statusinfo", "statusinfo", {}),
+		], batch.parseBatch(request))
+
+	def test_argument(self):
+		request = BatchRequestMockup(args={b"requests": [b'["getcurrent?x=1", {"path": "/api/vol/"}]']}, method=b"GET")
+		self.assertEqual([("getcurrent", "getcurrent", {}), ("vol", "vol", {})], batch.parseBatch(request))
+
+	def test_malformed(self):
+		for body in (b'{"path": "statusinfo"}', b'[{"args": {}}]', b'[{"path": "vol", "args": [1]}]', b'[42]'):
+			self.assertRaises(ValueError, batch.parseBatch, BatchRequestMockup(body))
+		self.assertRaises(ValueError, batch.parseBatch, BatchRequestMockup(b'[not json'))
+
+	def test_too_large(self):
+		body = ('[' + ','.join(['"statusinfo"'] * (batch.BATCH_MAX_REQUESTS + 1)) + ']').encode()
+		self.assertRaises(ValueError, batch.parseBatch, BatchRequestMockup(body))
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Unit Test for the selection of the fields of list items.
+"""
+import os
+import sys
+import unittest
+
+# hack: alter include path in such ways that utilities library is included
+sys.path.append(os.path.join(os.path.dirname(__file__), '../plugin'))
+
+from controllers.utilities import getFields, getMovieFields, wantsField, projectFields
+
+MOVIE_ITEM = {
+	'filename': '/media/hdd/movie/movie.ts',
+	'eventname': 'Animal Kingdom',
+	'lastseen': 42,
+	'description': 'Sündenbock',
+	'descriptionExtended': '1. Staffel, Folge 5',
+	'filesize': 1024,
+	'filesize_readable': '1.00 kB',
+}
+
+
+class TestFieldSelection(unittest.TestCase):
+
+	def test_no_fields(self):
+		self.assertIsNone(getFields({}))
+		self.assertIsNone(getFields({b"fields": [b""]}))
+		self.assertIsNone(getFields({b"fields": [b" , "]}))
+		self.assertTrue(wantsField(None, "anything"))
+		self.assertEqual(MOVIE_ITEM, projectFields(MOVIE_ITEM, None))
+
+	def test_field_names(self):
+		fields = getFields({b"fields": [b"eventname, filename"]})
+		self.assertEqual(["eventname", "filename"], sorted(fields))
+		self.assertTrue(wantsField(fields, "filesize", "filename"))
+		self.assertFalse(wantsField(fields, "filesize", "lastseen"))
+		self.assertEqual({'filename': '/media/hdd/movie/movie.ts', 'eventname': 'Animal Kingdom'}, projectFields(MOVIE_ITEM, fields))
+
+	def test_plain_names(self):
+		# group names of the movie list are keys of the other lists
+		service = {'pos': 3, 'servicename': 'Das Erste HD', 'servicereference': '1:0:19:283D:3FB:1:C00000:0:0:0:'}
+		fields = getFields({b"fields": [b"pos,servicename"]})
+		self.assertEqual({'pos': 3, 'servicename': 'Das Erste HD'}, projectFields(service, fields))
+		self.assertEqual({'pos': 3}, projectFields(service, getFields({b"fields": [b"pos"]})))
+		self.assertEqual({'lastseen': 42}, projectFields(MOVIE_ITEM, getFields({b"fields": [b"lastseen"]})))
+
+	def test_movie_group_names_and_fields(self):
+		fields = getMovieFields({b"fields": [b"eventname,desc"]})
+		self.assertEqual(["description", "descriptionExtended", "eventname"], sorted(fields))
+		self.assertFalse(wantsField(fields, "filename"))
+		self.assertEqual(["description", "descriptionExtended", "eventname"], sorted(projectFields(MOVIE_ITEM, fields)))
+
+	def test_movie_group_names_only(self):
+		# the former form of the movie list: all fields except the groups not named
+		fields = getMovieFields({b"fields": [b"pos,size"]})
+		self.assertEqual(["filesize", "filesize_readable", "lastseen"], sorted(fields))
+		self.assertTrue(wantsField(fields, "lastseen"))
+		self.assertTrue(wantsField(fields, "filesize", "filesize_readable"))
+		self.assertFalse(wantsField(fields, "description", "descriptionExtended"))
+		self.assertTrue(wantsField(fields, "filename"))
+		self.assertEqual(
+			["eventname", "filename", "filesize", "filesize_readable", "lastseen"],
+			sorted(projectFields(MOVIE_ITEM, fields)))
+		self.assertIsNone(getMovieFields({}))
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+Unit Test for the request metrics in the Prometheus text format.
+"""
+import os
+import sys
+import types
+import unittest
+
+# hack: let the absolute imports of the plugin modules find them in ../plugin
+PLUGIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../plugin')
+for name, path in (("Plugins", None), ("Plugins.Extensions", None), ("Plugins.Extensions.OpenWebif", PLUGIN_DIR)):
+	sys.modules.setdefault(name, types.ModuleType(name)).__path__ = [path] if path else []
+
+from Plugins.Extensions.OpenWebif.controllers import metrics
+
+
+class TestPrometheusMetrics(unittest.TestCase):
+
+	def setUp(self):
+		metrics._endpoints.clear()
+		metrics._handshakes.clear()
+
+	def test_requests(self):
+		metrics.recordRequest("/api/statusinfo", 200, 0.02, 300)
+		metrics.recordRequest("/api/statusinfo", 304, 0.001, 0)
+		metrics.recordRequest('/api/"x"', "aborted", 20.0, 5000000)
+		lines = metrics.getPrometheusMetrics().splitlines()
+		self.assertIn('openwebif_requests_total{endpoint="/api/statusinfo",code="200"} 1', lines)
+		self.assertIn('openwebif_requests_total{endpoint="/api/statusinfo",code="304"} 1', lines)
+		self.assertIn('openwebif_requests_total{endpoint="/api/\\"x\\"",code="aborted"} 1', lines)
+		self.assertIn('openwebif_request_duration_seconds_bucket{endpoint="/api/statusinfo",le="0.005"} 1', lines)
+		self.assertIn('openwebif_request_duration_seconds_bucket{endpoint="/api/statusinfo",le="0.025"} 2', lines)
+		self.assertIn('openwebif_request_duration_seconds_bucket{endpoint="/api/statusinfo",le="+Inf"} 2', lines)
+		self.assertIn('openwebif_request_duration_seconds_count{endpoint="/api/statusinfo"} 2', lines)
+		self.assertIn('openwebif_response_size_bytes_bucket{endpoint="/api/\\"x\\"",le="4194304"} 0', lines)
+		self.assertIn('openwebif_response_size_bytes_bucket{endpoint="/api/\\"x\\"",le="+Inf"} 1', lines)
+		self.assertIn('openwebif_response_size_bytes_sum{endpoint="/api/statusinfo"} 300', lines)
+		self.assertFalse(any("tls_handshake" in line for line in lines))
+
+	def test_endpoint_limit(self):
+		for index in range(metrics.METRICS_MAX_ENDPOINTS + 5):
+			metrics.recordRequest("/api/page%d" % index, 200, 0.01, 100)
+		self.assertEqual(metrics.METRICS_MAX_ENDPOINTS + 1, len(metrics._endpoints))
+		self.assertIn('openwebif_requests_total{endpoint="other",code="200"} 5', metrics.getPrometheusMetrics().splitlines())
+
+	def test_handshakes(self):
+		metrics.recordHandshake(0.02, False)
+		metrics.recordHandshake(0.004, True)
+		lines = metrics.getPrometheusMetrics().splitlines()
+		self.assertIn('openwebif_tls_handshake_duration_seconds_bucket{session="full",le="0.025"} 1', lines)
+		self.assertIn('openwebif_tls_handshake_duration_seconds_count{session="resumed"} 1', lines)
+
+if __name__ == '__main__':
+	unittest.main()
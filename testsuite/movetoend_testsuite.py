@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""
+Unit Test for the helper keeping the least recently used caches in order.
+"""
+import os
+import sys
+import unittest
+from collections import OrderedDict
+
+# hack: alter include path in such ways that utilities library is included
+sys.path.append(os.path.join(os.path.dirname(__file__), '../plugin'))
+
+from controllers.utilities import moveToEnd
+
+
+class TestMoveToEnd(unittest.TestCase):
+
+	def test_move_to_end(self):
+		ordered = OrderedDict((key, None) for key in "abc")
+		moveToEnd(ordered, "a")
+		self.assertEqual(["b", "c", "a"], list(ordered))
+		moveToEnd(ordered, "a")
+		self.assertEqual(["b", "c", "a"], list(ordered))
+
+	def test_missing_key(self):
+		self.assertRaises(KeyError, moveToEnd, OrderedDict(), "a")
+
+
+if __name__ == '__main__':
+	unittest.main()
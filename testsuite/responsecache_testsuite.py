@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Unit Test for the cache of rendered responses.
+"""
+import os
+import sys
+import types
+import unittest
+
+# hack: let the absolute imports of the plugin modules find them in ../plugin
+PLUGIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../plugin')
+for name, path in (("Plugins", None), ("Plugins.Extensions", None), ("Plugins.Extensions.OpenWebif", PLUGIN_DIR)):
+	sys.modules.setdefault(name, types.ModuleType(name)).__path__ = [path] if path else []
+sys.modules.setdefault("NavigationInstance", types.ModuleType("NavigationInstance"))
+
+from Plugins.Extensions.OpenWebif.controllers import responsecache, versions
+
+
+class TestResponseCache(unittest.TestCase):
+
+	def setUp(self):
+		responsecache.invalidateResponses()
+		self.budget = responsecache.RESPONSE_CACHE_BUDGET
+
+	def tearDown(self):
+		responsecache.RESPONSE_CACHE_BUDGET = self.budget
+		responsecache.invalidateResponses()
+
+	def test_hit_and_version(self):
+		responsecache.putResponse("a", b"body", "application/json", "digest", 60, ("timers",), version=1)
+		self.assertEqual((b"body", "application/json", "digest"), responsecache.getResponse("a", version=1))
+		self.assertIsNone(responsecache.getResponse("a", version=2))
+		self.assertIsNone(responsecache.getResponse("a", version=1))
+
+	def test_expiry(self):
+		responsecache.putResponse("a", b"body", "text/xml", "digest", -1, ())
+		self.assertIsNone(responsecache.getResponse("a"))
+
+	def test_invalidation(self):
+		responsecache.putResponse("a", b"body", "text/xml", "digest", 60, ("timers",))
+		responsecache.putResponse("b", b"body", "text/xml", "digest", 60, ("movies",))
+		responsecache.invalidateResponses("timers")
+		self.assertIsNone(responsecache.getResponse("a"))
+		self.assertIsNotNone(responsecache.getResponse("b"))
+
+	def test_version_bump(self):
+		responsecache.putResponse("a", b"body", "text/xml", "digest", 60, ("epg", "timers"))
+		responsecache.putResponse("b", b"body", "text/xml", "digest", 60, ("bouquets",))
+		versions.bumpVersion("timers")
+		self.assertIsNone(responsecache.getResponse("a"))
+		self.assertIsNotNone(responsecache.getResponse("b"))
+
+	def test_least_recently_used_first(self):
+		entry = 1000 + responsecache.ENTRY_OVERHEAD
+		responsecache.RESPONSE_CACHE_BUDGET = 4 * entry + 10
+		for key in "abcd":
+			responsecache.putResponse(key, b"x" * 1000, "text/xml", key, 60, ())
+		self.assertIsNotNone(responsecache.getResponse("a"))
+		responsecache.putResponse("e", b"x" * 1000, "text/xml", "e", 60, ())
+		self.assertIsNone(responsecache.getResponse("b"))
+		for key in "acde":
+			self.assertIsNotNone(responsecache.getResponse(key))
+		self.assertEqual(4 * entry, responsecache.getResponseCacheStats()["size"])
+
+	def test_size_cap(self):
+		# a single response takes at most a quarter of the budget
+		responsecache.RESPONSE_CACHE_BUDGET = 4000
+		responsecache.putResponse("a", b"x" * 1000, "text/xml", "a", 60, ())
+		self.assertIsNone(responsecache.getResponse("a"))
+		self.assertEqual(0, responsecache.getResponseCacheStats()["size"])
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Unit Test for the session store shared by the HTTP and HTTPS sites.
+"""
+import os
+import sys
+import types
+import unittest
+
+from twisted.internet import task
+from twisted.web import server
+
+# hack: let the absolute imports of the plugin modules find them in ../plugin
+PLUGIN_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '../plugin')
+for name, path in (("Plugins", None), ("Plugins.Extensions", None), ("Plugins.Extensions.OpenWebif", PLUGIN_DIR)):
+	sys.modules.setdefault(name, types.ModuleType(name)).__path__ = [path] if path else []
+
+from Plugins.Extensions.OpenWebif.controllers import sessions
+
+
+class TestSessionWheel(unittest.TestCase):
+
+	def setUp(self):
+		self.clock = task.Clock()
+		self.site = server.Site(None, reactor=self.clock)
+		sessions.attachSite(self.site)
+		loop = sessions._state["loop"] = task.LoopingCall(sessions._tick)
+		loop.clock = self.clock
+
+	def tearDown(self):
+		for session in list(sessions._sessions.values()):
+			session.expire()
+		sessions._state["loop"] = None
+
+	def test_expiry(self):
+		session = self.site.makeSession()
+		self.assertIs(session, sessions.findSession(session.uid))
+		self.clock.advance(sessions.SESSION_TIMEOUT - sessions.WHEEL_TICK)
+		self.assertIs(session, sessions.findSession(session.uid))
+		self.clock.pump([sessions.WHEEL_TICK] * (sessions.SESSION_TIMEOUT // sessions.WHEEL_TICK + 2))
+		self.assertIsNone(sessions.findSession(session.uid))
+		self.assertFalse(sessions._state["loop"].running)
+
+	def test_touched_session_lives(self):
+		session = self.site.makeSession()
+		idle = self.site.makeSession()
+		for tick in range(2 * sessions.SESSION_TIMEOUT // sessions.WHEEL_TICK):
+			self.clock.advance(sessions.WHEEL_TICK)
+			session.touch()
+		self.assertIs(session, sessions.findSession(session.uid))
+		self.assertIsNone(sessions.findSession(idle.uid))
+
+	def test_stream_token(self):
+		session = self.site.makeSession()
+		session.logged = True
+		session.user = "streamer"
+		session.issueStreamToken()
+		token = session.streamToken
+		self.assertIs(session, sessions.findStreamSession("streamer", token))
+		self.assertIsNone(sessions.findStreamSession("root", token))
+		self.assertIsNone(sessions.findStreamSession("streamer", None))
+		session.expire()
+		self.assertIsNone(sessions.findStreamSession("streamer", token))
+
+
+	def test_one_shot_sessions_evicted_first(self):
+		browser = self.site.makeSession()
+		browser.use()
+		browser.use()
+		oneShot = []
+		for count in range(sessions.SESSION_CACHE_SIZE + 10):
+			session = self.site.makeSession()
+			session.use()
+			oneShot.append(session)
+		self.assertIs(browser, sessions.findSession(browser.uid))
+		self.assertIsNone(sessions.findSession(oneShot[0].uid))
+		self.assertIs(oneShot[-1], sessions.findSession(oneShot[-1].uid))
+		self.assertEqual(sessions.SESSION_CACHE_SIZE, len(sessions._sessions))
+
+	def test_least_recently_used_evicted(self):
+		lasting = []
+		for count in range(sessions.SESSION_CACHE_SIZE + 1):
+			session = self.site.makeSession()
+			session.use()
+			session.use()
+			lasting.append(session)
+		self.assertIsNone(sessions.findSession(lasting[0].uid))
+		self.assertIs(lasting[1], sessions.findSession(lasting[1].uid))
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+import os
+import unittest
+
+import requests
+
+TARGET_URL_BASE_FMT = 'http://{host}/{api}/epgxmltv'
+
+from movie_files_testsuite import ENV_VAR, ENV_VAL_FALLBACK
+
+
+class TestEnigma2EPGXMLTVCalls(unittest.TestCase):
+	"""
+	This test suite is used to document the behaviour of the epgxmltv
+	endpoint when its mandatory arguments are missing.
+	"""
+
+	def setUp(self):
+		self.enigma2_host = os.environ.get(ENV_VAR, ENV_VAL_FALLBACK)
+		self.web_url = TARGET_URL_BASE_FMT.format(host=self.enigma2_host, api="web")
+		self.api_url = TARGET_URL_BASE_FMT.format(host=self.enigma2_host, api="api")
+
+	def test_missing_bref(self):
+		params = {
+			"lang": "en"
+		}
+		req = requests.get(self.web_url, params=params)
+		print("Tried to fetch {!r}".format(req.url))
+		self.assertEqual(200, req.status_code)
+		self.assertTrue(req.headers["content-type"].startswith("text/xml"))
+		self.assertIn("<e2state>false</e2state>", req.text)
+		self.assertIn("<e2statetext>Missing mandatory parameter 'bRef'</e2statetext>", req.text)
+
+	def test_empty_lang(self):
+		params = {
+			"bRef": "1:7:1:0:0:0:0:0:0:0:FROM BOUQUET \"userbouquet.favourites.tv\" ORDER BY bouquet",
+			"lang": ""
+		}
+		req = requests.get(self.web_url, params=params)
+		print("Tried to fetch {!r}".format(req.url))
+		self.assertEqual(200, req.status_code)
+		self.assertIn("<e2state>false</e2state>", req.text)
+		self.assertIn("<e2statetext>The parameter 'lang' can't be empty</e2statetext>", req.text)
+
+	def test_missing_bref_json(self):
+		params = {
+			"lang": "en"
+		}
+		req = requests.get(self.api_url, params=params)
+		print("Tried to fetch {!r}".format(req.url))
+		self.assertEqual(200, req.status_code)
+		self.assertEqual({"result": False, "message": "Missing mandatory parameter 'bRef'"}, req.json())
+
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+"""
+Unit Test for the cache of compiled view templates.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import types
+import unittest
+
+# hack: alter include path in such ways that templates library is included
+sys.path.append(os.path.join(os.path.dirname(__file__), '../plugin'))
+
+try:
+	import Cheetah
+except ImportError:
+	# the views of the tests are compiled python modules, Cheetah is not used
+	for name in ("Cheetah", "Cheetah.Compiler", "Cheetah.Template"):
+		sys.modules[name] = types.ModuleType(name)
+	sys.modules["Cheetah.Compiler"].Compiler = None
+	sys.modules["Cheetah.Template"].Template = None
+
+from controllers import templates
+
+VIEW_FMT = """
+class {module}(object):
+	label = {label!r}
+
+	def __init__(self, searchList):
+		self.args = searchList[0]
+
+	def __str__(self):
+		return self.label + ":" + self.args["name"]
+"""
+
+
+class ClockMockup(object):
+	"""
+	Stand-in for :py:func:`time.time` of the templates module.
+	"""
+
+	def __init__(self):
+		self.now = 1000000.0
+
+	def __call__(self):
+		return self.now
+
+
+class TestTemplateCache(unittest.TestCase):
+
+	def setUp(self):
+		self.root = tempfile.mkdtemp()
+		self.clock = ClockMockup()
+		self.time = templates.time
+		templates.time = self.clock
+		templates.clearTemplateCache()
+		for key in templates._stats:
+			templates._stats[key] = 0
+
+	def tearDown(self):
+		templates.time = self.time
+		templates.clearTemplateCache()
+		shutil.rmtree(self.root)
+
+	def writeView(self, view, label, mtime):
+		filename = os.path.join(self.root, view + ".py")
+		if not os.path.isdir(os.path.dirname(filename)):
+			os.makedirs(os.path.dirname(filename))
+		with open(filename, "w") as fd:
+			fd.write(VIEW_FMT.format(module=os.path.basename(view), label=label))
+		os.utime(filename, (mtime, mtime))
+		return os.path.join(self.root, view)
+
+	def test_hit_and_miss(self):
+		basepath = self.writeView("ajax/tv", "classic", 100)
+		klass, source = templates.getTemplateClass(basepath, "tv")
+		self.assertEqual(basepath + ".py", source)
+		self.assertIs(klass, templates.getTemplateClass(basepath, "tv")[0])
+		self.assertEqual("classic:box", templates.renderTemplate(basepath, "tv", {"name": "box"}))
+		stats = templates.getTemplateCacheStats()
+		self.assertEqual((1, 2, 0, 1), (stats["misses"], stats["hits"], stats["reloads"], stats["size"]))
+
+	def test_missing_view(self):
+		self.assertEqual((None, None), templates.getTemplateClass(os.path.join(self.root, "nothing"), "nothing"))
+		self.assertIsNone(templates.renderTemplate(os.path.join(self.root, "nothing"), "nothing", {}))
+		self.assertEqual(0, templates.getTemplateCacheStats()["size"])
+
+	def test_revalidation(self):
+		basepath = self.writeView("ajax/tv", "old", 100)
+		templates.getTemplateClass(basepath, "tv")
+		self.writeView("ajax/tv", "new", 200)
+		# the mtime is not checked again within CHECK_INTERVAL
+		self.clock.now += templates.CHECK_INTERVAL - 1
+		self.assertEqual("old:x", templates.renderTemplate(basepath, "tv", {"name": "x"}))
+		self.clock.now += 2
+		self.assertEqual("new:x", templates.renderTemplate(basepath, "tv", {"name": "x"}))
+		self.assertEqual(1, templates.getTemplateCacheStats()["reloads"])
+		# an unchanged view is a hit after the check
+		self.clock.now += templates.CHECK_INTERVAL + 1
+		self.assertEqual("new:x", templates.renderTemplate(basepath, "tv", {"name": "x"}))
+		self.assertEqual(1, templates.getTemplateCacheStats()["reloads"])
+
+	def test_responsive_and_classic(self):
+		classic = self.writeView("ajax/tv", "classic", 100)
+		responsive = self.writeView("responsive/ajax/tv", "responsive", 100)
+		self.assertEqual("classic:x", templates.renderTemplate(classic, "tv", {"name": "x"}))
+		self.assertEqual("responsive:x", templates.renderTemplate(responsive, "tv", {"name": "x"}))
+		self.assertEqual("classic:x", templates.renderTemplate(classic, "tv", {"name": "x"}))
+		self.assertEqual(2, templates.getTemplateCacheStats()["size"])
+
+
+if __name__ == '__main__':
+	unittest.main()